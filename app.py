@@ -5,12 +5,49 @@ Deploy this to cloud platforms (Heroku, AWS, Google Cloud, etc.)
 from flask import Flask, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
+import gzip
 import os
-from predict import load_model, predict_single_point
+import time
+from predict import load_model, predict_frame, inference_dtype
+from feature_schema import feature_schema
+from request_validator import RequestValidator
+from inference_sessions import SessionStore
+from ensemble import ModelEnsemble
+from warmup import Warmup, synthetic_readings
 
 app = Flask(__name__)
 CORS(app)  # Enable CORS for cross-origin requests
 
+# Responses at least this large are gzip-compressed for clients that accept it
+GZIP_MIN_SIZE = int(os.getenv('GZIP_MIN_SIZE', '1024'))
+
+REQUIRED_FIELDS = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP']
+
+@app.before_request
+def decompress_request():
+    """Accept gzip-compressed request bodies (Content-Encoding: gzip), e.g. from stress_client"""
+    if request.headers.get('Content-Encoding', '').lower() == 'gzip':
+        try:
+            request._cached_data = gzip.decompress(request.get_data())
+        except OSError:
+            return jsonify({'error': 'Invalid gzip request body'}), 400
+
+@app.after_request
+def compress_response(response):
+    """gzip large JSON responses when the client sends Accept-Encoding: gzip"""
+    if ('gzip' not in request.headers.get('Accept-Encoding', '').lower()
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype != 'application/json'):
+        return response
+    data = response.get_data()
+    if len(data) < GZIP_MIN_SIZE:
+        return response
+    response.set_data(gzip.compress(data, compresslevel=5))
+    response.headers['Content-Encoding'] = 'gzip'
+    response.headers['Vary'] = 'Accept-Encoding'
+    return response
+
 # Load model on startup
 MODEL_NAME = os.getenv('MODEL_NAME', 'random_forest.joblib')
 MODEL_DIR = os.getenv('MODEL_DIR', 'models')
@@ -23,6 +60,31 @@ except Exception as e:
     print(f"Error loading model: {e}")
     model = None
 
+# Models scored together by /predict/ensemble (ENSEMBLE_MODELS: comma-separated, default all)
+ENSEMBLE_MODELS = os.getenv('ENSEMBLE_MODELS')
+ENSEMBLE_WEIGHTS = os.getenv('ENSEMBLE_WEIGHTS', '')  # e.g. "gradient_boosting=2,mlp_classifier=1"
+ENSEMBLE_COMBINE = os.getenv('ENSEMBLE_COMBINE', 'mean')
+
+try:
+    ensemble = ModelEnsemble.from_directory(
+        MODEL_DIR,
+        names=ENSEMBLE_MODELS.split(',') if ENSEMBLE_MODELS else None,
+        weights=ENSEMBLE_WEIGHTS
+    )
+    print(f"Ensemble models: {list(ensemble.models)}")
+except Exception as e:
+    print(f"Ensemble not available: {e}")
+    ensemble = None
+
+# Per-device streaming sessions (SESSION_MAX, SESSION_IDLE_TTL, SESSION_SMOOTHING, SESSION_ALPHA, SESSION_WINDOW)
+sessions = SessionStore.from_env()
+
+# Reading checks for /predict and /predict/batch, built once (VALIDATION_RANGES overrides the sensor ranges)
+validator = RequestValidator.from_env(fields=REQUIRED_FIELDS)
+
+# Synthetic requests run at startup before /readyz reports ready (WARMUP, WARMUP_ROUNDS, WARMUP_BATCH_SIZE)
+warmup = Warmup.from_env()
+
 @app.route('/')
 def home():
     """API home endpoint"""
@@ -32,7 +94,12 @@ def home():
         'model': MODEL_NAME if model else 'not loaded',
         'endpoints': {
             '/predict': 'POST - Predict label from sensor data',
+            '/predict/ensemble': 'POST - Predict with every ensemble model and a combined vote',
+            '/sessions': 'POST - Open a smoothed streaming session for a device',
+            '/sessions/<device_id>/readings': 'POST - Predict readings within a session',
             '/health': 'GET - Check API health',
+            '/livez': 'GET - Liveness probe (process is up)',
+            '/readyz': 'GET - Readiness probe (model loaded and warmed up)',
             '/models': 'GET - List available models'
         }
     })
@@ -42,9 +109,25 @@ def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'model_loaded': model is not None
+        'model_loaded': model is not None,
+        'ready': model is not None and warmup.ready
     })
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe: 200 once the model is loaded and warm-up has finished, 503 before"""
+    ready = model is not None and warmup.ready
+    return jsonify({
+        'status': 'ready' if ready else 'not ready',
+        'model_loaded': model is not None,
+        'warmup': warmup.describe()
+    }), 200 if ready else 503
+
 @app.route('/models', methods=['GET'])
 def list_models():
     """List available models"""
@@ -70,50 +153,35 @@ def predict():
         "TEMP": 30.37,
         "datetime": "2020-05-08 22:11:34"  // optional, defaults to current time
     }
+    
+    Missing, non-numeric, NaN/infinite and out-of-range values and invalid
+    datetimes are rejected with 400 and an error code (see
+    request_validator.ERROR_CODES).
     """
     if model is None:
         return jsonify({'error': 'Model not loaded'}), 500
     
     try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP']
-        missing_fields = [field for field in required_fields if field not in data]
-        
-        if missing_fields:
-            return jsonify({
-                'error': f'Missing required fields: {missing_fields}'
-            }), 400
+        data = request.get_json(silent=True)
+        checked = validator.validate([data])
+        if not checked.valid[0]:
+            return jsonify(checked.error_details(0)), 400
         
         # Get datetime or use current time
-        datetime_str = data.get('datetime', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        datetime_str = checked.datetimes[0] or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
         # Make prediction
-        predicted_label, probabilities = predict_single_point(
-            model=model,
-            X=float(data['X']),
-            Y=float(data['Y']),
-            Z=float(data['Z']),
-            EDA=float(data['EDA']),
-            HR=float(data['HR']),
-            TEMP=float(data['TEMP']),
-            datetime_str=datetime_str,
-            id_val=data.get('id', None)
-        )
+        _, df = checked.valid_frame(feature_schema(model), dtype=inference_dtype())
+        labels, probas = predict_frame(model, df)
+        predicted_label = labels[0]
+        probabilities = probas[0] if probas is not None else None
         
         # Prepare response
+        input_data = {field: data[field] for field in REQUIRED_FIELDS}
+        input_data['datetime'] = datetime_str
         response = {
             'predicted_label': float(predicted_label),
-            'input_data': {
-                'X': data['X'],
-                'Y': data['Y'],
-                'Z': data['Z'],
-                'EDA': data['EDA'],
-                'HR': data['HR'],
-                'TEMP': data['TEMP'],
-                'datetime': datetime_str
-            }
+            'input_data': input_data
         }
         
         # Add probabilities if available
@@ -140,62 +208,280 @@ def predict_batch():
             {"X": -49.0, "Y": -20.0, "Z": -37.0, "EDA": 0.237, "HR": 75.78, "TEMP": 30.71}
         ]
     }
+    
+    The readings are validated in one pass and the valid ones predicted in one
+    model call. Invalid readings get an error and code in their place;
+    timing_ms reports validation, prediction and the total separately.
     """
     if model is None:
         return jsonify({'error': 'Model not loaded'}), 500
     
     try:
-        data = request.get_json()
+        t0 = time.perf_counter()
+        data = request.get_json(silent=True)
         
-        if 'data' not in data or not isinstance(data['data'], list):
+        if not isinstance(data, dict) or not isinstance(data.get('data'), list):
             return jsonify({'error': 'Expected "data" field with list of sensor readings'}), 400
         
-        predictions = []
-        for item in data['data']:
-            required_fields = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP']
-            missing = [f for f in required_fields if f not in item]
-            
-            if missing:
-                predictions.append({
-                    'error': f'Missing fields: {missing}',
-                    'input': item
-                })
-                continue
-            
-            datetime_str = item.get('datetime', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
-            
-            predicted_label, probabilities = predict_single_point(
-                model=model,
-                X=float(item['X']),
-                Y=float(item['Y']),
-                Z=float(item['Z']),
-                EDA=float(item['EDA']),
-                HR=float(item['HR']),
-                TEMP=float(item['TEMP']),
-                datetime_str=datetime_str
-            )
-            
+        items = data['data']
+        checked = validator.validate(items)
+        
+        t1 = time.perf_counter()
+        valid_rows, df = checked.valid_frame(feature_schema(model), dtype=inference_dtype())
+        labels = probas = None
+        if df is not None:
+            labels, probas = predict_frame(model, df)
+        predict_seconds = time.perf_counter() - t1
+        
+        predictions = [None] * len(items)
+        for row in checked.errors.nonzero()[0]:
+            predictions[row] = {**checked.error_details(row), 'input': items[row]}
+        for i, row in enumerate(valid_rows):
             result = {
-                'predicted_label': float(predicted_label),
-                'input_data': item
+                'predicted_label': float(labels[i]),
+                'input_data': items[row]
             }
             
-            if probabilities is not None:
+            if probas is not None:
                 result['probabilities'] = {
-                    f'class_{i}': float(prob) for i, prob in enumerate(probabilities)
+                    f'class_{j}': float(prob) for j, prob in enumerate(probas[i])
                 }
-                result['confidence'] = float(max(probabilities))
+                result['confidence'] = float(probas[i].max())
             
-            predictions.append(result)
+            predictions[row] = result
         
         return jsonify({
             'predictions': predictions,
-            'count': len(predictions)
+            'count': len(predictions),
+            'invalid': int(len(items) - len(valid_rows)),
+            'timing_ms': {
+                'validate': round(checked.seconds * 1000, 3),
+                'predict': round(predict_seconds * 1000, 3),
+                'total': round((time.perf_counter() - t0) * 1000, 3)
+            }
         }), 200
         
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/predict/ensemble', methods=['POST'])
+def predict_ensemble():
+    """
+    Predict with every ensemble model at once
+    
+    Expected JSON body: a single reading (as for /predict) or {"data": [reading, ...]},
+    optionally with:
+        "combine": "mean",                  // "mean", "weighted" or "vote"
+        "weights": {"gradient_boosting": 2}, // overrides ENSEMBLE_WEIGHTS
+        "models": ["logistic_regression"]   // subset of the ensemble
+    
+    Readings are featurized once and the models run concurrently. Each
+    prediction has per-model results plus the combined verdict; timing_ms
+    reports how long each model took for the whole request. An invalid reading
+    in a batch gets an error and code in its place; a single invalid reading
+    is rejected with 400.
+    """
+    if ensemble is None:
+        return jsonify({'error': 'Ensemble not loaded'}), 500
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    batch = isinstance(data.get('data'), list)
+    readings = data['data'] if batch else [data]
+    t0 = time.perf_counter()
+    checked = validator.validate(readings)
+    if not batch and not checked.valid[0]:
+        return jsonify(checked.error_details(0)), 400
+    
+    combine = data.get('combine', ENSEMBLE_COMBINE)
+    try:
+        t1 = time.perf_counter()
+        valid_rows, df = checked.valid_frame(ensemble.schema, dtype=inference_dtype())
+        if df is None:
+            # Nothing to score; still reject bad combine, weights or models
+            df = ensemble.schema.frame_from_matrix(checked.values[:0], checked.fields, checked.timestamps[:0])
+        featurize_seconds = time.perf_counter() - t1
+        result = ensemble.predict(df, combine=combine, weights=data.get('weights'), names=data.get('models'))
+    except (KeyError, ValueError, TypeError) as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    predictions = [None] * len(readings)
+    for row in checked.errors.nonzero()[0]:
+        predictions[row] = {**checked.error_details(row), 'input': readings[row]}
+    for k, row in enumerate(valid_rows):
+        per_model = {}
+        for name, scored in result['models'].items():
+            entry = {'predicted_label': float(scored['labels'][k])}
+            if scored['probabilities'] is not None:
+                entry['probabilities'] = {
+                    f'class_{i}': float(p) for i, p in enumerate(scored['probabilities'][k])
+                }
+                entry['confidence'] = float(scored['probabilities'][k].max())
+            per_model[name] = entry
+        combined = result['probabilities'][k]
+        predictions[row] = {
+            'predicted_label': float(result['labels'][k]),
+            'probabilities': {f'class_{i}': float(p) for i, p in enumerate(combined)},
+            'confidence': float(combined.max()),
+            'models': per_model
+        }
+    
+    response = {
+        'combine': combine,
+        'timing_ms': {
+            'validate': checked.seconds * 1000,
+            'featurize': featurize_seconds * 1000,
+            **{name: scored['seconds'] * 1000 for name, scored in result['models'].items()},
+            'total': (time.perf_counter() - t0) * 1000
+        }
+    }
+    if batch:
+        response.update({'predictions': predictions, 'count': len(predictions),
+                         'invalid': int(len(readings) - len(valid_rows))})
+    else:
+        response.update(predictions[0])
+    return jsonify(response), 200
+
+@app.route('/sessions', methods=['GET'])
+def session_stats():
+    """Open session count, eviction counters and smoothing defaults"""
+    return jsonify(sessions.stats())
+
+@app.route('/sessions', methods=['POST'])
+def open_session():
+    """
+    Open (or reset) a streaming session for a device
+    
+    Expected JSON body:
+    {
+        "device_id": "5C",
+        "smoothing": "ema",  // optional: "ema" or "vote"
+        "alpha": 0.3,        // optional: EMA weight of the newest reading
+        "window": 5          // optional: readings in the vote
+    }
+    """
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    device_id = data.get('device_id')
+    if device_id is None:
+        return jsonify({'error': 'Missing required field: device_id'}), 400
+    options = {}
+    for name, convert, kind in (('alpha', float, 'a number'), ('window', int, 'an integer')):
+        value = data.get(name)
+        if value is None:
+            continue
+        try:
+            options[name] = convert(value)
+        except (TypeError, ValueError):
+            return jsonify({'error': f'{name} must be {kind}, got {value!r}'}), 400
+        if isinstance(value, bool) or (isinstance(value, float) and options[name] != value):
+            return jsonify({'error': f'{name} must be {kind}, got {value!r}'}), 400
+    try:
+        session = sessions.open(str(device_id), smoothing=data.get('smoothing'), **options)
+    except (TypeError, ValueError) as e:
+        return jsonify({'error': str(e)}), 400
+    return jsonify(session.describe()), 201
+
+@app.route('/sessions/<device_id>', methods=['GET'])
+def get_session(device_id):
+    """Describe a device's session"""
+    session = sessions.get(device_id)
+    if session is None:
+        return jsonify({'error': f'No open session for device {device_id}'}), 404
+    return jsonify(session.describe())
+
+@app.route('/sessions/<device_id>', methods=['DELETE'])
+def close_session(device_id):
+    """Close a device's session"""
+    if not sessions.close(device_id):
+        return jsonify({'error': f'No open session for device {device_id}'}), 404
+    return jsonify({'closed': device_id})
+
+@app.route('/sessions/<device_id>/readings', methods=['POST'])
+def session_readings(device_id):
+    """
+    Predict readings in a device's session and smooth the class probabilities
+    
+    Expected JSON body: a single reading (as for /predict) or
+    {"data": [reading, ...]} with readings in time order.
+    Each result adds smoothed_label, smoothed_probabilities and smoothed_confidence.
+    An invalid reading in a batch gets an error and code in its place and does
+    not update the session; a single invalid reading is rejected with 400.
+    """
+    if model is None:
+        return jsonify({'error': 'Model not loaded'}), 500
+    
+    session = sessions.get(device_id)
+    if session is None:
+        return jsonify({'error': f'No open session for device {device_id} (open one with POST /sessions)'}), 404
+    
+    data = request.get_json(silent=True)
+    if not isinstance(data, dict):
+        return jsonify({'error': 'Expected a JSON object'}), 400
+    batch = isinstance(data.get('data'), list)
+    readings = data['data'] if batch else [data]
+    checked = validator.validate(readings)
+    if not batch and not checked.valid[0]:
+        return jsonify(checked.error_details(0)), 400
+    
+    if not hasattr(model, 'predict_proba'):
+        return jsonify({'error': 'Model does not provide probabilities for smoothing'}), 500
+    try:
+        valid_rows, df = checked.valid_frame(feature_schema(model), dtype=inference_dtype())
+        labels, probas = predict_frame(model, df) if df is not None else ([], [])
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+    
+    classes = model.classes_
+    results = [None] * len(readings)
+    for row in checked.errors.nonzero()[0]:
+        results[row] = {**checked.error_details(row), 'input': readings[row]}
+    with session.lock:
+        for row, label, proba in zip(valid_rows, labels, probas):
+            smoothed_index, smoothed = session.update(proba)
+            results[row] = {
+                'predicted_label': float(label),
+                'probabilities': {f'class_{i}': float(p) for i, p in enumerate(proba)},
+                'confidence': float(proba.max()),
+                'smoothed_label': float(classes[smoothed_index]),
+                'smoothed_probabilities': {f'class_{i}': float(p) for i, p in enumerate(smoothed)},
+                'smoothed_confidence': float(smoothed[smoothed_index])
+            }
+    
+    return jsonify({
+        'device_id': device_id,
+        'smoothing': session.smoothing,
+        'readings': session.readings,
+        'predictions': results,
+        'count': len(results),
+        'invalid': int(len(readings) - len(valid_rows))
+    }), 200
+
+def _warmup_steps():
+    """Representative single, batch and ensemble requests through the full request path"""
+    client = app.test_client()
+    readings = synthetic_readings(warmup.batch_size)
+
+    def post(path, payload):
+        def step():
+            response = client.post(path, json=payload)
+            if response.status_code != 200:
+                raise RuntimeError(f"{path} returned {response.status_code}: {response.get_json()}")
+        return step
+
+    steps = [('predict', post('/predict', readings[0])),
+             ('predict_batch', post('/predict/batch', {'data': readings}))]
+    if ensemble is not None:
+        steps.append(('predict_ensemble', post('/predict/ensemble', {'data': readings})))
+    return steps
+
+if model is not None:
+    warmup.start(_warmup_steps())
+
 if __name__ == '__main__':
     port = int(os.getenv('PORT', 5000))
     app.run(host='0.0.0.0', port=port, debug=False)
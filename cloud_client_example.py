@@ -1,14 +1,23 @@
 """
 Example: Call your cloud ML API from anywhere
 """
-import requests
-import json
+from stress_client import StressClient, StressAPIError
 
 # Your cloud API URL (update this after deployment)
 API_URL = "http://localhost:5000"  # Local
 # API_URL = "https://your-app.herokuapp.com"  # Heroku
 # API_URL = "https://your-api.run.app"  # Google Cloud
 
+# One client per process: it keeps connections open between calls
+_client = None
+
+def get_client():
+    """Shared StressClient for API_URL (pooled connections, retries, latency stats)"""
+    global _client
+    if _client is None:
+        _client = StressClient(API_URL, timeout=5)
+    return _client
+
 def predict_from_cloud(sensor_data):
     """
     Send sensor data to cloud API and get prediction
@@ -16,13 +25,9 @@ def predict_from_cloud(sensor_data):
     Parameters:
     - sensor_data: dict with X, Y, Z, EDA, HR, TEMP
     """
-    url = f"{API_URL}/predict"
-    
     try:
-        response = requests.post(url, json=sensor_data, timeout=5)
-        response.raise_for_status()
-        return response.json()
-    except requests.exceptions.RequestException as e:
+        return get_client().predict(sensor_data)
+    except StressAPIError as e:
         print(f"Error calling API: {e}")
         return None
 
@@ -51,4 +56,12 @@ if __name__ == "__main__":
             print(f"  Probabilities: {result['probabilities']}")
     else:
         print("Failed to get prediction")
+    
+    # Many readings: one /predict/batch request per 100 readings over the same connection
+    try:
+        results = get_client().predict_batch([sensor_data] * 250)
+        print(f"\nBatch of {len(results)} predictions, latency stats: {get_client().stats()}")
+    except StressAPIError as e:
+        print(f"Error calling API: {e}")
+    get_client().close()
 
@@ -0,0 +1,727 @@
+"""
+Compiled Models
+Converts fitted scikit-learn pipelines (StandardScaler prep + estimator) into
+plain NumPy array evaluators with the same predict/predict_proba interface.
+predict.load_model uses them automatically (set COMPILED_MODELS=0 to disable).
+
+Supported estimators:
+- GradientBoostingClassifier: all trees flattened into contiguous node arrays
+  and evaluated for a whole batch at once
+- MLPClassifier: float32 forward pass through preallocated per-thread buffers
+- LogisticRegression: scaler folded into the coefficients (one matrix product)
+
+Scaler -> linear chains (logistic regression, the MLP's first layer) are
+constant-folded at load time: the StandardScaler costs nothing per call.
+
+Usage:
+    python compiled_models.py --check        # parity against sklearn for every model
+    python compiled_models.py --benchmark    # latency at batch sizes 1 and 10000
+    python compiled_models.py --export mlp_classifier.joblib   # -> models/mlp_classifier.npz
+"""
+import argparse
+import copy
+import os
+import threading
+import time
+
+import numpy as np
+
+# sklearn is deliberately not imported here: compiling only reads fitted attributes,
+# and serving a compiled model never calls into sklearn.
+
+
+def _type_name(obj):
+    return type(obj).__name__
+
+
+def _softmax(raw):
+    raw = raw - raw.max(axis=1, keepdims=True)
+    np.exp(raw, out=raw)
+    raw /= raw.sum(axis=1, keepdims=True)
+    return raw
+
+
+def fold_standard_scaler(weights, bias, mean, scale):
+    """
+    Fold a StandardScaler into the affine layer after it
+
+    ((x - mean) / scale) @ weights + bias == x @ folded_weights + folded_bias
+
+    Parameters:
+    - weights: (n_features, n_outputs) matrix; bias: (n_outputs,)
+
+    Returns (folded_weights, folded_bias) in float64
+    """
+    weights = np.asarray(weights, dtype=np.float64) / np.asarray(scale, dtype=np.float64)[:, None]
+    bias = np.asarray(bias, dtype=np.float64) - np.asarray(mean, dtype=np.float64) @ weights
+    return weights, bias
+
+
+class LinearKernel:
+    """
+    Logistic regression with the scaler folded into its coefficients
+
+    Scoring is one matrix product plus the link function (sigmoid or softmax)
+    per batch; the scaler costs nothing at inference time.
+    """
+
+    kind = 'linear'
+    tolerance = 1e-9
+
+    def __init__(self, weights, bias, link, dtype=np.float64):
+        if link not in ('softmax', 'logistic', 'ovr'):
+            raise ValueError(f"Unsupported link: {link}")
+        self.dtype = np.dtype(dtype)
+        self.weights = np.ascontiguousarray(weights, dtype=self.dtype)
+        self.bias = np.asarray(bias, dtype=self.dtype)
+        self.link = link
+
+    @classmethod
+    def from_sklearn(cls, estimator, mean, scale):
+        """Fold the scaler into a fitted LogisticRegression; None if it cannot be compiled"""
+        n_classes = len(estimator.classes_)
+        if n_classes == 2:
+            link = 'logistic'
+        elif estimator.multi_class == 'ovr' or (estimator.multi_class in ('auto', 'deprecated')
+                                               and estimator.solver == 'liblinear'):
+            link = 'ovr'
+        else:
+            link = 'softmax'
+        weights, bias = fold_standard_scaler(estimator.coef_.T, estimator.intercept_, mean, scale)
+        return cls(weights, bias, link)
+
+    def to_arrays(self):
+        """Arrays (and scalars) that rebuild this kernel with from_arrays"""
+        return {'weights': self.weights, 'bias': self.bias, 'link': self.link}
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays['weights'], arrays['bias'], str(arrays['link']), dtype=arrays['weights'].dtype)
+
+    def with_dtype(self, dtype):
+        """The same model computing (and returning probabilities) in dtype"""
+        return LinearKernel(self.weights, self.bias, self.link, dtype=dtype)
+
+    def decision_function(self, X):
+        """Raw scores of unscaled inputs, as the pipeline's decision_function"""
+        raw = np.asarray(X, dtype=self.dtype) @ self.weights
+        raw += self.bias
+        return raw
+
+    def predict_proba(self, X):
+        raw = self.decision_function(X)
+        if self.link == 'softmax':
+            return _softmax(raw)
+        positive = 1.0 / (1.0 + np.exp(-raw))
+        if self.link == 'logistic':
+            return np.column_stack([1.0 - positive[:, 0], positive[:, 0]])
+        # One-vs-rest: per-class sigmoids normalized to sum to 1
+        return positive / positive.sum(axis=1, keepdims=True)
+
+
+class TreeEnsembleKernel:
+    """
+    Vectorized evaluator for a fitted GradientBoostingClassifier
+
+    The nodes of all trees live in flat arrays (feature, threshold, left, right,
+    value; leaves have left == right == -1), tree t starting at roots[t] and
+    belonging to output t % n_outputs.
+
+    Evaluation follows QuickScorer: each split that sends a row right rules out
+    the leaves of its left subtree, and the exit leaf of a tree is the leftmost
+    leaf not ruled out. Per feature, splits are sorted by threshold, so the
+    splits a row goes right at are a prefix found with one searchsorted, and the
+    leaf bitmasks of every prefix are precomputed. Scoring a batch is then one
+    table lookup per feature and an AND across features for all trees at once.
+    """
+
+    kind = 'trees'
+    # Rows per evaluation chunk (keeps the per-tree bitmasks in cache)
+    chunk_size = 1024
+    # Largest expected difference from sklearn's predict_proba
+    tolerance = 1e-9
+    # Precision of the scaling step and of the returned probabilities
+    dtype = np.dtype(np.float64)
+
+    def __init__(self, mean, scale, feature, threshold, left, right, value, roots, init_raw, learning_rate,
+                 n_outputs, tables=None):
+        self.mean = mean
+        self.scale = scale
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.value = value
+        self.roots = roots
+        self.init_raw = init_raw
+        self.learning_rate = learning_rate
+        self.n_outputs = n_outputs
+        if tables is None:
+            self._build_tables()
+        else:
+            self._load_tables(tables)
+
+    @classmethod
+    def from_sklearn(cls, estimator, mean, scale):
+        """Flatten a fitted GradientBoostingClassifier behind a StandardScaler; None if it cannot be compiled"""
+        if estimator.loss not in ('log_loss', 'deviance'):
+            return None
+        n_features = estimator.n_features_in_
+        init = estimator.init_
+        if init == 'zero':
+            init_raw = np.zeros(estimator.estimators_.shape[1])
+        elif _type_name(init) == 'DummyClassifier' and init.strategy == 'prior':
+            # The prior does not depend on the input
+            init_raw = estimator._raw_predict_init(np.zeros((1, n_features), dtype=np.float32))[0]
+        else:
+            return None
+        if max(tree.tree_.n_leaves for tree in estimator.estimators_.ravel()) > 64:
+            return None
+
+        features, thresholds, lefts, rights, values, roots = [], [], [], [], [], []
+        offset = 0
+        # Trees in stage-major order, as estimators_.ravel()
+        for tree in estimator.estimators_.ravel():
+            t = tree.tree_
+            leaf = t.children_left < 0
+            features.append(np.where(leaf, -2, t.feature))
+            thresholds.append(t.threshold)
+            lefts.append(np.where(leaf, -1, t.children_left + offset))
+            rights.append(np.where(leaf, -1, t.children_right + offset))
+            values.append(t.value.reshape(t.node_count))
+            roots.append(offset)
+            offset += t.node_count
+
+        return cls(
+            mean=np.asarray(mean, dtype=np.float64),
+            scale=np.asarray(scale, dtype=np.float64),
+            feature=np.concatenate(features).astype(np.int32),
+            threshold=np.concatenate(thresholds).astype(np.float64),
+            left=np.concatenate(lefts).astype(np.int32),
+            right=np.concatenate(rights).astype(np.int32),
+            value=np.concatenate(values).astype(np.float64),
+            roots=np.array(roots, dtype=np.int32),
+            init_raw=np.asarray(init_raw, dtype=np.float64),
+            learning_rate=float(estimator.learning_rate),
+            n_outputs=estimator.estimators_.shape[1]
+        )
+
+    TABLE_KEYS = ('table_features', 'table_offsets', 'table_thresholds', 'table_masks', 'all_leaves',
+                  'exit_values', 'exit_offsets', 'small_trees')
+
+    def to_arrays(self, tables=False):
+        """
+        Arrays (and scalars) that rebuild this kernel with from_arrays
+
+        With tables=True the derived evaluation tables are included too, so
+        loading skips rebuilding them (about 12 ms for gradient_boosting).
+        """
+        arrays = {
+            'mean': self.mean, 'scale': self.scale, 'feature': self.feature, 'threshold': self.threshold,
+            'left': self.left, 'right': self.right, 'value': self.value, 'roots': self.roots,
+            'init_raw': self.init_raw, 'learning_rate': self.learning_rate, 'n_outputs': self.n_outputs
+        }
+        if tables:
+            row_counts = [len(masks) for masks in self._masks]
+            n_trees = len(self.roots)
+            arrays.update({
+                'table_features': np.array(self._features, dtype=np.int32),
+                'table_offsets': np.concatenate([[0], np.cumsum(row_counts)]).astype(np.int64),
+                'table_thresholds': np.concatenate(self._thresholds or [np.empty(0)]),
+                'table_masks': (np.concatenate(self._masks) if self._masks
+                                else np.empty((0, n_trees), dtype=self._all_leaves.dtype)),
+                'all_leaves': self._all_leaves,
+                'exit_values': self._exit_values,
+                'exit_offsets': self._exit_offsets,
+                'small_trees': self._small_trees
+            })
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        arrays = dict(arrays)
+        arrays['learning_rate'] = float(arrays['learning_rate'])
+        arrays['n_outputs'] = int(arrays['n_outputs'])
+        if all(name in arrays for name in cls.TABLE_KEYS):
+            arrays['tables'] = {name: arrays.pop(name) for name in cls.TABLE_KEYS}
+        return cls(**arrays)
+
+    def _load_tables(self, tables):
+        """Use evaluation tables saved by to_arrays(tables=True) (views, no copies)"""
+        offsets = tables['table_offsets']
+        self._features = [int(feature) for feature in tables['table_features']]
+        # Each feature has one more mask row than thresholds
+        self._masks = [tables['table_masks'][offsets[i]:offsets[i + 1]] for i in range(len(self._features))]
+        self._thresholds = [tables['table_thresholds'][offsets[i] - i:offsets[i + 1] - i - 1]
+                            for i in range(len(self._features))]
+        self._all_leaves = tables['all_leaves']
+        self._exit_values = tables['exit_values']
+        self._exit_offsets = tables['exit_offsets']
+        self._small_trees = bool(tables['small_trees'])
+
+    def _build_tables(self):
+        """Derive the per-feature threshold lists and prefix bitmask tables from the node arrays"""
+        n_trees = len(self.roots)
+        # Output-major tree order, so each output's trees are summed over a contiguous axis
+        order = np.arange(n_trees).reshape(-1, self.n_outputs).T.ravel()
+
+        splits = {}  # feature -> [(threshold, tree position, leaves of the left subtree)]
+        leaf_values = []
+
+        def number_leaves(node, position, leaves):
+            """Append the subtree's leaf values left to right; returns its leaf index range"""
+            if self.left[node] < 0:
+                leaves.append(self.value[node])
+                return len(leaves) - 1, len(leaves)
+            first, middle = number_leaves(self.left[node], position, leaves)
+            _, end = number_leaves(self.right[node], position, leaves)
+            splits.setdefault(int(self.feature[node]), []).append(
+                (self.threshold[node], position, (1 << middle) - (1 << first)))
+            return first, end
+
+        for position, tree in enumerate(order):
+            leaves = []
+            number_leaves(int(self.roots[tree]), position, leaves)
+            leaf_values.append(leaves)
+
+        max_leaves = max(len(leaves) for leaves in leaf_values)
+        dtype = next(t for t, bits in ((np.uint8, 8), (np.uint16, 16), (np.uint32, 32), (np.uint64, 64))
+                     if max_leaves <= bits)
+        all_leaves = (1 << max_leaves) - 1
+
+        self._features = sorted(splits)
+        self._thresholds = []
+        self._masks = []
+        for feature in self._features:
+            feature_splits = sorted(splits[feature], key=lambda split: split[0])
+            # Row j: leaves still possible after going right at the j smallest thresholds
+            table = np.full((len(feature_splits) + 1, n_trees), all_leaves, dtype=dtype)
+            for j, (_, position, left_leaves) in enumerate(feature_splits):
+                table[j + 1:, position] &= dtype(all_leaves & ~left_leaves)
+            self._thresholds.append(np.array([split[0] for split in feature_splits], dtype=np.float64))
+            self._masks.append(table)
+        self._all_leaves = np.full(n_trees, all_leaves, dtype=dtype)
+
+        values = np.zeros((n_trees, max_leaves))
+        for position, leaves in enumerate(leaf_values):
+            values[position, :len(leaves)] = leaves
+        self._small_trees = max_leaves <= 8
+        if self._small_trees:
+            # Small trees: look the exit value up by (tree, bitmask) directly
+            lowest_leaf = np.array([(m & -m).bit_length() - 1 if m else 0 for m in range(256)])
+            self._exit_values = values[:, lowest_leaf].ravel()
+            self._exit_offsets = np.arange(n_trees) * 256
+        else:
+            self._exit_values = values.ravel()
+            self._exit_offsets = np.arange(n_trees) * max_leaves
+
+    def decision_function(self, X):
+        """Raw scores (n, n_outputs) of unscaled inputs, as the pipeline's decision_function"""
+        # Scale as StandardScaler does; sklearn's trees then compare float32 inputs against
+        # float64 thresholds
+        X = np.asarray(X, dtype=self.dtype)
+        mean, scale = (self.mean, self.scale) if self.dtype == np.float64 else (self._mean32, self._scale32)
+        X = ((X - mean) / scale).astype(np.float32).astype(np.float64)
+        n = len(X)
+        raw = np.empty((n, self.n_outputs))
+        for start in range(0, n, self.chunk_size):
+            rows = X[start:start + self.chunk_size]
+            remaining = np.broadcast_to(self._all_leaves, (len(rows), len(self._all_leaves))).copy()
+            for feature, thresholds, masks in zip(self._features, self._thresholds, self._masks):
+                # A row goes right at every split with threshold < x
+                np.bitwise_and(remaining, masks.take(np.searchsorted(thresholds, rows[:, feature]), axis=0),
+                               out=remaining)
+            if self._small_trees:
+                exit_values = self._exit_values.take(remaining + self._exit_offsets)
+            else:
+                lowest = remaining & (~remaining + 1)
+                exit_leaves = np.log2(lowest.astype(np.float64)).astype(np.intp)
+                exit_values = self._exit_values.take(exit_leaves + self._exit_offsets)
+            raw[start:start + len(rows)] = exit_values.reshape(len(rows), self.n_outputs, -1).sum(axis=2)
+        return self.init_raw + self.learning_rate * raw
+
+    def with_dtype(self, dtype):
+        """
+        The same model scaling inputs and returning probabilities in dtype
+
+        Split comparisons are unchanged (sklearn already compares in float32);
+        float32 scaling can move inputs within rounding of a threshold.
+        """
+        kernel = copy.copy(self)  # shares the node arrays and tables
+        kernel.dtype = np.dtype(dtype)
+        kernel._mean32 = self.mean.astype(np.float32)
+        kernel._scale32 = self.scale.astype(np.float32)
+        return kernel
+
+    def predict_proba(self, X):
+        raw = self.decision_function(X)
+        if self.n_outputs == 1:
+            positive = 1.0 / (1.0 + np.exp(-raw[:, 0]))
+            return np.column_stack([1.0 - positive, positive]).astype(self.dtype, copy=False)
+        return _softmax(raw).astype(self.dtype, copy=False)
+
+
+class MLPKernel:
+    """
+    Forward pass of a fitted MLPClassifier with float32 weights
+
+    The scaler is folded into the first layer and the weights are stored as
+    float32. Each thread keeps
+    preallocated activation buffers for chunk_size rows, so scoring a row or a
+    batch allocates nothing but the returned probabilities. Batches larger than
+    chunk_size are run chunk by chunk through the same buffers.
+    """
+
+    kind = 'mlp'
+    chunk_size = 1024
+    # float32 weights: probabilities differ from sklearn's float64 pass by ~1e-6
+    tolerance = 1e-4
+
+    ACTIVATIONS = ('identity', 'logistic', 'tanh', 'relu')
+
+    def __init__(self, coefs, intercepts, activation, out_activation, dtype=np.float32, output_dtype=np.float64):
+        if activation not in self.ACTIVATIONS or out_activation not in ('softmax', 'logistic'):
+            raise ValueError(f"Unsupported activations: {activation}, {out_activation}")
+        self.dtype = np.dtype(dtype)
+        self.output_dtype = np.dtype(output_dtype)
+        self.coefs = [np.ascontiguousarray(coef, dtype=self.dtype) for coef in coefs]
+        self.intercepts = [np.asarray(intercept, dtype=self.dtype) for intercept in intercepts]
+        self.activation = activation
+        self.out_activation = out_activation
+        self.n_classes = 2 if out_activation == 'logistic' else self.coefs[-1].shape[1]
+        self._local = threading.local()
+
+    @classmethod
+    def from_sklearn(cls, estimator, mean, scale):
+        """Extract a fitted MLPClassifier's weights; None if it cannot be compiled"""
+        if estimator.out_activation_ not in ('softmax', 'logistic') or estimator.activation not in cls.ACTIVATIONS:
+            return None
+        # The scaler folds into the first layer (in float64, before the cast to float32)
+        coefs, intercepts = list(estimator.coefs_), list(estimator.intercepts_)
+        coefs[0], intercepts[0] = fold_standard_scaler(coefs[0], intercepts[0], mean, scale)
+        return cls(coefs, intercepts, estimator.activation, estimator.out_activation_)
+
+    def to_arrays(self):
+        """Arrays (and scalars) that rebuild this kernel with from_arrays"""
+        arrays = {'activation': self.activation, 'out_activation': self.out_activation,
+                  'n_layers': len(self.coefs)}
+        for i, (coef, intercept) in enumerate(zip(self.coefs, self.intercepts)):
+            arrays[f'coef_{i}'] = coef
+            arrays[f'intercept_{i}'] = intercept
+        return arrays
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        n_layers = int(arrays['n_layers'])
+        return cls([arrays[f'coef_{i}'] for i in range(n_layers)],
+                   [arrays[f'intercept_{i}'] for i in range(n_layers)],
+                   str(arrays['activation']), str(arrays['out_activation']),
+                   dtype=arrays['coef_0'].dtype)
+
+    def _buffers(self):
+        """This thread's activation buffers: one per layer and a row-reduction column"""
+        buffers = getattr(self._local, 'buffers', None)
+        if buffers is None:
+            widths = [coef.shape[1] for coef in self.coefs] + [1]
+            buffers = self._local.buffers = [np.empty((self.chunk_size, width), dtype=self.dtype)
+                                             for width in widths]
+        return buffers
+
+    @staticmethod
+    def _logistic(h):
+        np.negative(h, out=h)
+        np.exp(h, out=h)
+        h += 1
+        np.reciprocal(h, out=h)
+
+    def _activate(self, h):
+        if self.activation == 'relu':
+            np.maximum(h, 0, out=h)
+        elif self.activation == 'tanh':
+            np.tanh(h, out=h)
+        elif self.activation == 'logistic':
+            self._logistic(h)
+
+    def _forward(self, X, out):
+        """Run up to chunk_size rows of X through the network into out (n, n_classes)"""
+        n = len(X)
+        buffers = self._buffers()
+        h = X.astype(self.dtype, copy=False)
+        last = len(self.coefs) - 1
+        for i, (coef, intercept) in enumerate(zip(self.coefs, self.intercepts)):
+            nxt = buffers[i][:n]
+            np.matmul(h, coef, out=nxt)
+            nxt += intercept
+            if i < last:
+                self._activate(nxt)
+            h = nxt
+
+        if self.out_activation == 'logistic':
+            self._logistic(h)
+            out[:, 1] = h[:, 0]
+            np.subtract(1.0, out[:, 1], out=out[:, 0])
+            return
+        column = buffers[-1][:n]
+        np.max(h, axis=1, keepdims=True, out=column)
+        h -= column
+        np.exp(h, out=h)
+        np.sum(h, axis=1, keepdims=True, out=column)
+        h /= column
+        out[...] = h
+
+    def with_dtype(self, dtype):
+        """The same network returning probabilities in dtype (the weights stay float32)"""
+        kernel = copy.copy(self)  # shares weights and per-thread buffers
+        kernel.output_dtype = np.dtype(dtype)
+        return kernel
+
+    def predict_proba(self, X):
+        X = np.asarray(X)
+        proba = np.empty((len(X), self.n_classes), dtype=self.output_dtype)
+        for start in range(0, len(X), self.chunk_size):
+            self._forward(X[start:start + self.chunk_size], proba[start:start + self.chunk_size])
+        return proba
+
+
+# Bundle kind -> kernel class (see save_bundle)
+KERNEL_KINDS = {
+    'linear': LinearKernel,
+    'trees': TreeEnsembleKernel,
+    'mlp': MLPKernel,
+}
+
+# Estimator class name -> kernel builder(estimator, mean, scale); builders return None
+# when the fitted model is not supported
+KERNEL_BUILDERS = {
+    'LogisticRegression': LinearKernel.from_sklearn,
+    'GradientBoostingClassifier': TreeEnsembleKernel.from_sklearn,
+    'MLPClassifier': MLPKernel.from_sklearn,
+}
+
+
+class CompiledPipeline:
+    """
+    Array-based stand-in for a fitted Pipeline(prep=ColumnTransformer(StandardScaler), model=...)
+
+    Parameters:
+    - source: The original sklearn pipeline (attributes not defined here are read from it),
+      or None for a model loaded from a bundle
+    - columns: Input column names, in the order the scaler expects
+    - kernel: Evaluator with predict_proba(X) for unscaled X (it applies the scaler itself)
+    - classes: Class labels
+    - dtype: Precision of the input matrix and probabilities (see with_dtype)
+    """
+
+    def __init__(self, source, columns, kernel, classes, dtype=np.float64):
+        self.dtype = np.dtype(dtype)
+        self.source = source
+        self.columns = list(columns)
+        self._column_key = tuple(self.columns)
+        self.kernel = kernel
+        self.classes_ = np.asarray(classes)
+        self.feature_names_in_ = np.array(self.columns, dtype=object)
+
+    def __getattr__(self, name):
+        # Only called for attributes missing on the compiled model (e.g. named_steps)
+        if name == 'source' or self.source is None:
+            raise AttributeError(name)
+        return getattr(self.source, name)
+
+    def with_dtype(self, dtype):
+        """
+        The same model computing in dtype end to end
+
+        np.float32 halves the memory traffic of large batches: the input matrix,
+        the linear/scaling arithmetic and the returned probabilities are float32.
+        """
+        return CompiledPipeline(self.source, self.columns, self.kernel.with_dtype(dtype), self.classes_, dtype=dtype)
+
+    def _matrix(self, X):
+        """Select the scaler's columns from a DataFrame (or take an array as-is) in self.dtype"""
+        if hasattr(X, 'columns'):
+            if tuple(X.columns) == self._column_key:
+                # Already in model order (feature_schema frames): no column selection
+                return X.to_numpy(dtype=self.dtype)
+            positions = X.columns.get_indexer(self.columns)
+            if (positions < 0).any():
+                missing = [col for col, pos in zip(self.columns, positions) if pos < 0]
+                raise ValueError(f"columns are missing: {set(missing)}")
+            try:
+                # One conversion of the whole frame is much cheaper than selecting columns first
+                return X.to_numpy(dtype=self.dtype)[:, positions]
+            except (TypeError, ValueError):
+                # Extra non-numeric columns (e.g. an id) are ignored, as by the ColumnTransformer
+                return X.iloc[:, positions].to_numpy(dtype=self.dtype)
+        X = np.asarray(X, dtype=self.dtype)
+        return X.reshape(1, -1) if X.ndim == 1 else X
+
+    def predict_proba(self, X):
+        return self.kernel.predict_proba(self._matrix(X))
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def _standard_scaler_prep(prep):
+    """(columns, mean, scale) of a ColumnTransformer applying one StandardScaler; None otherwise"""
+    if _type_name(prep) != 'ColumnTransformer':
+        return None
+    transformers = [t for t in prep.transformers_ if t[1] != 'drop' and t[0] != 'remainder']
+    remainder = [t for t in prep.transformers_ if t[0] == 'remainder' and t[1] != 'drop']
+    if len(transformers) != 1 or remainder:
+        return None
+    _, scaler, columns = transformers[0]
+    if _type_name(scaler) != 'StandardScaler' or not all(isinstance(c, str) for c in columns):
+        return None
+    mean = scaler.mean_ if scaler.mean_ is not None else np.zeros(len(columns))
+    scale = scaler.scale_ if scaler.scale_ is not None else np.ones(len(columns))
+    return list(columns), mean, scale
+
+
+def compile_model(model):
+    """
+    Compile a fitted pipeline into a CompiledPipeline
+
+    Returns None when the pipeline is not of a supported shape (callers keep the
+    sklearn model in that case).
+    """
+    steps = getattr(model, 'steps', None)
+    if not steps or len(steps) != 2:
+        return None
+    prep = _standard_scaler_prep(steps[0][1])
+    estimator = steps[1][1]
+    builder = KERNEL_BUILDERS.get(_type_name(estimator))
+    if prep is None or builder is None:
+        return None
+    columns, mean, scale = prep
+    kernel = builder(estimator, mean, scale)
+    if kernel is None:
+        return None
+    return CompiledPipeline(model, columns, kernel, estimator.classes_)
+
+
+def save_bundle(compiled, path):
+    """
+    Save a compiled model as a compact .npz weight bundle
+
+    The bundle holds only arrays (input columns, classes and the kernel's
+    weights), so loading it needs neither sklearn nor pickle.
+    """
+    np.savez(path, kind=compiled.kernel.kind, columns=np.array(compiled.columns),
+             classes=compiled.classes_, **compiled.kernel.to_arrays())
+
+
+def load_bundle(path):
+    """Load a CompiledPipeline saved by save_bundle"""
+    with np.load(path, allow_pickle=False) as data:
+        arrays = {key: data[key] for key in data.files}
+    kernel_class = KERNEL_KINDS[str(arrays.pop('kind'))]
+    columns = [str(col) for col in arrays.pop('columns')]
+    classes = arrays.pop('classes')
+    return CompiledPipeline(None, columns, kernel_class.from_arrays(arrays), classes)
+
+
+def export(model_file, model_dir='models', out=None):
+    """Compile a joblib model and write its bundle (default: next to it as .npz); returns the path"""
+    import joblib
+
+    compiled = compile_model(joblib.load(os.path.join(model_dir, model_file)))
+    if compiled is None:
+        raise ValueError(f"{model_file} cannot be compiled")
+    out = out or os.path.join(model_dir, model_file.replace('.joblib', '.npz'))
+    save_bundle(compiled, out)
+    print(f"Exported {model_file} -> {out} ({os.path.getsize(out) / 1024:.1f} KB)")
+    return out
+
+
+def _sample_frame(n, seed=0):
+    """Synthetic readings in the training data's ranges"""
+    import pandas as pd
+    from predict import readings_to_frame
+
+    rng = np.random.default_rng(seed)
+    datetimes = pd.Timestamp('2020-05-08') + pd.to_timedelta(rng.integers(0, 90 * 86400, n), unit='s')
+    readings = {
+        'X': rng.normal(0, 30, n), 'Y': rng.normal(0, 30, n), 'Z': rng.normal(0, 30, n),
+        'EDA': rng.gamma(2.0, 0.5, n), 'HR': rng.normal(80, 10, n), 'TEMP': rng.normal(31, 1.5, n),
+        'datetime': datetimes.strftime('%Y-%m-%d %H:%M:%S')
+    }
+    return readings_to_frame([dict(zip(readings, row)) for row in zip(*readings.values())])
+
+
+def _model_files(model_dir):
+    return sorted(f for f in os.listdir(model_dir) if f.endswith('.joblib'))
+
+
+def check(model_dir='models', n=5000):
+    """Compare compiled and sklearn probabilities for every compilable model"""
+    import joblib
+
+    df = _sample_frame(n)
+    ok = True
+    for file_name in _model_files(model_dir):
+        model = joblib.load(os.path.join(model_dir, file_name))
+        compiled = compile_model(model)
+        if compiled is None:
+            print(f"{file_name:<32} not compiled (unsupported)")
+            continue
+        expected = model.predict_proba(df)
+        actual = compiled.predict_proba(df)
+        tolerance = compiled.kernel.tolerance
+        error = float(np.abs(actual - expected).max())
+        # Labels must agree unless sklearn's top two classes are within the tolerance
+        top2 = np.sort(expected, axis=1)[:, -2:]
+        clear = top2[:, 1] - top2[:, 0] > tolerance
+        same_labels = bool(np.array_equal(compiled.predict(df)[clear], model.predict(df)[clear]))
+        ok &= error < tolerance and same_labels
+        print(f"{file_name:<32} max |dp| = {error:.2e}  labels match: {same_labels}")
+    return ok
+
+
+def benchmark(model_dir='models', batch_sizes=(1, 10000), repeats=None):
+    """Time sklearn vs compiled predict_proba per model and batch size"""
+    import joblib
+
+    print(f"{'model':<24}{'batch':>7}{'sklearn':>14}{'compiled':>14}{'speedup':>9}{'rows/s':>13}")
+    for file_name in _model_files(model_dir):
+        model = joblib.load(os.path.join(model_dir, file_name))
+        compiled = compile_model(model)
+        if compiled is None:
+            continue
+        for batch_size in batch_sizes:
+            df = _sample_frame(batch_size)
+            runs = repeats or max(3, min(300, 30000 // batch_size))
+            timings = []
+            for predictor in (model, compiled):
+                predictor.predict_proba(df)  # warm up
+                t0 = time.perf_counter()
+                for _ in range(runs):
+                    predictor.predict_proba(df)
+                timings.append((time.perf_counter() - t0) / runs)
+            print(f"{file_name.replace('.joblib', ''):<24}{batch_size:>7}"
+                  f"{timings[0] * 1000:>12.3f}ms{timings[1] * 1000:>12.3f}ms{timings[0] / timings[1]:>8.1f}x"
+                  f"{batch_size / timings[1]:>13,.0f}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Check or benchmark compiled models")
+    ap.add_argument("--model_dir", type=str, default="models", help="Directory with joblib models")
+    ap.add_argument("--check", action="store_true", help="Parity check against sklearn")
+    ap.add_argument("--benchmark", action="store_true", help="Latency at batch sizes 1 and 10000")
+    ap.add_argument("--export", type=str, default=None,
+                    help="Write the compiled weight bundle of a model (e.g. mlp_classifier.joblib)")
+    ap.add_argument("--out", type=str, default=None, help="Bundle path for --export")
+    args = ap.parse_args()
+
+    if not (args.check or args.benchmark or args.export):
+        ap.error("choose --check, --benchmark and/or --export")
+    if args.export:
+        export(args.export, args.model_dir, args.out)
+    if args.check and not check(args.model_dir):
+        raise SystemExit("Compiled models differ from sklearn")
+    if args.benchmark:
+        benchmark(args.model_dir)
+
+
+if __name__ == "__main__":
+    main()
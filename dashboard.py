@@ -3,27 +3,46 @@ Real-time Dashboard for Sensor Data and Stress Prediction
 Displays sensor readings and predictions from all models
 """
 import dash
-from dash import dcc, html, Input, Output
+from dash import dcc, html, Input, Output, State, Patch, no_update
 import plotly.graph_objs as go
 import pandas as pd
 import json
 import os
+import atexit
 from datetime import datetime
+import threading
 import time
 from predict import load_model, predict_single_point
-from firebase_config import initialize_firebase, save_stress_event, get_stress_events
+from firebase_config import (initialize_firebase, configure_event_store, start_event_writer,
+                             start_event_buffer, enqueue_stress_event, get_stress_events,
+                             get_event_pipeline_metrics)
+from inference_worker import InferenceWorker
+from downsampling import MinMaxBucketer
+from stress_episodes import EpisodeDetector
 
 # Configuration
 DATA_FILE = "sensor_data.json"
 TRAINING_DATA_FILE = "balanced_data.csv"
 MODELS_DIR = "models"
-UPDATE_INTERVAL = 1000  # milliseconds
+UPDATE_INTERVAL = 200  # milliseconds
+HISTORY_WINDOW_SECONDS = float(os.getenv('HISTORY_WINDOW_SECONDS', '900'))  # history shown in the graphs
+MAX_DISPLAY_POINTS = int(os.getenv('MAX_DISPLAY_POINTS', '800'))  # points per series for the whole window
+WORKER_INTERVAL = float(os.getenv('WORKER_INTERVAL', '0.2'))  # seconds between inference passes
+
+SENSOR_COLUMNS = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP']
 
 # Track current row in dataset
 _current_row_index = 0
 _training_data = None
-# Accumulate historical data for graphs
+# Models are loaded by the first inference pass (see get_models), not at import
+_models = None
+_models_lock = threading.Lock()
+# Latest contents of DATA_FILE
 _data_history = pd.DataFrame()
+# Collapses per-reading stress predictions into episodes before they are saved
+EPISODES = EpisodeDetector.from_env()
+# Downsampled graph history, fed incrementally by the inference worker
+HISTORY = MinMaxBucketer(SENSOR_COLUMNS, window_seconds=HISTORY_WINDOW_SECONDS, max_points=MAX_DISPLAY_POINTS)
 
 # Load all available models
 def load_all_models():
@@ -41,6 +60,23 @@ def load_all_models():
                 print(f"  ✗ Failed to load: {e}")
     return models
 
+def get_models():
+    """
+    All models, loaded on first use
+    
+    Called from the inference worker, so the dashboard serves its page while
+    the models load instead of blocking startup on them.
+    """
+    global _models
+    if _models is None:
+        with _models_lock:
+            if _models is None:
+                print("Loading ML models...")
+                models = load_all_models()
+                print(f"Loaded {len(models)} models: {list(models.keys())}\n")
+                _models = models
+    return _models
+
 # Load training dataset function (must be defined before use)
 def load_training_dataset():
     """Load training dataset from CSV file"""
@@ -73,28 +109,26 @@ def get_current_row():
     
     return row
 
-# Load models at startup
-print("Loading ML models...")
-MODELS = load_all_models()
-print(f"Loaded {len(MODELS)} models: {list(MODELS.keys())}\n")
-
-# Load training dataset at startup
-print("Loading training dataset...")
-load_training_dataset()
-if _training_data is not None and not _training_data.empty:
-    print(f"Ready to process {len(_training_data)} rows from {TRAINING_DATA_FILE}\n")
-else:
-    print(f"Warning: No training data loaded\n")
-
-# Initialize Firebase (optional)
+# Event storage (optional): Firebase, or a local SQLite store with EVENT_STORE=sqlite
 FIREBASE_ENABLED = os.getenv('FIREBASE_ENABLED', 'false').lower() == 'true'
 FIREBASE_CREDENTIAL = os.getenv('FIREBASE_CREDENTIAL', 'firebase_credentials.json')
-if FIREBASE_ENABLED:
+EVENT_STORE = os.getenv('EVENT_STORE', 'firestore').lower()
+# EVENT_BUFFER=true appends events to a local write-ahead log first, so backend outages lose nothing
+EVENT_BUFFER = os.getenv('EVENT_BUFFER', 'false').lower() == 'true'
+start_event_pipeline = start_event_buffer if EVENT_BUFFER else start_event_writer
+if EVENT_STORE == 'sqlite':
+    configure_event_store('sqlite')
+    start_event_pipeline()
+    print()
+elif FIREBASE_ENABLED:
     print("Initializing Firebase...")
     initialize_firebase(credential_path=FIREBASE_CREDENTIAL)
+    # Events are batched and written in the background; pending ones are drained at exit
+    start_event_pipeline()
     print("Firebase initialized\n")
 else:
-    print("Firebase disabled. Set FIREBASE_ENABLED=true to enable.\n")
+    print("Firebase disabled. Set FIREBASE_ENABLED=true (or EVENT_STORE=sqlite) to enable.\n")
+STORE_EVENTS = FIREBASE_ENABLED or EVENT_STORE == 'sqlite'
 
 # Initialize Dash app
 app = dash.Dash(__name__)
@@ -138,6 +172,179 @@ ACCENT_GREEN = '#3fb950'
 ACCENT_ORANGE = '#d29922'
 ACCENT_RED = '#f85149'
 
+# Common dark theme layout shared by every graph
+DARK_LAYOUT = {
+    'template': 'plotly_dark',
+    'plot_bgcolor': CARD_BG,
+    'paper_bgcolor': CARD_BG,
+    'font': dict(color=TEXT_PRIMARY, size=12),
+    'xaxis': dict(
+        gridcolor=BORDER_COLOR,
+        linecolor=BORDER_COLOR,
+        showgrid=True
+    ),
+    'yaxis': dict(
+        gridcolor=BORDER_COLOR,
+        linecolor=BORDER_COLOR,
+        showgrid=True
+    ),
+    'hovermode': 'x unified',
+    'hoverlabel': dict(
+        bgcolor='rgba(0, 0, 0, 0.8)',
+        font_size=12,
+        font_family="monospace"
+    )
+}
+
+NO_DATA_ANNOTATION = dict(
+    text="No data available", 
+    xref="paper", yref="paper", x=0.5, y=0.5, 
+    showarrow=False,
+    font=dict(size=16, color=TEXT_SECONDARY)
+)
+
+# Sensor columns plotted by each graph, in trace order
+GRAPH_SERIES = {
+    'accelerometer-graph': ['X', 'Y', 'Z'],
+    'eda-graph': ['EDA'],
+    'hr-graph': ['HR'],
+    'temp-graph': ['TEMP']
+}
+
+def build_static_figures():
+    """
+    Build the graph figures once with empty traces.
+    
+    Layouts never change after this; each tick only sends trace data
+    (extendData for new points, a Patch when the history is reset).
+    """
+    accel_fig = go.Figure()
+    accel_fig.add_trace(go.Scatter(
+        x=[], 
+        y=[], 
+        name='X', 
+        line=dict(color='#f85149', width=2),
+        mode='lines'
+    ))
+    accel_fig.add_trace(go.Scatter(
+        x=[], 
+        y=[], 
+        name='Y', 
+        line=dict(color='#58a6ff', width=2),
+        mode='lines'
+    ))
+    accel_fig.add_trace(go.Scatter(
+        x=[], 
+        y=[], 
+        name='Z', 
+        line=dict(color='#3fb950', width=2),
+        mode='lines'
+    ))
+    accel_fig.update_layout(
+        title=dict(
+            text='Accelerometer (X, Y, Z)',
+            font=dict(size=18, color=TEXT_PRIMARY),
+            x=0.5
+        ),
+        xaxis_title='Time',
+        yaxis_title='Value',
+        **DARK_LAYOUT,
+        height=400,
+        legend=dict(
+            orientation="h",
+            yanchor="bottom",
+            y=1.02,
+            xanchor="right",
+            x=1,
+            bgcolor='rgba(0,0,0,0)',
+            bordercolor=BORDER_COLOR
+        )
+    )
+    
+    # EDA graph
+    eda_fig = go.Figure()
+    eda_fig.add_trace(go.Scatter(
+        x=[], 
+        y=[], 
+        name='EDA', 
+        line=dict(color='#a371f7', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(163, 113, 247, 0.2)',
+        mode='lines'
+    ))
+    eda_fig.update_layout(
+        title=dict(
+            text='Electrodermal Activity (EDA)',
+            font=dict(size=16, color=TEXT_PRIMARY),
+            x=0.5
+        ),
+        xaxis_title='Time',
+        yaxis_title='EDA',
+        **DARK_LAYOUT,
+        height=300,
+        showlegend=False
+    )
+    
+    # Heart Rate graph
+    hr_fig = go.Figure()
+    hr_fig.add_trace(go.Scatter(
+        x=[], 
+        y=[], 
+        name='Heart Rate', 
+        line=dict(color='#d29922', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(210, 153, 34, 0.2)',
+        mode='lines'
+    ))
+    hr_fig.update_layout(
+        title=dict(
+            text='Heart Rate (HR)',
+            font=dict(size=16, color=TEXT_PRIMARY),
+            x=0.5
+        ),
+        xaxis_title='Time',
+        yaxis_title='BPM',
+        **DARK_LAYOUT,
+        height=300,
+        showlegend=False
+    )
+    
+    # Temperature graph
+    temp_fig = go.Figure()
+    temp_fig.add_trace(go.Scatter(
+        x=[], 
+        y=[], 
+        name='Temperature', 
+        line=dict(color='#f85149', width=2),
+        fill='tozeroy',
+        fillcolor='rgba(248, 81, 73, 0.2)',
+        mode='lines'
+    ))
+    temp_fig.update_layout(
+        title=dict(
+            text='Temperature (TEMP)',
+            font=dict(size=16, color=TEXT_PRIMARY),
+            x=0.5
+        ),
+        xaxis_title='Time',
+        yaxis_title='°C',
+        **DARK_LAYOUT,
+        height=300,
+        showlegend=False
+    )
+    
+    figures = {
+        'accelerometer-graph': accel_fig,
+        'eda-graph': eda_fig,
+        'hr-graph': hr_fig,
+        'temp-graph': temp_fig
+    }
+    for fig in figures.values():
+        fig.add_annotation(**NO_DATA_ANNOTATION)
+    return figures
+
+STATIC_FIGURES = build_static_figures()
+
 # App layout with dark theme
 app.layout = html.Div([
     # Main container
@@ -194,7 +401,7 @@ app.layout = html.Div([
             
             # Accelerometer (X, Y, Z)
             html.Div([
-                dcc.Graph(id='accelerometer-graph')
+                dcc.Graph(id='accelerometer-graph', figure=STATIC_FIGURES['accelerometer-graph'])
             ], style={
                 'marginBottom': '25px',
                 'backgroundColor': CARD_BG,
@@ -206,7 +413,7 @@ app.layout = html.Div([
             # EDA, HR, TEMP
             html.Div([
                 html.Div([
-                    dcc.Graph(id='eda-graph')
+                    dcc.Graph(id='eda-graph', figure=STATIC_FIGURES['eda-graph'])
                 ], style={
                     'width': '32%', 
                     'display': 'inline-block', 
@@ -217,7 +424,7 @@ app.layout = html.Div([
                     'marginRight': '1%'
                 }),
                 html.Div([
-                    dcc.Graph(id='hr-graph')
+                    dcc.Graph(id='hr-graph', figure=STATIC_FIGURES['hr-graph'])
                 ], style={
                     'width': '32%', 
                     'display': 'inline-block', 
@@ -228,7 +435,7 @@ app.layout = html.Div([
                     'marginRight': '1%'
                 }),
                 html.Div([
-                    dcc.Graph(id='temp-graph')
+                    dcc.Graph(id='temp-graph', figure=STATIC_FIGURES['temp-graph'])
                 ], style={
                     'width': '32%', 
                     'display': 'inline-block', 
@@ -251,7 +458,10 @@ app.layout = html.Div([
         id='interval-component',
         interval=UPDATE_INTERVAL,
         n_intervals=0
-    )
+    ),
+    
+    # Per-browser record of what the graphs and cards already show
+    dcc.Store(id='graph-state', data=None)
 ])
 
 def load_sensor_data():
@@ -273,8 +483,8 @@ def load_sensor_data():
         df_new = pd.DataFrame(all_data)
         df_new['timestamp'] = pd.to_datetime(df_new['timestamp'])
         
-        # Update history with all data from JSON (keep last 100)
-        _data_history = df_new.tail(100).reset_index(drop=True)
+        # Readings older than the file keeps are retained by HISTORY
+        _data_history = df_new.reset_index(drop=True)
         
         return _data_history
     except Exception as e:
@@ -283,14 +493,17 @@ def load_sensor_data():
 
 def make_predictions(sensor_data):
     """Make predictions using all loaded models"""
-    if sensor_data.empty or len(MODELS) == 0:
+    if sensor_data.empty:
+        return {}
+    models = get_models()
+    if not models:
         return {}
     
     # Get latest reading
     latest = sensor_data.iloc[-1]
     
     predictions = {}
-    for model_name, model in MODELS.items():
+    for model_name, model in models.items():
         try:
             pred, proba = predict_single_point(
                 model=model,
@@ -313,23 +526,145 @@ def make_predictions(sensor_data):
     
     return predictions
 
-@app.callback(
-    [Output('status-indicator', 'children'),
-     Output('predictions-display', 'children'),
-     Output('accelerometer-graph', 'figure'),
-     Output('eda-graph', 'figure'),
-     Output('hr-graph', 'figure'),
-     Output('temp-graph', 'figure')],
-    Input('interval-component', 'n_intervals')
-)
-def update_dashboard(n):
-    """Update dashboard with latest data"""
-    # Load sensor data
-    df = load_sensor_data()
-    
-    # Status indicator
+def build_prediction_cards(df, predictions):
+    """Build one card per model from the latest predictions"""
+    predictions_cards = []
+    for model_name, pred_data in predictions.items():
+        if 'error' in pred_data:
+            card = html.Div([
+                html.H3(model_name.replace('_', ' ').title(), 
+                        style={
+                            'margin': '0 0 10px 0', 
+                            'color': ACCENT_RED, 
+                            'fontSize': '18px',
+                            'fontWeight': '600',
+                            'letterSpacing': '0.3px'
+                        }),
+                html.P(f"Error: {pred_data['error'][:40]}", 
+                      style={
+                          'margin': '5px 0', 
+                          'color': TEXT_SECONDARY, 
+                          'fontSize': '13px',
+                          'fontFamily': 'monospace'
+                      })
+            ], style={
+                'border': f'1px solid {ACCENT_RED}',
+                'borderRadius': '12px',
+                'padding': '20px',
+                'backgroundColor': CARD_BG,
+                'boxShadow': '0 4px 6px rgba(0, 0, 0, 0.3)',
+                'transition': 'transform 0.2s',
+                'borderLeft': f'4px solid {ACCENT_RED}'
+            })
+        else:
+            label = pred_data['label']
+            confidence = pred_data.get('confidence', 0)
+            label_colors = {0.0: ACCENT_BLUE, 1.0: ACCENT_ORANGE, 2.0: ACCENT_RED}
+            label_names = {0.0: 'Low', 1.0: 'Medium', 2.0: 'High'}
+            color = label_colors.get(label, TEXT_SECONDARY)
+            label_name = label_names.get(label, 'Unknown')
+            
+            # Get actual label for comparison
+            actual_label = df.iloc[-1].get('actual_label', None)
+            is_correct = actual_label is not None and label == actual_label
+            
+            card = html.Div([
+                html.H3(model_name.replace('_', ' ').title(), 
+                        style={
+                            'margin': '0 0 15px 0', 
+                            'color': TEXT_PRIMARY, 
+                            'fontSize': '18px',
+                            'fontWeight': '600',
+                            'letterSpacing': '0.3px'
+                        }),
+                html.Div([
+                    html.Div([
+                        html.Span("Predicted Stress Level", style={
+                            'fontSize': '12px', 
+                            'color': TEXT_SECONDARY,
+                            'textTransform': 'uppercase',
+                            'letterSpacing': '0.5px',
+                            'fontWeight': '500'
+                        }),
+                        html.Div([
+                            html.Span(f"{label_name}", 
+                                    style={
+                                        'fontSize': '28px', 
+                                        'fontWeight': '700', 
+                                        'color': color,
+                                        'marginRight': '8px'
+                                    }),
+                            html.Span(f"({label:.0f})", 
+                                    style={
+                                        'fontSize': '18px', 
+                                        'color': TEXT_SECONDARY,
+                                        'fontWeight': '400'
+                                    })
+                        ], style={'marginTop': '8px'})
+                    ], style={'marginBottom': '15px'}),
+                    html.Div([
+                        html.Span("Confidence", style={
+                            'fontSize': '12px', 
+                            'color': TEXT_SECONDARY,
+                            'textTransform': 'uppercase',
+                            'letterSpacing': '0.5px',
+                            'fontWeight': '500'
+                        }),
+                        html.Span(f"{confidence:.1%}", 
+                                style={
+                                    'fontSize': '20px', 
+                                    'fontWeight': '600', 
+                                    'color': ACCENT_GREEN,
+                                    'display': 'block',
+                                    'marginTop': '5px'
+                                })
+                    ]),
+                    # Show actual label if available
+                    html.Div([
+                        html.Span("Actual Label", style={
+                            'fontSize': '12px', 
+                            'color': TEXT_SECONDARY,
+                            'textTransform': 'uppercase',
+                            'letterSpacing': '0.5px',
+                            'fontWeight': '500'
+                        }),
+                        html.Div([
+                            html.Span(f"{label_names.get(actual_label, 'N/A')} ({actual_label:.0f})" if actual_label is not None else "N/A", 
+                                    style={
+                                        'fontSize': '16px', 
+                                        'fontWeight': '600', 
+                                        'color': label_colors.get(actual_label, TEXT_SECONDARY) if actual_label is not None else TEXT_SECONDARY,
+                                        'marginRight': '8px'
+                                    }),
+                            html.Span("CORRECT" if is_correct else "INCORRECT", 
+                                    style={
+                                        'fontSize': '12px', 
+                                        'fontWeight': 'bold',
+                                        'color': ACCENT_GREEN if is_correct else ACCENT_RED,
+                                        'padding': '2px 8px',
+                                        'borderRadius': '4px',
+                                        'backgroundColor': f'rgba({58 if is_correct else 248}, {166 if is_correct else 81}, {255 if is_correct else 73}, 0.2)'
+                                    }) if actual_label is not None else None
+                        ], style={'marginTop': '5px', 'display': 'flex', 'alignItems': 'center', 'gap': '8px'})
+                    ], style={'marginTop': '10px'}) if actual_label is not None else None
+                ])
+            ], style={
+                'border': f'1px solid {BORDER_COLOR}',
+                'borderLeft': f'4px solid {color}',
+                'borderRadius': '12px',
+                'padding': '20px',
+                'backgroundColor': CARD_BG,
+                'boxShadow': '0 4px 6px rgba(0, 0, 0, 0.3)',
+                'transition': 'transform 0.2s, box-shadow 0.2s',
+                'cursor': 'default'
+            })
+        predictions_cards.append(card)
+    return predictions_cards
+
+def build_status(df):
+    """Build the status indicator for the current sensor history"""
     if df.empty:
-        status = html.Div([
+        return html.Div([
             html.Span("●", style={
                 'color': ACCENT_RED, 
                 'fontSize': '16px', 
@@ -342,6 +677,179 @@ def update_dashboard(n):
                 'fontWeight': '500'
             })
         ])
+    
+    latest_time = df.iloc[-1]['timestamp']
+    # Note: actual_label won't be available from sensor_simulator data
+    total_readings = HISTORY.count
+    
+    status_text = f"Total readings: {total_readings} | Last update: {latest_time.strftime('%H:%M:%S')}"
+    if EVENT_BUFFER:
+        metrics = get_event_pipeline_metrics()
+        if metrics is not None:
+            status_text += f" | Event buffer: {metrics['depth']} pending"
+            if metrics['depth']:
+                status_text += f" (replay lag {metrics['replay_lag']:.0f}s)"
+    
+    return html.Div([
+        html.Span("●", style={
+            'color': ACCENT_GREEN, 
+            'fontSize': '16px', 
+            'marginRight': '10px',
+            'animation': 'pulse 2s infinite'
+        }),
+        html.Span(status_text, 
+                 style={
+                     'fontSize': '14px', 
+                     'color': ACCENT_GREEN,
+                     'fontWeight': '500'
+                 })
+    ])
+
+def save_stress_predictions(df, predictions):
+    """
+    Feed the latest predictions to the episode detector and queue the
+    resulting episode start/summary/end events for the event store
+    
+    Sustained stress (level 1 or 2) produces one start and one end event
+    per model instead of a document per reading.
+    """
+    if not STORE_EVENTS or df.empty:
+        return
+    
+    latest = df.iloc[-1]
+    sensor_data = {
+        'X': float(latest['X']),
+        'Y': float(latest['Y']),
+        'Z': float(latest['Z']),
+        'EDA': float(latest['EDA']),
+        'HR': float(latest['HR']),
+        'TEMP': float(latest['TEMP'])
+    }
+    device_id = latest.get('device_id', 'default')
+    for model_name, pred_data in predictions.items():
+        if 'error' in pred_data:
+            continue
+        events = EPISODES.update(
+            latest['timestamp'],
+            pred_data['label'],
+            pred_data.get('confidence') or 0,
+            device_id=device_id,
+            model_name=model_name
+        )
+        for event in events:
+            enqueue_stress_event(
+                stress_level=event['peak_level'],
+                confidence=event['mean_confidence'],
+                sensor_data=sensor_data,
+                model_name=model_name,
+                extra=event
+            )
+
+def ingest_history(df):
+    """Feed readings the history window has not seen yet into the downsampler"""
+    last_timestamp = HISTORY.last_timestamp
+    if last_timestamp is not None and df.iloc[-1]['timestamp'] < last_timestamp:
+        # Data file was cleared or rewound: start a new history
+        HISTORY.reset()
+        last_timestamp = None
+    HISTORY.add_frame(df[df['timestamp'] > last_timestamp] if last_timestamp is not None else df)
+
+# Background worker: reads sensor data, runs every model and saves stress events
+WORKER = InferenceWorker(
+    load_readings=load_sensor_data,
+    predict=make_predictions,
+    persist=save_stress_predictions,
+    ingest=ingest_history,
+    interval=WORKER_INTERVAL
+)
+
+def ensure_worker_started():
+    """Start the inference worker if it is not running (e.g. when served by a WSGI server)"""
+    if not WORKER.running:
+        WORKER.start()
+
+def flush_episodes():
+    """
+    Stop the worker and queue end events for episodes still open at shutdown
+    
+    Registered after the event pipeline's own exit hook, so it runs first and
+    the pipeline drains these events too.
+    """
+    WORKER.stop()
+    for event in EPISODES.flush():
+        enqueue_stress_event(
+            stress_level=event['peak_level'],
+            confidence=event['mean_confidence'],
+            model_name=event['model_name'],
+            extra=event
+        )
+
+if STORE_EVENTS:
+    atexit.register(flush_episodes)
+
+def _reset_figure(graph_id, series):
+    """Patch that replaces all trace data of a graph (used on first load and after a reset)"""
+    patch = Patch()
+    has_points = False
+    for i, column in enumerate(GRAPH_SERIES[graph_id]):
+        xs, ys = series[column]
+        patch['data'][i]['x'] = xs
+        patch['data'][i]['y'] = ys
+        has_points = has_points or len(xs) > 0
+    patch['layout']['annotations'] = [] if has_points else [NO_DATA_ANNOTATION]
+    return patch
+
+def _extend_figure(graph_id, series, window_points):
+    """
+    extendData payload appending only newly closed buckets
+
+    Each trace is trimmed to the points its series has in the window, which
+    drops exactly the buckets that expired, even after sparse buckets or gaps.
+    """
+    columns = GRAPH_SERIES[graph_id]
+    max_points = [window_points[column] for column in columns]
+    return (
+        dict(x=[series[column][0] for column in columns], y=[series[column][1] for column in columns]),
+        list(range(len(columns))),
+        dict(x=max_points, y=max_points)
+    )
+
+def _predictions_key(predictions):
+    """Compact signature of what the prediction cards display"""
+    return [
+        [name, pred.get('error'), pred.get('label'), round(pred.get('confidence') or 0, 3)]
+        for name, pred in predictions.items()
+    ]
+
+@app.callback(
+    [Output('status-indicator', 'children'),
+     Output('predictions-display', 'children')] +
+    [Output(graph_id, 'figure') for graph_id in GRAPH_SERIES] +
+    [Output(graph_id, 'extendData') for graph_id in GRAPH_SERIES] +
+    [Output('graph-state', 'data')],
+    Input('interval-component', 'n_intervals'),
+    State('graph-state', 'data')
+)
+def update_dashboard(n, graph_state):
+    """
+    Update dashboard with latest data
+    
+    Only downsampled points the browser does not have yet are transmitted.
+    graph_state holds the history epoch and bucket sequence number already
+    sent, whether the graphs show any points, the latest reading's timestamp
+    (None when empty) and the signature of the prediction cards displayed.
+    """
+    n_graphs = len(GRAPH_SERIES)
+    nothing_changed = [no_update] * (2 + 2 * n_graphs + 1)
+    
+    # Render from the worker's latest snapshot; no file reads or inference here
+    ensure_worker_started()
+    snapshot = WORKER.snapshot()
+    df = snapshot['data'] if snapshot['data'] is not None else pd.DataFrame()
+    
+    if df.empty:
+        if graph_state is not None and graph_state['last_timestamp'] is None:
+            return nothing_changed
         predictions_cards = [html.Div("No data available", style={
             'textAlign': 'center', 
             'color': TEXT_SECONDARY,
@@ -350,343 +858,51 @@ def update_dashboard(n):
             'borderRadius': '12px',
             'border': f'1px solid {BORDER_COLOR}'
         })]
-    else:
-        latest_time = df.iloc[-1]['timestamp']
-        # Note: actual_label won't be available from sensor_simulator data
-        total_readings = len(df)
-        
-        status_text = f"Total readings: {total_readings} | Last update: {latest_time.strftime('%H:%M:%S')}"
-        
-        status = html.Div([
-            html.Span("●", style={
-                'color': ACCENT_GREEN, 
-                'fontSize': '16px', 
-                'marginRight': '10px',
-                'animation': 'pulse 2s infinite'
-            }),
-            html.Span(status_text, 
-                     style={
-                         'fontSize': '14px', 
-                         'color': ACCENT_GREEN,
-                         'fontWeight': '500'
-                     })
-        ])
-        
-        # Make predictions
-        predictions = make_predictions(df)
-        
-        # Create prediction cards
-        predictions_cards = []
-        for model_name, pred_data in predictions.items():
-            if 'error' in pred_data:
-                card = html.Div([
-                    html.H3(model_name.replace('_', ' ').title(), 
-                            style={
-                                'margin': '0 0 10px 0', 
-                                'color': ACCENT_RED, 
-                                'fontSize': '18px',
-                                'fontWeight': '600',
-                                'letterSpacing': '0.3px'
-                            }),
-                    html.P(f"Error: {pred_data['error'][:40]}", 
-                          style={
-                              'margin': '5px 0', 
-                              'color': TEXT_SECONDARY, 
-                              'fontSize': '13px',
-                              'fontFamily': 'monospace'
-                          })
-                ], style={
-                    'border': f'1px solid {ACCENT_RED}',
-                    'borderRadius': '12px',
-                    'padding': '20px',
-                    'backgroundColor': CARD_BG,
-                    'boxShadow': '0 4px 6px rgba(0, 0, 0, 0.3)',
-                    'transition': 'transform 0.2s',
-                    'borderLeft': f'4px solid {ACCENT_RED}'
-                })
-            else:
-                label = pred_data['label']
-                confidence = pred_data.get('confidence', 0)
-                label_colors = {0.0: ACCENT_BLUE, 1.0: ACCENT_ORANGE, 2.0: ACCENT_RED}
-                label_names = {0.0: 'Low', 1.0: 'Medium', 2.0: 'High'}
-                color = label_colors.get(label, TEXT_SECONDARY)
-                label_name = label_names.get(label, 'Unknown')
-                
-                # Get actual label for comparison
-                actual_label = df.iloc[-1].get('actual_label', None)
-                is_correct = actual_label is not None and label == actual_label
-                
-                # Save to Firebase if stress detected and enabled
-                if FIREBASE_ENABLED and label > 0:  # Save if stress level is 1 or 2
-                    latest = df.iloc[-1]
-                    sensor_data = {
-                        'X': float(latest['X']),
-                        'Y': float(latest['Y']),
-                        'Z': float(latest['Z']),
-                        'EDA': float(latest['EDA']),
-                        'HR': float(latest['HR']),
-                        'TEMP': float(latest['TEMP'])
-                    }
-                    save_stress_event(
-                        stress_level=label,
-                        confidence=confidence,
-                        sensor_data=sensor_data,
-                        model_name=model_name
-                    )
-                
-                card = html.Div([
-                    html.H3(model_name.replace('_', ' ').title(), 
-                            style={
-                                'margin': '0 0 15px 0', 
-                                'color': TEXT_PRIMARY, 
-                                'fontSize': '18px',
-                                'fontWeight': '600',
-                                'letterSpacing': '0.3px'
-                            }),
-                    html.Div([
-                        html.Div([
-                            html.Span("Predicted Stress Level", style={
-                                'fontSize': '12px', 
-                                'color': TEXT_SECONDARY,
-                                'textTransform': 'uppercase',
-                                'letterSpacing': '0.5px',
-                                'fontWeight': '500'
-                            }),
-                            html.Div([
-                                html.Span(f"{label_name}", 
-                                        style={
-                                            'fontSize': '28px', 
-                                            'fontWeight': '700', 
-                                            'color': color,
-                                            'marginRight': '8px'
-                                        }),
-                                html.Span(f"({label:.0f})", 
-                                        style={
-                                            'fontSize': '18px', 
-                                            'color': TEXT_SECONDARY,
-                                            'fontWeight': '400'
-                                        })
-                            ], style={'marginTop': '8px'})
-                        ], style={'marginBottom': '15px'}),
-                        html.Div([
-                            html.Span("Confidence", style={
-                                'fontSize': '12px', 
-                                'color': TEXT_SECONDARY,
-                                'textTransform': 'uppercase',
-                                'letterSpacing': '0.5px',
-                                'fontWeight': '500'
-                            }),
-                            html.Span(f"{confidence:.1%}", 
-                                    style={
-                                        'fontSize': '20px', 
-                                        'fontWeight': '600', 
-                                        'color': ACCENT_GREEN,
-                                        'display': 'block',
-                                        'marginTop': '5px'
-                                    })
-                        ]),
-                        # Show actual label if available
-                        html.Div([
-                            html.Span("Actual Label", style={
-                                'fontSize': '12px', 
-                                'color': TEXT_SECONDARY,
-                                'textTransform': 'uppercase',
-                                'letterSpacing': '0.5px',
-                                'fontWeight': '500'
-                            }),
-                            html.Div([
-                                html.Span(f"{label_names.get(actual_label, 'N/A')} ({actual_label:.0f})" if actual_label is not None else "N/A", 
-                                        style={
-                                            'fontSize': '16px', 
-                                            'fontWeight': '600', 
-                                            'color': label_colors.get(actual_label, TEXT_SECONDARY) if actual_label is not None else TEXT_SECONDARY,
-                                            'marginRight': '8px'
-                                        }),
-                                html.Span("CORRECT" if is_correct else "INCORRECT", 
-                                        style={
-                                            'fontSize': '12px', 
-                                            'fontWeight': 'bold',
-                                            'color': ACCENT_GREEN if is_correct else ACCENT_RED,
-                                            'padding': '2px 8px',
-                                            'borderRadius': '4px',
-                                            'backgroundColor': f'rgba({58 if is_correct else 248}, {166 if is_correct else 81}, {255 if is_correct else 73}, 0.2)'
-                                        }) if actual_label is not None else None
-                            ], style={'marginTop': '5px', 'display': 'flex', 'alignItems': 'center', 'gap': '8px'})
-                        ], style={'marginTop': '10px'}) if actual_label is not None else None
-                    ])
-                ], style={
-                    'border': f'1px solid {BORDER_COLOR}',
-                    'borderLeft': f'4px solid {color}',
-                    'borderRadius': '12px',
-                    'padding': '20px',
-                    'backgroundColor': CARD_BG,
-                    'boxShadow': '0 4px 6px rgba(0, 0, 0, 0.3)',
-                    'transition': 'transform 0.2s, box-shadow 0.2s',
-                    'cursor': 'default'
-                })
-            predictions_cards.append(card)
+        empty_series = {column: ([], []) for column in SENSOR_COLUMNS}
+        figures = [_reset_figure(graph_id, empty_series) for graph_id in GRAPH_SERIES]
+        new_state = {'epoch': None, 'seq': None, 'has_points': False, 'last_timestamp': None, 'cards_key': None}
+        return [build_status(df), predictions_cards] + figures + [no_update] * n_graphs + [new_state]
     
-    # Create graphs with dark theme
-    if df.empty:
-        empty_fig = go.Figure()
-        empty_fig.update_layout(
-            template='plotly_dark',
-            plot_bgcolor=CARD_BG,
-            paper_bgcolor=CARD_BG,
-            font=dict(color=TEXT_PRIMARY)
-        )
-        empty_fig.add_annotation(
-            text="No data available", 
-            xref="paper", yref="paper", x=0.5, y=0.5, 
-            showarrow=False,
-            font=dict(size=16, color=TEXT_SECONDARY)
-        )
-        return status, predictions_cards, empty_fig, empty_fig, empty_fig, empty_fig
-    
-    # Get last 100 points for display
-    df_display = df.tail(100).copy()
-    
-    # Common dark theme layout
-    dark_layout = {
-        'template': 'plotly_dark',
-        'plot_bgcolor': CARD_BG,
-        'paper_bgcolor': CARD_BG,
-        'font': dict(color=TEXT_PRIMARY, size=12),
-        'xaxis': dict(
-            gridcolor=BORDER_COLOR,
-            linecolor=BORDER_COLOR,
-            showgrid=True
-        ),
-        'yaxis': dict(
-            gridcolor=BORDER_COLOR,
-            linecolor=BORDER_COLOR,
-            showgrid=True
-        ),
-        'hovermode': 'x unified',
-        'hoverlabel': dict(
-            bgcolor='rgba(0, 0, 0, 0.8)',
-            font_size=12,
-            font_family="monospace"
-        )
-    }
+    latest_time = df.iloc[-1]['timestamp'].isoformat()
+    if graph_state is not None and graph_state['last_timestamp'] == latest_time:
+        return nothing_changed
     
-    # Accelerometer graph
-    accel_fig = go.Figure()
-    accel_fig.add_trace(go.Scatter(
-        x=df_display['timestamp'], 
-        y=df_display['X'], 
-        name='X', 
-        line=dict(color='#f85149', width=2),
-        mode='lines'
-    ))
-    accel_fig.add_trace(go.Scatter(
-        x=df_display['timestamp'], 
-        y=df_display['Y'], 
-        name='Y', 
-        line=dict(color='#58a6ff', width=2),
-        mode='lines'
-    ))
-    accel_fig.add_trace(go.Scatter(
-        x=df_display['timestamp'], 
-        y=df_display['Z'], 
-        name='Z', 
-        line=dict(color='#3fb950', width=2),
-        mode='lines'
-    ))
-    accel_fig.update_layout(
-        title=dict(
-            text='Accelerometer (X, Y, Z)',
-            font=dict(size=18, color=TEXT_PRIMARY),
-            x=0.5
-        ),
-        xaxis_title='Time',
-        yaxis_title='Value',
-        **dark_layout,
-        height=400,
-        legend=dict(
-            orientation="h",
-            yanchor="bottom",
-            y=1.02,
-            xanchor="right",
-            x=1,
-            bgcolor='rgba(0,0,0,0)',
-            bordercolor=BORDER_COLOR
-        )
-    )
+    if graph_state is not None and graph_state['has_points']:
+        series, epoch, seq, full, window_points = HISTORY.updates_since(graph_state['epoch'], graph_state['seq'])
+    else:
+        # extendData does not update the stored figure, so the first points
+        # must arrive through a full replacement that also clears the annotation
+        series, epoch, seq, full, window_points = HISTORY.updates_since(None, None)
     
-    # EDA graph
-    eda_fig = go.Figure()
-    eda_fig.add_trace(go.Scatter(
-        x=df_display['timestamp'], 
-        y=df_display['EDA'], 
-        name='EDA', 
-        line=dict(color='#a371f7', width=2),
-        fill='tozeroy',
-        fillcolor='rgba(163, 113, 247, 0.2)',
-        mode='lines'
-    ))
-    eda_fig.update_layout(
-        title=dict(
-            text='Electrodermal Activity (EDA)',
-            font=dict(size=16, color=TEXT_PRIMARY),
-            x=0.5
-        ),
-        xaxis_title='Time',
-        yaxis_title='EDA',
-        **dark_layout,
-        height=300,
-        showlegend=False
-    )
+    has_points = any(series[column][0] for column in SENSOR_COLUMNS)
+    if full:
+        figures = [_reset_figure(graph_id, series) for graph_id in GRAPH_SERIES]
+        extends = [no_update] * n_graphs
+    else:
+        has_points = True
+        figures = [no_update] * n_graphs
+        if seq != graph_state['seq']:
+            extends = [_extend_figure(graph_id, series, window_points) for graph_id in GRAPH_SERIES]
+        else:
+            extends = [no_update] * n_graphs
     
-    # Heart Rate graph
-    hr_fig = go.Figure()
-    hr_fig.add_trace(go.Scatter(
-        x=df_display['timestamp'], 
-        y=df_display['HR'], 
-        name='Heart Rate', 
-        line=dict(color='#d29922', width=2),
-        fill='tozeroy',
-        fillcolor='rgba(210, 153, 34, 0.2)',
-        mode='lines'
-    ))
-    hr_fig.update_layout(
-        title=dict(
-            text='Heart Rate (HR)',
-            font=dict(size=16, color=TEXT_PRIMARY),
-            x=0.5
-        ),
-        xaxis_title='Time',
-        yaxis_title='BPM',
-        **dark_layout,
-        height=300,
-        showlegend=False
-    )
+    predictions = snapshot['predictions']
     
-    # Temperature graph
-    temp_fig = go.Figure()
-    temp_fig.add_trace(go.Scatter(
-        x=df_display['timestamp'], 
-        y=df_display['TEMP'], 
-        name='Temperature', 
-        line=dict(color='#f85149', width=2),
-        fill='tozeroy',
-        fillcolor='rgba(248, 81, 73, 0.2)',
-        mode='lines'
-    ))
-    temp_fig.update_layout(
-        title=dict(
-            text='Temperature (TEMP)',
-            font=dict(size=16, color=TEXT_PRIMARY),
-            x=0.5
-        ),
-        xaxis_title='Time',
-        yaxis_title='°C',
-        **dark_layout,
-        height=300,
-        showlegend=False
-    )
+    # Only rebuild the cards when what they show has changed
+    cards_key = _predictions_key(predictions)
+    if graph_state is not None and graph_state.get('cards_key') == cards_key:
+        predictions_cards = no_update
+    else:
+        predictions_cards = build_prediction_cards(df, predictions)
     
-    return status, predictions_cards, accel_fig, eda_fig, hr_fig, temp_fig
+    new_state = {
+        'epoch': epoch,
+        'seq': seq,
+        'has_points': has_points,
+        'last_timestamp': latest_time,
+        'cards_key': cards_key
+    }
+    return [build_status(df), predictions_cards] + figures + extends + [new_state]
 
 if __name__ == '__main__':
     print("\n" + "="*60)
@@ -695,8 +911,15 @@ if __name__ == '__main__':
     print(f"Dashboard URL: http://127.0.0.1:8050")
     print(f"Data source: {DATA_FILE} (from sensor_simulator.py)")
     print(f"Update interval: {UPDATE_INTERVAL}ms")
+    print(f"History window: {HISTORY_WINDOW_SECONDS:.0f}s, {MAX_DISPLAY_POINTS} points per series "
+          f"({HISTORY.bucket_seconds:.2f}s buckets)")
     print("\nMake sure to run sensor_simulator.py to generate data!")
     print("="*60 + "\n")
     
+    # With debug=True the reloader parent process never serves requests,
+    # so only start the worker in the process that does
+    if os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        ensure_worker_started()
+    
     app.run_server(debug=True, host='0.0.0.0', port=8050)
 
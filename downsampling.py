@@ -0,0 +1,201 @@
+"""
+Incremental Min/Max Downsampling
+Keeps a fixed time window of sensor history as time buckets, each reduced
+to the minimum and maximum point of every series, so long histories can be
+plotted with a pixel-appropriate number of points
+"""
+import threading
+from collections import deque
+
+import pandas as pd
+
+
+class MinMaxBucketer:
+    """
+    Time-bucketed min/max reduction of a stream of readings.
+
+    Parameters:
+    - columns: Series (reading keys) to downsample
+    - window_seconds: Length of history to keep
+    - max_points: Upper bound on points per series for the whole window
+
+    The window is split into max_points // 2 buckets; every closed bucket
+    contributes at most two points (its min and max, in time order) per
+    series. Each reading costs O(len(columns)), and closed buckets never
+    change, so they can be streamed to a client once, tagged with an
+    increasing sequence number. A bucket closes when the first reading of a
+    later bucket arrives, so plots lag the newest reading by at most
+    bucket_seconds.
+    """
+
+    def __init__(self, columns, window_seconds=900, max_points=800):
+        self.columns = list(columns)
+        self.window_seconds = float(window_seconds)
+        self.n_buckets = max(1, int(max_points) // 2)
+        self.bucket_seconds = self.window_seconds / self.n_buckets
+        self.max_points = 2 * self.n_buckets
+
+        self._lock = threading.Lock()
+        self.epoch = 0
+        self._reset()
+
+    def _reset(self):
+        self._closed = deque()  # (bucket_index, seq, {column: (xs, ys)})
+        self._window_points = {column: 0 for column in self.columns}  # points per series in _closed
+        self._open_index = None
+        self._open = None  # {column: [min_t, min_v, max_t, max_v]}
+        self._last_timestamp = None
+        self.seq = 0
+        self.count = 0
+
+    def reset(self):
+        """Drop all history and start a new epoch (clients must resend their graphs)"""
+        with self._lock:
+            self._reset()
+            self.epoch += 1
+
+    def add(self, timestamp, values):
+        """
+        Add one reading.
+
+        Parameters:
+        - timestamp: pandas Timestamp of the reading
+        - values: Mapping with a value for every column
+
+        Readings older than the newest one seen are ignored.
+        """
+        with self._lock:
+            self._add(timestamp, values)
+
+    def add_frame(self, df):
+        """Add every row of a DataFrame with a 'timestamp' column and the bucketed columns"""
+        if df is None or df.empty:
+            return
+        timestamps = df['timestamp'].tolist()
+        columns = [df[column].tolist() for column in self.columns]
+        with self._lock:
+            for i, timestamp in enumerate(timestamps):
+                self._add(timestamp, {column: values[i] for column, values in zip(self.columns, columns)})
+
+    def _add(self, timestamp, values):
+        if self._last_timestamp is not None and timestamp < self._last_timestamp:
+            return
+        self._last_timestamp = timestamp
+        bucket_index = int(timestamp.value / 1e9 // self.bucket_seconds)
+
+        if self._open_index is None or bucket_index > self._open_index:
+            if self._open is not None:
+                self._close_open_bucket()
+            self._open_index = bucket_index
+            self._open = {}
+            self._expire(bucket_index)
+
+        self.count += 1
+        for column in self.columns:
+            value = float(values[column])
+            stats = self._open.get(column)
+            if stats is None:
+                self._open[column] = [timestamp, value, timestamp, value]
+                continue
+            if value < stats[1]:
+                stats[0], stats[1] = timestamp, value
+            if value > stats[3]:
+                stats[2], stats[3] = timestamp, value
+
+    def _bucket_points(self, bucket):
+        points = {}
+        for column in self.columns:
+            min_t, min_v, max_t, max_v = bucket[column]
+            if min_t == max_t:
+                points[column] = ([_format_timestamp(min_t)], [min_v])
+            elif min_t < max_t:
+                points[column] = ([_format_timestamp(min_t), _format_timestamp(max_t)], [min_v, max_v])
+            else:
+                points[column] = ([_format_timestamp(max_t), _format_timestamp(min_t)], [max_v, min_v])
+        return points
+
+    def _close_open_bucket(self):
+        self.seq += 1
+        points = self._bucket_points(self._open)
+        self._closed.append((self._open_index, self.seq, points))
+        for column in self.columns:
+            self._window_points[column] += len(points[column][0])
+
+    def _expire(self, newest_index):
+        oldest_kept = newest_index - self.n_buckets + 1
+        while self._closed and self._closed[0][0] < oldest_kept:
+            _, _, points = self._closed.popleft()
+            for column in self.columns:
+                self._window_points[column] -= len(points[column][0])
+
+    @staticmethod
+    def _concat(buckets, columns):
+        series = {column: ([], []) for column in columns}
+        for points in buckets:
+            for column in columns:
+                xs, ys = points[column]
+                series[column][0].extend(xs)
+                series[column][1].extend(ys)
+        return series
+
+    def points_since(self, seq):
+        """
+        Points of buckets closed after sequence number seq.
+
+        Returns (series, seq) where series maps column -> (xs, ys), or
+        (None, seq) if some of those buckets already left the window and the
+        caller must reload window_series() instead.
+        """
+        with self._lock:
+            return self._points_since(seq)
+
+    def _points_since(self, seq):
+        if seq == self.seq:
+            return {column: ([], []) for column in self.columns}, self.seq
+        if seq > self.seq or not self._closed or self._closed[0][1] > seq + 1:
+            return None, self.seq
+        buckets = [points for _, bucket_seq, points in self._closed if bucket_seq > seq]
+        return self._concat(buckets, self.columns), self.seq
+
+    @property
+    def last_timestamp(self):
+        return self._last_timestamp
+
+    def updates_since(self, epoch, seq):
+        """
+        Points a client holding (epoch, seq) is missing.
+
+        Returns (series, epoch, seq, full, window_points): full is True when
+        series is the whole window and must replace what the client has,
+        False when it only holds buckets to append. window_points maps each
+        column to its number of points in the window; after appending, a
+        client keeps that many of its newest points so that buckets which
+        left the window are dropped, however sparse the buckets are.
+        """
+        with self._lock:
+            window_points = dict(self._window_points)
+            if epoch == self.epoch and seq is not None:
+                series, new_seq = self._points_since(seq)
+                if series is not None:
+                    return series, self.epoch, new_seq, False, window_points
+            series, new_seq = self._window_series()
+            return series, self.epoch, new_seq, True, window_points
+
+    def window_series(self):
+        """
+        All downsampled points of the closed buckets in the window.
+
+        Returns (series, seq) where seq is the last closed bucket included,
+        to be passed to points_since() on the next update.
+        """
+        with self._lock:
+            return self._window_series()
+
+    def _window_series(self):
+        buckets = [points for _, _, points in self._closed]
+        return self._concat(buckets, self.columns), self.seq
+
+
+def _format_timestamp(timestamp):
+    """Serialize a timestamp for Plotly"""
+    return pd.Timestamp(timestamp).strftime('%Y-%m-%d %H:%M:%S.%f')
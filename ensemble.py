@@ -0,0 +1,167 @@
+"""
+Model Ensemble
+Scores one featurized batch with several models concurrently and combines
+their verdicts (mean probability, weighted mean or majority vote)
+"""
+import numbers
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from feature_schema import FeatureSchema, feature_schema
+from predict import load_model, predict_frame
+
+COMBINE_METHODS = ('mean', 'weighted', 'vote')
+
+
+def parse_weights(spec):
+    """
+    Parse model weights from "name=weight,name=weight" (e.g. ENSEMBLE_WEIGHTS)
+
+    Returns a dict of model name -> float weight
+    """
+    weights = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            name, _, weight = item.partition('=')
+            weights[name.strip().replace('.joblib', '')] = float(weight)
+    return weights
+
+
+def _check_weights(weights):
+    """Model weights as floats; raises ValueError unless weights maps names to numbers >= 0"""
+    if not isinstance(weights, dict):
+        raise ValueError("weights must map model names to numbers")
+    bad = [name for name, weight in weights.items()
+           if isinstance(weight, bool) or not isinstance(weight, numbers.Real) or not 0 <= weight < np.inf]
+    if bad:
+        raise ValueError(f"Model weights must be non-negative numbers: {bad}")
+    return {name: float(weight) for name, weight in weights.items()}
+
+
+class ModelEnsemble:
+    """
+    A set of named models scored together
+
+    Parameters:
+    - models: Dict of model name -> loaded model
+    - weights: Dict of model name -> weight for 'weighted' (and vote) combining; missing names weigh 1
+    - max_workers: Threads scoring models in parallel (default: one per model)
+
+    Every model receives the same featurized DataFrame, so readings are parsed
+    once per request regardless of how many models score them. `schema` holds
+    the columns all models need (see predict.readings_to_frame).
+    """
+
+    def __init__(self, models, weights=None, max_workers=None):
+        if not models:
+            raise ValueError("An ensemble needs at least one model")
+        self.models = dict(models)
+        self.weights = _check_weights(dict(weights or {}))
+        columns = []
+        for model in self.models.values():
+            columns.extend(col for col in feature_schema(model).columns if col not in columns)
+        self.schema = FeatureSchema(columns)
+        self._executor = ThreadPoolExecutor(max_workers=max_workers or len(self.models),
+                                            thread_name_prefix='ensemble')
+
+        # Combined probabilities are over the union of all models' classes
+        self.classes = np.unique(np.concatenate([np.asarray(m.classes_, dtype=np.float64)
+                                                 for m in self.models.values() if hasattr(m, 'classes_')]
+                                                or [np.empty(0)]))
+
+    @classmethod
+    def from_directory(cls, model_dir='models', names=None, weights=None):
+        """
+        Load models from a directory
+
+        Parameters:
+        - names: Model files or names to load (default: every .joblib file)
+        - weights: Dict (or "name=weight,..." string) of model weights
+        """
+        if names is None:
+            names = sorted(f for f in os.listdir(model_dir) if f.endswith('.joblib'))
+        models = {}
+        for name in names:
+            file_name = name if name.endswith('.joblib') else f"{name}.joblib"
+            models[file_name.replace('.joblib', '')] = load_model(file_name, model_dir=model_dir)
+        if isinstance(weights, str):
+            weights = parse_weights(weights)
+        return cls(models, weights=weights)
+
+    def _score(self, name, df):
+        t0 = time.perf_counter()
+        labels, probas = predict_frame(self.models[name], df)
+        return labels, probas, time.perf_counter() - t0
+
+    def _align(self, name, probas):
+        """Map a model's probability columns onto the ensemble's classes"""
+        model_classes = np.asarray(self.models[name].classes_, dtype=np.float64)
+        if len(model_classes) == len(self.classes) and np.array_equal(model_classes, self.classes):
+            return probas
+        aligned = np.zeros((len(probas), len(self.classes)))
+        aligned[:, np.searchsorted(self.classes, model_classes)] = probas
+        return aligned
+
+    def predict(self, df, combine='mean', weights=None, names=None):
+        """
+        Score a featurized DataFrame with every model (or `names`) in parallel
+
+        Parameters:
+        - df: Model input from predict.readings_to_frame
+        - combine: 'mean' probability, 'weighted' mean probability, or majority 'vote'
+          (weighted when weights are set)
+        - weights: Per-request weights overriding the ensemble's (numbers >= 0)
+        - names: Subset of model names to run (a list of strings)
+
+        Returns:
+        - dict with 'models' ({name: {'labels', 'probabilities', 'seconds'}}), and
+          'labels' and 'probabilities' of the combined verdict ('probabilities' are
+          vote shares for 'vote')
+        """
+        if combine not in COMBINE_METHODS:
+            raise ValueError(f"combine must be one of {COMBINE_METHODS}")
+        if names is not None and (not isinstance(names, (list, tuple))
+                                  or not all(isinstance(name, str) for name in names)):
+            raise ValueError("models must be a list of model names")
+        weights = dict(self.weights, **_check_weights(weights if weights is not None else {}))
+        names = list(names) if names else list(self.models)
+        unknown = [name for name in names if name not in self.models]
+        if unknown:
+            raise KeyError(f"Unknown models: {unknown}")
+
+        futures = {name: self._executor.submit(self._score, name, df) for name in names}
+        results = {}
+        for name, future in futures.items():
+            labels, probas, seconds = future.result()
+            results[name] = {'labels': labels, 'probabilities': probas, 'seconds': seconds}
+
+        model_weights = np.array([weights.get(name, 1.0) if combine != 'mean' else 1.0
+                                  for name in names], dtype=np.float64)
+        if model_weights.sum() <= 0:
+            raise ValueError("Model weights must sum to a positive number")
+
+        if combine == 'vote':
+            scores = np.zeros((len(df), len(self.classes)))
+            rows = np.arange(len(df))
+            for name, weight in zip(names, model_weights):
+                columns = np.searchsorted(self.classes, np.asarray(results[name]['labels'], dtype=np.float64))
+                scores[rows, columns] += weight
+        else:
+            missing = [name for name in names if results[name]['probabilities'] is None]
+            if missing:
+                raise ValueError(f"Models without probabilities cannot be averaged: {missing}")
+            scores = sum(weight * self._align(name, results[name]['probabilities'])
+                         for name, weight in zip(names, model_weights))
+        scores /= model_weights.sum()
+
+        return {
+            'models': results,
+            'labels': self.classes[scores.argmax(axis=1)],
+            'probabilities': scores
+        }
+
+    def close(self):
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,282 @@
+"""
+Stress Event Stores
+Backend interface for stress event persistence plus an embedded SQLite
+implementation that works offline (selected with EVENT_STORE=sqlite)
+"""
+import base64
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+
+
+def encode_cursor(timestamp, event_id):
+    """Opaque page token for the event after which the next page starts"""
+    payload = json.dumps({'t': timestamp.isoformat(), 'id': event_id})
+    return base64.urlsafe_b64encode(payload.encode()).decode()
+
+
+def decode_cursor(cursor):
+    """Inverse of encode_cursor(); returns (timestamp, event_id)"""
+    payload = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return datetime.fromisoformat(payload['t']), payload['id']
+
+
+def _as_datetime(value):
+    """Accept datetimes or ISO strings; naive values are taken as UTC"""
+    if isinstance(value, str):
+        value = datetime.fromisoformat(value)
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)
+    return value
+
+
+class EventStore:
+    """
+    Interface shared by stress event backends
+
+    Events are (event_id, event_data) pairs; writing an ID that already
+    exists replaces the event, so retried writes are idempotent.
+    """
+
+    def save_events(self, events):
+        """Write a list of (event_id, event_data) pairs as one batch"""
+        raise NotImplementedError
+
+    def save_event(self, event_data, event_id=None):
+        """Write a single event; returns its ID"""
+        event_id = event_id or uuid.uuid4().hex
+        self.save_events([(event_id, event_data)])
+        return event_id
+
+    def query_events(self, page_size=100, cursor=None, fields=None, start_time=None, end_time=None,
+                     stress_levels=None, model_name=None):
+        """One page of events, newest first; returns (events, next_cursor)"""
+        raise NotImplementedError
+
+    def close(self):
+        pass
+
+
+class SQLiteEventStore(EventStore):
+    """
+    Stress events in an embedded SQLite database
+
+    Parameters:
+    - path: Database file (':memory:' for a throwaway store)
+
+    Uses WAL journaling so readers never block the writer, and indexes on
+    timestamp, stress_level and model_name for range and aggregate queries.
+    The full event is kept as JSON next to the indexed columns.
+    """
+
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS stress_events (
+            id TEXT PRIMARY KEY,
+            timestamp REAL NOT NULL,
+            stress_level REAL,
+            confidence REAL,
+            model_name TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_stress_events_timestamp ON stress_events (timestamp);
+        CREATE INDEX IF NOT EXISTS idx_stress_events_level ON stress_events (stress_level, timestamp);
+        CREATE INDEX IF NOT EXISTS idx_stress_events_model ON stress_events (model_name, timestamp);
+    """
+
+    def __init__(self, path='stress_events.db'):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(self.SCHEMA)
+
+    @staticmethod
+    def _row(event_id, event_data):
+        event_data = dict(event_data)
+        timestamp = event_data.get('timestamp')
+        if isinstance(timestamp, (str, datetime)):
+            timestamp = _as_datetime(timestamp)
+        elif isinstance(timestamp, (int, float)):
+            timestamp = datetime.fromtimestamp(timestamp, timezone.utc)
+        else:
+            # Firestore's SERVER_TIMESTAMP sentinel (or missing): use the write time
+            timestamp = datetime.now(timezone.utc)
+        event_data['timestamp'] = timestamp.isoformat()
+        return (
+            event_id,
+            timestamp.timestamp(),
+            event_data.get('stress_level'),
+            event_data.get('confidence'),
+            event_data.get('model_name'),
+            json.dumps(event_data, default=str)
+        )
+
+    def save_events(self, events):
+        rows = [self._row(event_id, event_data) for event_id, event_data in events]
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO stress_events "
+                    "(id, timestamp, stress_level, confidence, model_name, data) VALUES (?, ?, ?, ?, ?, ?)",
+                    rows
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+
+    @staticmethod
+    def _where(start_time=None, end_time=None, stress_levels=None, model_name=None):
+        clauses, params = [], []
+        if model_name is not None:
+            clauses.append("model_name = ?")
+            params.append(model_name)
+        if stress_levels:
+            clauses.append(f"stress_level IN ({', '.join('?' * len(stress_levels))})")
+            params.extend(float(level) for level in stress_levels)
+        if start_time is not None:
+            clauses.append("timestamp >= ?")
+            params.append(_as_datetime(start_time).timestamp())
+        if end_time is not None:
+            clauses.append("timestamp < ?")
+            params.append(_as_datetime(end_time).timestamp())
+        return clauses, params
+
+    def query_events(self, page_size=100, cursor=None, fields=None, start_time=None, end_time=None,
+                     stress_levels=None, model_name=None):
+        clauses, params = self._where(start_time, end_time, stress_levels, model_name)
+        if cursor:
+            timestamp, event_id = decode_cursor(cursor)
+            timestamp = _as_datetime(timestamp).timestamp()
+            clauses.append("(timestamp < ? OR (timestamp = ? AND id < ?))")
+            params.extend([timestamp, timestamp, event_id])
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = f"SELECT id, data FROM stress_events {where} ORDER BY timestamp DESC, id DESC LIMIT ?"
+
+        with self._lock:
+            rows = self._conn.execute(sql, params + [page_size]).fetchall()
+
+        keep = set(fields) | {'timestamp'} if fields else None
+        events = []
+        for event_id, data in rows:
+            event_data = json.loads(data)
+            if keep is not None:
+                event_data = {key: value for key, value in event_data.items() if key in keep}
+            event_data['timestamp'] = datetime.fromisoformat(event_data['timestamp'])
+            event_data['id'] = event_id
+            events.append(event_data)
+
+        next_cursor = None
+        if len(events) == page_size:
+            next_cursor = encode_cursor(events[-1]['timestamp'], events[-1]['id'])
+        return events, next_cursor
+
+    def aggregate(self, group_by='stress_level', start_time=None, end_time=None, stress_levels=None,
+                  model_name=None):
+        """
+        Event counts and confidence statistics per group
+
+        Parameters:
+        - group_by: 'stress_level' or 'model_name'
+
+        Returns:
+        - Dict mapping group value -> {'count', 'mean_confidence', 'first', 'last'}
+        """
+        if group_by not in ('stress_level', 'model_name'):
+            raise ValueError(f"Cannot group by {group_by!r}")
+        clauses, params = self._where(start_time, end_time, stress_levels, model_name)
+        where = f"WHERE {' AND '.join(clauses)}" if clauses else ""
+        sql = (f"SELECT {group_by}, COUNT(*), AVG(confidence), MIN(timestamp), MAX(timestamp) "
+               f"FROM stress_events {where} GROUP BY {group_by}")
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return {
+            group: {
+                'count': count,
+                'mean_confidence': mean_confidence,
+                'first': datetime.fromtimestamp(first, timezone.utc),
+                'last': datetime.fromtimestamp(last, timezone.utc)
+            }
+            for group, count, mean_confidence, first, last in rows
+        }
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def create_event_store(backend=None, path=None):
+    """
+    Build the event store selected by config
+
+    Parameters:
+    - backend: 'sqlite' or 'firestore' (default: EVENT_STORE env var, else 'firestore')
+    - path: SQLite database file (default: EVENT_STORE_PATH env var, else stress_events.db)
+
+    Returns None for 'firestore', which firebase_config handles itself.
+    """
+    backend = (backend or os.getenv('EVENT_STORE', 'firestore')).lower()
+    if backend == 'sqlite':
+        return SQLiteEventStore(path or os.getenv('EVENT_STORE_PATH', 'stress_events.db'))
+    if backend == 'firestore':
+        return None
+    raise ValueError(f"Unknown event store backend: {backend}")
+
+
+def benchmark(n_events=100000, batch_size=500, path=':memory:'):
+    """Time batched inserts plus range and aggregate queries on a SQLite store"""
+    import random
+
+    store = SQLiteEventStore(path)
+    start = datetime(2024, 1, 1, tzinfo=timezone.utc).timestamp()
+    models = ['logistic_regression', 'gradient_boosting', 'mlp_classifier']
+    events = [
+        (uuid.uuid4().hex, {
+            'timestamp': start + i,
+            'stress_level': float(random.choice([1, 2])),
+            'confidence': random.random(),
+            'model_name': random.choice(models),
+            'sensor_data': {'HR': 80.0, 'EDA': 1.2, 'TEMP': 32.1}
+        })
+        for i in range(n_events)
+    ]
+
+    t0 = time.perf_counter()
+    for i in range(0, n_events, batch_size):
+        store.save_events(events[i:i + batch_size])
+    insert_s = time.perf_counter() - t0
+
+    window_start = datetime.fromtimestamp(start + n_events // 2, timezone.utc)
+    window_end = datetime.fromtimestamp(start + n_events // 2 + 3600, timezone.utc)
+    t0 = time.perf_counter()
+    page, _ = store.query_events(page_size=100, start_time=window_start, end_time=window_end,
+                                 stress_levels=[2], fields=['stress_level', 'confidence'])
+    range_ms = (time.perf_counter() - t0) * 1000
+
+    t0 = time.perf_counter()
+    store.aggregate('model_name', start_time=window_start, end_time=window_end)
+    aggregate_ms = (time.perf_counter() - t0) * 1000
+    store.close()
+
+    print(f"Inserted {n_events} events in batches of {batch_size}: "
+          f"{insert_s:.2f}s ({n_events / insert_s:,.0f} events/s)")
+    print(f"Range query (1h window, level 2, 100 rows): {range_ms:.2f}ms ({len(page)} rows)")
+    print(f"Aggregate by model (1h window): {aggregate_ms:.2f}ms")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Benchmark the SQLite stress event store")
+    ap.add_argument("--events", type=int, default=100000)
+    ap.add_argument("--batch-size", type=int, default=500)
+    ap.add_argument("--path", type=str, default=":memory:",
+                    help="Database file to benchmark against (default: in-memory)")
+    args = ap.parse_args()
+    benchmark(args.events, args.batch_size, args.path)
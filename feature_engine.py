@@ -0,0 +1,297 @@
+"""
+Rolling-Window Physiological Features
+Streaming per-device feature engine with O(1) amortized updates per reading,
+plus a vectorized pandas counterpart that computes the same features over a CSV
+"""
+import time
+
+import numpy as np
+import pandas as pd
+
+DEFAULT_WINDOWS = (10, 60, 300)
+RAW_COLUMNS = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP']
+# Per-window features, in output order
+WINDOW_FEATURES = ['EDA_mean', 'EDA_std', 'EDA_slope', 'HR_mean', 'HR_std', 'HR_rmssd',
+                   'TEMP_mean', 'TEMP_std', 'ACC_mag_mean', 'ACC_mag_std', 'ACC_energy']
+
+# Channels kept per reading in the ring buffer; EDA/HR/TEMP/MAG are stored
+# relative to the device's first reading so the running sums of squares stay
+# well conditioned (variance and slope do not depend on the shift)
+_EDA, _HR, _TEMP, _MAG, _EDA2, _HR2, _TEMP2, _MAG2, _DHR2, _TEDA = range(10)
+_CHANNELS = 10
+
+
+def feature_names(windows=DEFAULT_WINDOWS):
+    """Output column names, e.g. 'EDA_mean_60' (windows are counted in readings)"""
+    return [f"{feature}_{window}" for window in windows for feature in WINDOW_FEATURES]
+
+
+def _window_features(sums, n, oldest_dhr2, t_first, shift):
+    """
+    Features for every window from its running sums (vectorized over windows)
+
+    Parameters:
+    - sums: (n_windows, _CHANNELS) running sums
+    - n: (n_windows,) readings currently in each window
+    - oldest_dhr2: (n_windows,) squared HR difference of each window's oldest reading
+      (it belongs to the reading before the window, so RMSSD excludes it once the window is full)
+    - t_first: (n_windows,) sample index of each window's oldest reading
+    - shift: (4,) per-device offsets of EDA, HR, TEMP, MAG
+    """
+    mean = sums[:, _EDA:_MAG + 1] / n[:, None]
+    var = np.maximum(sums[:, _EDA2:_MAG2 + 1] / n[:, None] - mean ** 2, 0.0)
+    std = np.sqrt(var)
+
+    # Least-squares slope of EDA against sample index over the window
+    t_sum = n * t_first + n * (n - 1) / 2
+    t2_sum = n * t_first ** 2 + t_first * n * (n - 1) + (n - 1) * n * (2 * n - 1) / 6
+    denominator = n * t2_sum - t_sum ** 2
+    with np.errstate(invalid='ignore', divide='ignore'):
+        slope = np.where(denominator > 0,
+                         (n * sums[:, _TEDA] - t_sum * sums[:, _EDA]) / denominator, 0.0)
+        diffs = n - 1
+        rmssd = np.where(diffs > 0, np.sqrt(np.maximum(sums[:, _DHR2] - oldest_dhr2, 0.0) / diffs), 0.0)
+
+    mean = mean + shift
+    energy = var[:, 3] + mean[:, 3] ** 2
+    return np.column_stack([
+        mean[:, 0], std[:, 0], slope,
+        mean[:, 1], std[:, 1], rmssd,
+        mean[:, 2], std[:, 2],
+        mean[:, 3], std[:, 3], energy
+    ]).ravel()
+
+
+class _DeviceState:
+    """Ring buffer of the last max(windows) readings plus running sums per window"""
+
+    __slots__ = ('ring', 'sums', 'count', 'pos', 'base', 'shift', 'last_hr')
+
+    def __init__(self, n_windows, capacity):
+        self.ring = np.zeros((capacity, _CHANNELS))
+        self.sums = np.zeros((n_windows, _CHANNELS))
+        self.count = 0  # readings seen
+        self.pos = 0  # next ring slot
+        self.base = 0  # sample index that t = 0 refers to (moved forward to keep t * EDA small)
+        self.shift = None
+        self.last_hr = 0.0
+
+
+class StreamingFeatureEngine:
+    """
+    Per-device rolling-window features for streaming readings
+
+    Parameters:
+    - windows: Window lengths in readings (at 1 Hz, seconds)
+
+    Per window: mean/std of EDA, HR and TEMP, EDA slope (per reading), HR RMSSD
+    (root mean square of successive HR differences, a heart-rate variability proxy),
+    and mean/std/energy (mean of squares) of the accelerometer magnitude.
+    Windows that have not filled up yet use the readings seen so far.
+
+    Each update adds the new reading to every window's running sums and subtracts
+    the reading leaving it, so the cost does not depend on the window lengths.
+    The sums are recomputed from the ring buffer once per max(windows) readings,
+    which bounds floating-point drift at O(1) amortized cost.
+    """
+
+    def __init__(self, windows=DEFAULT_WINDOWS):
+        self.windows = np.asarray(sorted(windows), dtype=np.int64)
+        self.capacity = int(self.windows[-1])
+        self.feature_names = feature_names(self.windows.tolist())
+        self._devices = {}
+
+    def __len__(self):
+        return len(self._devices)
+
+    def reset(self, device_id=None):
+        """Forget one device's history, or every device's"""
+        if device_id is None:
+            self._devices.clear()
+        else:
+            self._devices.pop(device_id, None)
+
+    def update(self, device_id, X, Y, Z, EDA, HR, TEMP):
+        """
+        Add one reading for a device
+
+        Returns:
+        - float array of features in feature_names order
+        """
+        state = self._devices.get(device_id)
+        if state is None:
+            state = self._devices[device_id] = _DeviceState(len(self.windows), self.capacity)
+
+        mag = (X * X + Y * Y + Z * Z) ** 0.5
+        if state.shift is None:
+            state.shift = np.array([EDA, HR, TEMP, mag])
+            state.last_hr = HR
+        eda, hr, temp, mag = EDA - state.shift[0], HR - state.shift[1], TEMP - state.shift[2], mag - state.shift[3]
+        dhr = HR - state.last_hr
+        state.last_hr = HR
+        t = state.count - state.base
+        row = np.array([eda, hr, temp, mag, eda * eda, hr * hr, temp * temp, mag * mag, dhr * dhr, t * eda])
+
+        # Readings leaving each full window
+        leaving = state.count >= self.windows
+        if leaving.any():
+            slots = (state.pos - self.windows[leaving]) % self.capacity
+            state.sums[leaving] -= state.ring[slots]
+        state.sums += row
+        state.ring[state.pos] = row
+        state.count += 1
+        state.pos = (state.pos + 1) % self.capacity
+        if state.pos == 0:
+            self._rebase(state)
+
+        n = np.minimum(state.count, self.windows)
+        oldest_slots = (state.pos - n) % self.capacity
+        oldest_dhr2 = np.where(n == self.windows, state.ring[oldest_slots, _DHR2], 0.0)
+        t_first = (state.count - n - state.base).astype(np.float64)
+        return _window_features(state.sums, n.astype(np.float64), oldest_dhr2, t_first, state.shift)
+
+    def _rebase(self, state):
+        """Recompute the running sums exactly (ring slot j holds reading count - capacity + j)"""
+        state.base = state.count - self.capacity
+        state.ring[:, _TEDA] = np.arange(self.capacity) * state.ring[:, _EDA]
+        cumulative = np.cumsum(state.ring[::-1], axis=0)
+        n = np.minimum(state.count, self.windows)
+        state.sums[:] = cumulative[n - 1]
+
+    def update_many(self, device_ids, values):
+        """
+        Add readings in arrival order
+
+        Parameters:
+        - device_ids: Sequence of device IDs
+        - values: (n, 6) array in RAW_COLUMNS order
+
+        Returns:
+        - (n, n_features) array
+        """
+        out = np.empty((len(values), len(self.feature_names)))
+        for i, (device_id, reading) in enumerate(zip(device_ids, np.asarray(values, dtype=np.float64).tolist())):
+            out[i] = self.update(device_id, *reading)
+        return out
+
+
+def compute_features(df, windows=DEFAULT_WINDOWS, device_col='id', time_col='datetime'):
+    """
+    Offline counterpart of StreamingFeatureEngine over a whole DataFrame
+
+    Parameters:
+    - df: Readings with RAW_COLUMNS (and optionally device and time columns)
+    - device_col: Column with device IDs (all rows are one device if missing)
+    - time_col: Column to order each device's readings by (row order if missing)
+
+    Returns:
+    - DataFrame of features aligned with df's index (same values the streaming
+      engine produces when fed each device's readings in time order)
+    """
+    windows = sorted(windows)
+    if device_col in df.columns:
+        devices = df[device_col].astype(str)
+    else:
+        devices = pd.Series('default', index=df.index)
+    if time_col in df.columns:
+        order_key = pd.to_datetime(df[time_col], errors='coerce')
+        order = np.lexsort((np.arange(len(df)), order_key.to_numpy(), devices.to_numpy()))
+    else:
+        order = np.lexsort((np.arange(len(df)), devices.to_numpy()))
+
+    data = df.iloc[order]
+    groups = devices.iloc[order].to_numpy()
+    values = data[RAW_COLUMNS].to_numpy(dtype=np.float64)
+    mag = np.sqrt((values[:, :3] ** 2).sum(axis=1))
+    channels = pd.DataFrame({'EDA': values[:, 3], 'HR': values[:, 4], 'TEMP': values[:, 5], 'MAG': mag},
+                            index=data.index)
+    key = pd.Series(groups, index=data.index)
+    grouped = channels.groupby(key, sort=False)
+    t = grouped.cumcount().astype(np.float64)
+    dhr2 = grouped['HR'].diff().fillna(0.0) ** 2
+
+    features = {}
+    for window in windows:
+        roll = grouped.rolling(window, min_periods=1)
+        mean = roll.mean().reset_index(level=0, drop=True).loc[data.index]
+        std = roll.std(ddof=0).reset_index(level=0, drop=True).loc[data.index].fillna(0.0)
+
+        frame = pd.DataFrame({'t': t, 'eda': channels['EDA'], 'teda': t * channels['EDA']})
+        sums = frame.groupby(key, sort=False).rolling(window, min_periods=1).sum()
+        sums = sums.reset_index(level=0, drop=True).loc[data.index]
+        n = np.minimum(t + 1, window)
+        t_first = t - n + 1
+        t_sum = sums['t']
+        t2_sum = n * t_first ** 2 + t_first * n * (n - 1) + (n - 1) * n * (2 * n - 1) / 6
+        denominator = n * t2_sum - t_sum ** 2
+        slope = ((n * sums['teda'] - t_sum * sums['eda']) / denominator).where(denominator > 0, 0.0)
+
+        dhr2_window = dhr2.groupby(key, sort=False).rolling(max(window - 1, 1), min_periods=1).sum()
+        dhr2_window = dhr2_window.reset_index(level=0, drop=True).loc[data.index]
+        rmssd = np.sqrt(dhr2_window / (n - 1)).where(n > 1, 0.0)
+
+        energy = std['MAG'] ** 2 + mean['MAG'] ** 2
+        for name, column in [('EDA_mean', mean['EDA']), ('EDA_std', std['EDA']), ('EDA_slope', slope),
+                             ('HR_mean', mean['HR']), ('HR_std', std['HR']), ('HR_rmssd', rmssd),
+                             ('TEMP_mean', mean['TEMP']), ('TEMP_std', std['TEMP']),
+                             ('ACC_mag_mean', mean['MAG']), ('ACC_mag_std', std['MAG']),
+                             ('ACC_energy', energy)]:
+            features[f"{name}_{window}"] = column
+
+    return pd.DataFrame(features, index=data.index).loc[df.index]
+
+
+def benchmark(n_readings=100000, n_devices=100, windows=DEFAULT_WINDOWS):
+    """Time streaming updates and the offline computation on random readings"""
+    rng = np.random.default_rng(0)
+    values = np.column_stack([
+        rng.normal(0, 30, (n_readings, 3)),
+        rng.gamma(2.0, 0.5, n_readings),
+        rng.normal(80, 8, n_readings),
+        rng.normal(31, 1, n_readings)
+    ])
+    device_ids = rng.integers(0, n_devices, n_readings).tolist()
+
+    engine = StreamingFeatureEngine(windows)
+    t0 = time.perf_counter()
+    engine.update_many(device_ids, values)
+    streaming_s = time.perf_counter() - t0
+
+    df = pd.DataFrame(values, columns=RAW_COLUMNS)
+    df['id'] = device_ids
+    t0 = time.perf_counter()
+    compute_features(df, windows)
+    offline_s = time.perf_counter() - t0
+
+    print(f"{n_readings} readings, {n_devices} devices, windows {list(windows)}")
+    print(f"Streaming: {streaming_s / n_readings * 1e6:.1f}us per reading")
+    print(f"Offline:   {offline_s:.2f}s ({n_readings / offline_s:,.0f} readings/s)")
+
+
+def main():
+    import argparse
+
+    ap = argparse.ArgumentParser(description="Compute rolling-window physiological features over a CSV")
+    ap.add_argument("--csv", type=str, default="balanced_data.csv")
+    ap.add_argument("--out", type=str, default="features.csv",
+                    help="Output CSV: the input columns plus one column per feature")
+    ap.add_argument("--windows", type=int, nargs="+", default=list(DEFAULT_WINDOWS),
+                    help="Window lengths in readings (default: 10 60 300)")
+    ap.add_argument("--benchmark", action="store_true",
+                    help="Time streaming vs offline computation on random data instead")
+    args = ap.parse_args()
+
+    if args.benchmark:
+        benchmark(windows=args.windows)
+        return
+
+    df = pd.read_csv(args.csv)
+    t0 = time.perf_counter()
+    features = compute_features(df, args.windows)
+    print(f"Computed {features.shape[1]} features for {len(df)} readings in {time.perf_counter() - t0:.2f}s")
+    pd.concat([df, features], axis=1).to_csv(args.out, index=False)
+    print(f"Saved to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+"""
+Feature Schema
+The input columns of a loaded model, resolved once when the model is loaded:
+their order, whether each is a sensor field or a part of the reading's
+datetime, and their dtypes. Request paths assemble model input directly in
+this order instead of building, checking and reordering a DataFrame on every
+request.
+"""
+import threading
+import weakref
+
+import numpy as np
+
+SENSOR_COLUMNS = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP']
+# Derived datetime column -> pandas datetime attribute it is read from
+DATETIME_FIELDS = {
+    'datetime_year': 'year',
+    'datetime_month': 'month',
+    'datetime_day': 'day',
+    'datetime_hour': 'hour',
+    'datetime_dow': 'dayofweek'
+}
+# Column order of the bundled models, for models that do not record their input columns
+DEFAULT_COLUMNS = SENSOR_COLUMNS + list(DATETIME_FIELDS)
+
+
+class FeatureSchema:
+    """
+    Model input columns and how to derive them from readings
+
+    Parameters:
+    - columns: Input column names in the order the model expects
+
+    Attributes:
+    - columns: Column names in model order
+    - index: Column name -> position in the model input
+    - sensor_columns: Sensor fields read from each reading, in model order
+    - datetime_fields: (column, datetime attribute) pairs derived from the reading's datetime
+    - unknown_columns: Columns that cannot be derived from a reading; building a
+      frame from readings raises ValueError, and from_table() takes them from the table
+    """
+
+    def __init__(self, columns):
+        self.unknown_columns = [col for col in columns if col not in SENSOR_COLUMNS and col not in DATETIME_FIELDS]
+        self.columns = list(columns)
+        self.index = {col: i for i, col in enumerate(self.columns)}
+        self.sensor_columns = [col for col in self.columns if col in SENSOR_COLUMNS]
+        self.datetime_fields = [(col, DATETIME_FIELDS[col]) for col in self.columns if col in DATETIME_FIELDS]
+        self._dtypes = {
+            np.dtype(np.float64): {**{col: np.dtype(np.float64) for col in self.sensor_columns},
+                                   **{col: np.dtype(np.int64) for col, _ in self.datetime_fields}},
+            # Datetime parts fit small integers: int16 years, int8 for the rest
+            np.dtype(np.float32): {**{col: np.dtype(np.float32) for col in self.sensor_columns},
+                                   **{col: np.dtype(np.int16 if col == 'datetime_year' else np.int8)
+                                      for col, _ in self.datetime_fields}}
+        }
+
+    @classmethod
+    def from_model(cls, model):
+        """
+        Resolve a model's input columns: feature_names_in_ (sklearn pipelines and
+        compiled models), else the columns its ColumnTransformer selects, else
+        DEFAULT_COLUMNS
+        """
+        columns = getattr(model, 'feature_names_in_', None)
+        if columns is None:
+            columns = _column_transformer_columns(model)
+        return cls(list(columns) if columns is not None else DEFAULT_COLUMNS)
+
+    def __repr__(self):
+        return f"FeatureSchema({self.columns})"
+
+    def dtypes(self, dtype=np.float64):
+        """Column -> dtype for float64 inference or the float32 mode"""
+        return self._dtypes[np.dtype(dtype)]
+
+    def _check_derivable(self):
+        if self.unknown_columns:
+            raise ValueError(f"Model input columns cannot be derived from a reading: {self.unknown_columns}")
+
+    def frame(self, readings, dtype=np.float64, now=None):
+        """
+        Build the model input DataFrame for readings, in model order
+
+        Parameters:
+        - readings: List of dicts with the sensor fields and an optional datetime
+          string (defaults to now)
+        - dtype: np.float64, or np.float32 for the float32 mode
+        - now: Datetime string for readings without one (default: the current time)
+        """
+        self._check_derivable()
+        dtypes = self.dtypes(dtype)
+        data = {col: np.array([float(reading[col]) for reading in readings], dtype=dtypes[col])
+                for col in self.sensor_columns}
+        return self._assemble(data, [reading.get('datetime') for reading in readings], dtype, now)
+
+    def frame_from_matrix(self, values, fields, datetimes, dtype=np.float64, now=None):
+        """
+        Build the model input DataFrame from already validated values (see
+        request_validator.RequestValidator)
+
+        Parameters:
+        - values: (n, len(fields)) float matrix
+        - fields: Field of each matrix column; must include the schema's sensor columns
+        - datetimes: Datetime string (or None for now) of each row, or the
+          datetime64 values parse_datetimes returned for them
+        - dtype: np.float64, or np.float32 for the float32 mode
+        - now: Datetime string for rows without one (default: the current time)
+        """
+        self._check_derivable()
+        dtypes = self.dtypes(dtype)
+        position = {field: i for i, field in enumerate(fields)}
+        data = {col: values[:, position[col]].astype(dtypes[col], copy=False) for col in self.sensor_columns}
+        return self._assemble(data, datetimes, dtype, now)
+
+    def _assemble(self, data, datetimes, dtype, now):
+        """Add the datetime-derived columns to the sensor columns in data and order them"""
+        import pandas as pd
+
+        dtypes = self.dtypes(dtype)
+        if self.datetime_fields:
+            dt = parse_datetimes(datetimes, now=now).dt
+            for col, attr in self.datetime_fields:
+                data[col] = getattr(dt, attr).to_numpy(dtype=dtypes[col])
+        return pd.DataFrame({col: data[col] for col in self.columns}, copy=False)
+
+    def from_table(self, df, dtype=np.float64):
+        """
+        Select and derive the model input from a table (e.g. a CSV) with the
+        sensor columns and either a 'datetime' column or the derived columns.
+        Columns that cannot be derived from a reading are taken from the table as is.
+        """
+        import pandas as pd
+
+        dtypes = self.dtypes(dtype)
+        data = {col: df[col].to_numpy(dtype=dtypes[col]) for col in self.sensor_columns}
+        missing = [col for col in self.unknown_columns if col not in df.columns]
+        if missing:
+            raise ValueError(f"Model input columns missing from the table: {missing}")
+        data.update({col: df[col].to_numpy() for col in self.unknown_columns})
+        dt = None
+        for col, attr in self.datetime_fields:
+            if col in df.columns:
+                data[col] = df[col].to_numpy(dtype=dtypes[col])
+                continue
+            if dt is None:
+                if 'datetime' not in df.columns:
+                    raise ValueError(f"Need a 'datetime' column to derive {col}")
+                dt = pd.to_datetime(df['datetime']).dt
+            data[col] = getattr(dt, attr).to_numpy(dtype=dtypes[col])
+        return pd.DataFrame({col: data[col] for col in self.columns}, copy=False)
+
+
+def parse_datetimes(values, now=None, errors='raise'):
+    """
+    Parse the datetimes of readings, each in its own format (a batch may mix
+    "2020-05-08 22:11:34" with "2020-05-08 22:11:34.250000"). None or an empty
+    string stands for `now`.
+
+    Parameters:
+    - values: Datetime strings (or None), or datetime64 values already parsed
+    - now: Datetime string for missing values (default: the current time, to the second)
+    - errors: 'raise' to raise ValueError for a value that is not a datetime
+      string, or 'coerce' to return NaT for it
+
+    Returns a Series of naive datetime64 values (timezone-aware strings keep
+    their wall-clock time)
+    """
+    import pandas as pd
+
+    now = pd.Timestamp(now) if now else pd.Timestamp.now().floor('s')
+    if getattr(values, 'dtype', None) is not None and values.dtype.kind == 'M':
+        return pd.Series(np.asarray(values)).fillna(now)
+
+    values = list(values)
+    series = pd.Series(values, dtype=object)
+    # Only strings are datetimes; pandas would read a number as epoch nanoseconds
+    invalid = np.zeros(len(values), dtype=bool)
+    if not set(map(type, values)) <= {str, type(None)}:
+        invalid = np.array([value is not None and not isinstance(value, str) for value in values], dtype=bool)
+        series[invalid] = None
+    absent = (series.isna() | (series == '')).to_numpy() & ~invalid
+
+    try:
+        parsed = pd.to_datetime(series, format='mixed', errors='coerce')
+        if parsed.dt.tz is not None:
+            parsed = parsed.dt.tz_localize(None)
+    except (ValueError, TypeError):
+        # Strings with different timezones: parse each on its own
+        parsed = pd.Series([_parse_datetime(value) for value in series], dtype='datetime64[ns]')
+    parsed[absent] = now
+    bad = (parsed.isna().to_numpy() & ~absent) | invalid
+    if bad.any():
+        if errors == 'raise':
+            raise ValueError(f"Invalid datetime: {values[int(bad.argmax())]!r}")
+        parsed[bad] = pd.NaT
+    return parsed
+
+
+def _parse_datetime(value):
+    """One datetime string as a naive Timestamp (NaT if it does not parse)"""
+    import pandas as pd
+
+    try:
+        timestamp = pd.Timestamp(value)
+    except (ValueError, TypeError):
+        return pd.NaT
+    return timestamp.tz_localize(None) if timestamp.tzinfo is not None else timestamp
+
+
+def _column_transformer_columns(model):
+    """Columns selected by a pipeline's ColumnTransformer, if it only selects named columns"""
+    steps = getattr(model, 'steps', None)
+    prep = steps[0][1] if steps else model
+    transformers = getattr(prep, 'transformers_', None)
+    if transformers is None:
+        return None
+    columns = []
+    for name, transformer, selected in transformers:
+        if transformer == 'drop':
+            continue
+        if name == 'remainder' or not all(isinstance(col, str) for col in selected):
+            return None
+        columns.extend(col for col in selected if col not in columns)
+    return columns
+
+
+_schemas = weakref.WeakKeyDictionary()
+_schemas_lock = threading.Lock()
+
+
+def feature_schema(model):
+    """
+    The FeatureSchema of a loaded model, resolved on the first call (load_model
+    makes that call) and cached for the model's lifetime
+    """
+    try:
+        return _schemas[model]
+    except KeyError:
+        pass
+    except TypeError:
+        # Not weak-referenceable: resolve without caching
+        return FeatureSchema.from_model(model)
+    schema = FeatureSchema.from_model(model)
+    with _schemas_lock:
+        return _schemas.setdefault(model, schema)
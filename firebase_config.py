@@ -1,14 +1,33 @@
 """
 Firebase Configuration and Helper Functions
 """
-import firebase_admin
-from firebase_admin import credentials, db, firestore
+import atexit
 import os
-from datetime import datetime
+import queue
+import random
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from event_buffer import EventBuffer
+from event_store import create_event_store, encode_cursor, decode_cursor, _as_datetime
+
+# firebase_admin (and google-cloud-firestore) take ~300 ms to import, so they are
+# imported where used: scripts using the SQLite store or printing --help never load them
 
 # Initialize Firebase (will be done in main app)
 firebase_app = None
 firestore_db = None
+# Local event store replacing Firestore when configured (see configure_event_store)
+_event_store = None
+# Background batched writer (see start_event_writer)
+_event_writer = None
+_event_writer_realtime_db = False
+# Durable local write-ahead buffer (see start_event_buffer)
+_event_buffer = None
+
+STRESS_EVENTS_COLLECTION = 'stress_events'
+FIRESTORE_MAX_BATCH = 500  # Firestore limit on writes per batch commit
 
 def initialize_firebase(credential_path=None, database_url=None, use_firestore=True):
     """
@@ -25,6 +44,9 @@ def initialize_firebase(credential_path=None, database_url=None, use_firestore=T
         return firebase_app
     
     try:
+        import firebase_admin
+        from firebase_admin import credentials, firestore
+        
         if credential_path and os.path.exists(credential_path):
             cred = credentials.Certificate(credential_path)
         else:
@@ -47,7 +69,69 @@ def initialize_firebase(credential_path=None, database_url=None, use_firestore=T
         print("Make sure you have firebase_admin installed: pip install firebase-admin")
         return None
 
-def save_stress_event(stress_level, confidence, sensor_data=None, model_name=None):
+def configure_event_store(backend=None, path=None):
+    """
+    Select where stress events are stored
+    
+    Parameters:
+    - backend: 'firestore' (default) or 'sqlite'; defaults to the EVENT_STORE env var
+    - path: SQLite database file; defaults to the EVENT_STORE_PATH env var or stress_events.db
+    
+    With 'sqlite', save_stress_event(), get_stress_events(), query_stress_events()
+    and the batched writer use the local store and need no Firebase setup.
+    """
+    global _event_store
+    
+    if _event_store is not None:
+        _event_store.close()
+    _event_store = create_event_store(backend, path)
+    if _event_store is not None:
+        print(f"Using SQLite event store: {_event_store.path}")
+    return _event_store
+
+def get_event_store():
+    """The configured local event store, or None when events go to Firebase"""
+    return _event_store
+
+def build_stress_event(stress_level, confidence, sensor_data=None, model_name=None, realtime_db=False,
+                       extra=None, server_timestamp=None):
+    """
+    Build the document stored for a stress event
+    
+    Parameters:
+    - realtime_db: If True, use an ISO timestamp (Realtime Database has no server timestamp sentinel here)
+    - extra: Optional dict of additional fields (e.g. episode details from stress_episodes)
+    - server_timestamp: If True, stamp Firestore's SERVER_TIMESTAMP; if False, the local time (UTC).
+      Defaults to True unless a local event store is configured, so local events never need firebase_admin
+    """
+    if server_timestamp is None:
+        server_timestamp = _event_store is None
+    if realtime_db:
+        event_data = {'timestamp': datetime.now().isoformat()}
+    elif server_timestamp:
+        from firebase_admin import firestore
+        event_data = {
+            'timestamp': firestore.SERVER_TIMESTAMP,
+            'timestamp_readable': datetime.now().isoformat(),
+        }
+    else:
+        event_data = {
+            'timestamp': datetime.now(timezone.utc),
+            'timestamp_readable': datetime.now().isoformat(),
+        }
+    event_data.update({
+        'stress_level': float(stress_level),
+        'confidence': float(confidence),
+        'model_name': model_name,
+    })
+    
+    if sensor_data:
+        event_data['sensor_data'] = sensor_data
+    if extra:
+        event_data.update(extra)
+    return event_data
+
+def save_stress_event(stress_level, confidence, sensor_data=None, model_name=None, extra=None):
     """
     Save a stress event to Firebase
     
@@ -56,27 +140,31 @@ def save_stress_event(stress_level, confidence, sensor_data=None, model_name=Non
     - confidence: Confidence score (0-1)
     - sensor_data: Optional sensor readings dict
     - model_name: Optional model that made the prediction
+    - extra: Optional dict of additional fields to store
     """
     global firestore_db
     
+    if _event_buffer is not None:
+        return buffer_stress_event(stress_level, confidence, sensor_data, model_name, extra=extra)
+    
+    if _event_store is not None:
+        try:
+            event_data = build_stress_event(stress_level, confidence, sensor_data, model_name, extra=extra)
+            _event_store.save_event(event_data)
+            return True
+        except Exception as e:
+            print(f"Error saving stress event: {e}")
+            return False
+    
     if firestore_db is None:
         print("Firebase not initialized. Cannot save stress event.")
         return False
     
     try:
-        event_data = {
-            'timestamp': firestore.SERVER_TIMESTAMP,
-            'timestamp_readable': datetime.now().isoformat(),
-            'stress_level': float(stress_level),
-            'confidence': float(confidence),
-            'model_name': model_name,
-        }
-        
-        if sensor_data:
-            event_data['sensor_data'] = sensor_data
+        event_data = build_stress_event(stress_level, confidence, sensor_data, model_name, extra=extra)
         
         # Save to Firestore
-        doc_ref = firestore_db.collection('stress_events').add(event_data)
+        doc_ref = firestore_db.collection(STRESS_EVENTS_COLLECTION).add(event_data)
         print(f"Stress event saved: Level {stress_level} at {event_data['timestamp_readable']}")
         return True
         
@@ -84,37 +172,114 @@ def save_stress_event(stress_level, confidence, sensor_data=None, model_name=Non
         print(f"Error saving stress event: {e}")
         return False
 
-def get_stress_events(limit=100):
+def get_stress_events(limit=100, **filters):
     """
     Retrieve recent stress events from Firebase
     
     Parameters:
     - limit: Maximum number of events to retrieve
+    - filters: Optional query_stress_events() filters (fields, start_time, end_time, stress_levels, model_name)
     
     Returns:
     - List of stress event documents
     """
     global firestore_db
     
-    if firestore_db is None:
+    if firestore_db is None and _event_store is None:
         return []
     
     try:
-        events_ref = firestore_db.collection('stress_events')
-        events = events_ref.order_by('timestamp', direction=firestore.Query.DESCENDING).limit(limit).stream()
-        
-        event_list = []
-        for event in events:
-            event_data = event.to_dict()
-            event_data['id'] = event.id
-            event_list.append(event_data)
-        
-        return event_list
+        events, _ = query_stress_events(page_size=limit, **filters)
+        return events
     except Exception as e:
         print(f"Error retrieving stress events: {e}")
         return []
 
-def save_stress_event_realtime_db(stress_level, confidence, sensor_data=None, model_name=None):
+def query_stress_events(page_size=100, cursor=None, fields=None, start_time=None, end_time=None,
+                        stress_levels=None, model_name=None):
+    """
+    Retrieve one page of stress events, newest first
+    
+    Parameters:
+    - page_size: Maximum number of events in the page
+    - cursor: Token returned with the previous page (None for the first page)
+    - fields: Optional list of fields to fetch (projection); 'timestamp' is always included.
+      Leaving out 'sensor_data' avoids transferring the nested payload.
+    - start_time, end_time: Optional datetime or ISO string bounds (start inclusive, end exclusive)
+    - stress_levels: Optional list of stress levels to include
+    - model_name: Optional model name to match
+    
+    Returns:
+    - (events, next_cursor): next_cursor is None when there are no more pages
+    
+    Filtering on stress_levels or model_name together with the timestamp
+    ordering needs a composite index; Firestore's error message links to it.
+    """
+    if _event_store is not None:
+        return _event_store.query_events(page_size=page_size, cursor=cursor, fields=fields,
+                                         start_time=start_time, end_time=end_time,
+                                         stress_levels=stress_levels, model_name=model_name)
+    if firestore_db is None:
+        return [], None
+    
+    from firebase_admin import firestore
+    collection_ref = firestore_db.collection(STRESS_EVENTS_COLLECTION)
+    query = collection_ref
+    if model_name is not None:
+        query = query.where(filter=firestore.FieldFilter('model_name', '==', model_name))
+    if stress_levels:
+        query = query.where(filter=firestore.FieldFilter('stress_level', 'in', [float(l) for l in stress_levels]))
+    if start_time is not None:
+        query = query.where(filter=firestore.FieldFilter('timestamp', '>=', _as_datetime(start_time)))
+    if end_time is not None:
+        query = query.where(filter=firestore.FieldFilter('timestamp', '<', _as_datetime(end_time)))
+    
+    # Document ID breaks ties between events with the same timestamp
+    query = query.order_by('timestamp', direction=firestore.Query.DESCENDING)
+    query = query.order_by('__name__', direction=firestore.Query.DESCENDING)
+    if fields:
+        query = query.select(sorted(set(fields) | {'timestamp'}))
+    if cursor:
+        timestamp, event_id = decode_cursor(cursor)
+        query = query.start_after({'timestamp': timestamp, '__name__': event_id})
+    
+    events = []
+    for event in query.limit(page_size).stream():
+        event_data = event.to_dict()
+        event_data['id'] = event.id
+        events.append(event_data)
+    
+    next_cursor = None
+    if len(events) == page_size:
+        next_cursor = encode_cursor(events[-1]['timestamp'], events[-1]['id'])
+    return events, next_cursor
+
+def iter_stress_events(page_size=100, max_events=None, **filters):
+    """
+    Lazily stream stress events page by page, newest first
+    
+    Parameters:
+    - page_size: Events fetched per query
+    - max_events: Optional cap on the number of events yielded
+    - filters: query_stress_events() filters (fields, start_time, end_time, stress_levels, model_name)
+    
+    Only one page is held in memory at a time.
+    """
+    cursor = None
+    yielded = 0
+    while True:
+        if max_events is not None:
+            page_size = min(page_size, max_events - yielded)
+            if page_size <= 0:
+                return
+        events, cursor = query_stress_events(page_size=page_size, cursor=cursor, **filters)
+        for event in events:
+            yield event
+        yielded += len(events)
+        if cursor is None:
+            return
+
+def save_stress_event_realtime_db(stress_level, confidence, sensor_data=None, model_name=None, extra=None):
     """
     Save stress event to Firebase Realtime Database (alternative to Firestore)
     """
@@ -125,18 +290,12 @@ def save_stress_event_realtime_db(stress_level, confidence, sensor_data=None, mo
         return False
     
     try:
-        event_data = {
-            'timestamp': datetime.now().isoformat(),
-            'stress_level': float(stress_level),
-            'confidence': float(confidence),
-            'model_name': model_name,
-        }
-        
-        if sensor_data:
-            event_data['sensor_data'] = sensor_data
+        event_data = build_stress_event(stress_level, confidence, sensor_data, model_name, realtime_db=True,
+                                        extra=extra)
         
         # Save to Realtime Database
-        ref = db.reference('stress_events')
+        from firebase_admin import db
+        ref = db.reference(STRESS_EVENTS_COLLECTION)
         new_event_ref = ref.push(event_data)
         print(f"Stress event saved to Realtime DB: Level {stress_level}")
         return True
@@ -145,3 +304,300 @@ def save_stress_event_realtime_db(stress_level, confidence, sensor_data=None, mo
         print(f"Error saving stress event: {e}")
         return False
 
+def new_event_id():
+    """Random document ID for an event, so retried writes overwrite instead of duplicating"""
+    return uuid.uuid4().hex
+
+def commit_firestore_batch(events, client=None, collection=STRESS_EVENTS_COLLECTION):
+    """
+    Write events to Firestore with batch commits (one round-trip per FIRESTORE_MAX_BATCH events)
+    
+    Parameters:
+    - events: List of (event_id, event_data) tuples
+    - client: Firestore client (defaults to the initialized one); any object with
+      collection()/batch() works, e.g. the emulator or a fake in tests
+    """
+    client = client if client is not None else firestore_db
+    if client is None:
+        raise RuntimeError("Firebase not initialized")
+    
+    collection_ref = client.collection(collection)
+    for start in range(0, len(events), FIRESTORE_MAX_BATCH):
+        batch = client.batch()
+        for event_id, event_data in events[start:start + FIRESTORE_MAX_BATCH]:
+            batch.set(collection_ref.document(event_id), event_data)
+        batch.commit()
+
+def commit_realtime_db_batch(events, reference=None, path=STRESS_EVENTS_COLLECTION):
+    """
+    Write events to the Realtime Database with a single multi-path update
+    
+    Parameters:
+    - events: List of (event_id, event_data) tuples
+    - reference: Database reference to write under (defaults to db.reference(path))
+    """
+    if reference is None:
+        if firebase_app is None:
+            raise RuntimeError("Firebase not initialized")
+        from firebase_admin import db
+        reference = db.reference(path)
+    reference.update({event_id: event_data for event_id, event_data in events})
+
+class BatchedEventWriter:
+    """
+    Background writer that groups stress events into batched commits
+    
+    Parameters:
+    - commit: Callable(list of (event_id, event_data)) that writes one batch and raises on failure
+    - flush_size: Maximum events per commit
+    - flush_interval: Maximum seconds an event waits before its batch is committed
+    - max_queue_size: Bound on pending events; submit() drops events when full
+    - max_retries: Retries per batch before it is given up
+    - backoff_base, backoff_max: Exponential backoff bounds (seconds, with jitter)
+    """
+    
+    def __init__(self, commit, flush_size=50, flush_interval=1.0, max_queue_size=10000,
+                 max_retries=5, backoff_base=0.5, backoff_max=30.0):
+        self.commit = commit
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        
+        self._queue = queue.Queue(maxsize=max_queue_size)
+        self._closing = threading.Event()
+        self._metrics_lock = threading.Lock()
+        self._metrics = {
+            'submitted': 0,
+            'committed': 0,
+            'dropped': 0,
+            'failed': 0,
+            'batches': 0,
+            'retries': 0
+        }
+        self._thread = threading.Thread(target=self._run, name='event-writer', daemon=True)
+        self._thread.start()
+    
+    def _count(self, key, n=1):
+        with self._metrics_lock:
+            self._metrics[key] += n
+    
+    def submit(self, event_data, event_id=None):
+        """Queue an event without blocking; returns False if it was dropped"""
+        if self._closing.is_set():
+            return False
+        try:
+            self._queue.put_nowait((event_id or new_event_id(), event_data))
+        except queue.Full:
+            self._count('dropped')
+            return False
+        self._count('submitted')
+        return True
+    
+    def _next_batch(self):
+        """Collect up to flush_size events, waiting at most flush_interval after the first"""
+        try:
+            first = self._queue.get(timeout=self.flush_interval)
+        except queue.Empty:
+            return []
+        batch = [first]
+        deadline = time.monotonic() + self.flush_interval
+        while len(batch) < self.flush_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0 or self._closing.is_set():
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+    
+    def _commit_with_retries(self, batch):
+        for attempt in range(self.max_retries + 1):
+            try:
+                self.commit(batch)
+                self._count('committed', len(batch))
+                self._count('batches')
+                return True
+            except Exception as e:
+                if attempt == self.max_retries:
+                    print(f"Error saving {len(batch)} stress events, giving up: {e}")
+                    self._count('failed', len(batch))
+                    return False
+                delay = min(self.backoff_max, self.backoff_base * (2 ** attempt)) * random.uniform(0.5, 1.5)
+                print(f"Error saving {len(batch)} stress events (retry in {delay:.1f}s): {e}")
+                self._count('retries')
+                time.sleep(delay)
+    
+    def _run(self):
+        while True:
+            batch = self._next_batch()
+            if batch:
+                self._commit_with_retries(batch)
+                for _ in batch:
+                    self._queue.task_done()
+            elif self._closing.is_set():
+                break
+    
+    def flush(self, timeout=None):
+        """Wait until every queued event has been committed or given up; returns False on timeout"""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._queue.all_tasks_done:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._queue.all_tasks_done.wait(remaining)
+        return True
+    
+    def close(self, timeout=30.0):
+        """Stop accepting events, drain the queue and stop the thread (drain-on-shutdown hook)"""
+        self._closing.set()
+        drained = self.flush(timeout)
+        self._thread.join(0 if not drained else timeout)
+        return drained
+    
+    def metrics(self):
+        """Counters plus current queue depth"""
+        with self._metrics_lock:
+            metrics = dict(self._metrics)
+        metrics['queue_depth'] = self._queue.qsize()
+        return metrics
+
+def start_event_writer(use_firestore=True, flush_size=None, flush_interval=None, **kwargs):
+    """
+    Start the module-level batched writer used by enqueue_stress_event()
+    
+    Parameters:
+    - use_firestore: If True, commit Firestore batches; if False, Realtime Database multi-path updates.
+      Ignored when a local event store is configured (its batched inserts are used).
+    - flush_size: Events per commit (default: EVENT_FLUSH_SIZE env var or 50)
+    - flush_interval: Seconds before a partial batch is committed (default: EVENT_FLUSH_INTERVAL env var or 1.0)
+    - kwargs: Passed to BatchedEventWriter
+    """
+    global _event_writer, _event_writer_realtime_db
+    
+    if _event_writer is not None:
+        return _event_writer
+    
+    if flush_size is None:
+        flush_size = int(os.getenv('EVENT_FLUSH_SIZE', '50'))
+    if flush_interval is None:
+        flush_interval = float(os.getenv('EVENT_FLUSH_INTERVAL', '1.0'))
+    
+    if _event_store is not None:
+        commit = _event_store.save_events
+        use_firestore = True
+    else:
+        commit = commit_firestore_batch if use_firestore else commit_realtime_db_batch
+    _event_writer = BatchedEventWriter(commit, flush_size=flush_size, flush_interval=flush_interval, **kwargs)
+    _event_writer_realtime_db = not use_firestore
+    atexit.register(stop_event_writer)
+    return _event_writer
+
+def stop_event_writer(timeout=30.0):
+    """Drain pending events and stop the module-level writer"""
+    global _event_writer
+    
+    if _event_writer is None:
+        return True
+    writer, _event_writer = _event_writer, None
+    return writer.close(timeout)
+
+def enqueue_stress_event(stress_level, confidence, sensor_data=None, model_name=None, extra=None):
+    """
+    Queue a stress event for the batched writer without blocking on the network
+    
+    Goes to the durable buffer when one is running, and falls back to a
+    synchronous save_stress_event() when neither a buffer nor a writer is running.
+    """
+    if _event_buffer is not None:
+        return buffer_stress_event(stress_level, confidence, sensor_data, model_name, extra=extra)
+    
+    writer = _event_writer
+    if writer is None:
+        return save_stress_event(stress_level, confidence, sensor_data=sensor_data, model_name=model_name,
+                                 extra=extra)
+    
+    event_data = build_stress_event(stress_level, confidence, sensor_data, model_name,
+                                    realtime_db=_event_writer_realtime_db, extra=extra)
+    return writer.submit(event_data)
+
+def start_event_buffer(directory=None, use_firestore=True, batch_size=None, fsync=None, **kwargs):
+    """
+    Start the durable local buffer used by save_stress_event() and enqueue_stress_event()
+    
+    Events are appended to a write-ahead log on disk and replayed to the backend
+    in batches with idempotent document IDs, so they survive backend outages and
+    restarts. Events left over from a previous run are replayed on start.
+    
+    Parameters:
+    - directory: Buffer directory (default: EVENT_BUFFER_DIR env var or event_buffer)
+    - use_firestore: If True, replay as Firestore batches; if False, Realtime Database updates.
+      Ignored when a local event store is configured.
+    - batch_size: Events per replayed batch (default: EVENT_FLUSH_SIZE env var or 100)
+    - fsync: fsync every append (default: EVENT_BUFFER_FSYNC env var, 'true')
+    - kwargs: Passed to EventBuffer
+    """
+    global _event_buffer, _event_writer_realtime_db
+    
+    if _event_buffer is not None:
+        return _event_buffer
+    
+    if directory is None:
+        directory = os.getenv('EVENT_BUFFER_DIR', 'event_buffer')
+    if batch_size is None:
+        batch_size = min(int(os.getenv('EVENT_FLUSH_SIZE', '100')), FIRESTORE_MAX_BATCH)
+    if fsync is None:
+        fsync = os.getenv('EVENT_BUFFER_FSYNC', 'true').lower() == 'true'
+    
+    if _event_store is not None:
+        commit = _event_store.save_events
+        use_firestore = True
+    else:
+        commit = commit_firestore_batch if use_firestore else commit_realtime_db_batch
+    _event_buffer = EventBuffer(directory, commit, batch_size=batch_size, fsync=fsync, **kwargs)
+    _event_writer_realtime_db = not use_firestore
+    pending = _event_buffer.depth
+    print(f"Event buffer started in {directory}" + (f" ({pending} events to replay)" if pending else ""))
+    atexit.register(stop_event_buffer)
+    return _event_buffer
+
+def stop_event_buffer(timeout=5.0):
+    """Replay what can be replayed within timeout and stop; the rest stays on disk for the next start"""
+    global _event_buffer
+    
+    if _event_buffer is None:
+        return True
+    buffer, _event_buffer = _event_buffer, None
+    return buffer.close(timeout)
+
+def buffer_stress_event(stress_level, confidence, sensor_data=None, model_name=None, extra=None):
+    """
+    Append a stress event to the durable buffer (see start_event_buffer)
+    
+    The event is stamped with the local time it was buffered rather than a server
+    timestamp, so events replayed after an outage keep their original time.
+    """
+    buffer = _event_buffer
+    if buffer is None:
+        print("Event buffer not started. Cannot buffer stress event.")
+        return False
+    
+    event_data = build_stress_event(stress_level, confidence, sensor_data, model_name,
+                                    realtime_db=_event_writer_realtime_db, extra=extra, server_timestamp=False)
+    try:
+        return buffer.append(event_data, new_event_id())
+    except OSError as e:
+        print(f"Error buffering stress event: {e}")
+        return False
+
+def get_event_pipeline_metrics():
+    """Metrics of the running buffer or batched writer (None when events are written synchronously)"""
+    if _event_buffer is not None:
+        return _event_buffer.metrics()
+    if _event_writer is not None:
+        return _event_writer.metrics()
+    return None
@@ -6,9 +6,10 @@ from flask import Flask, request, jsonify
 from flask_cors import CORS
 from datetime import datetime
 import os
-import joblib
-import pandas as pd
-import numpy as np
+from predict import load_model, predict_frame, inference_dtype
+from feature_schema import feature_schema
+from request_validator import RequestValidator
+from warmup import Warmup, synthetic_readings
 
 app = Flask(__name__)
 CORS(app)
@@ -20,85 +21,23 @@ port = int(os.environ.get("PORT", 7860))
 MODEL_NAME = os.getenv('MODEL_NAME', 'random_forest.joblib')
 MODEL_DIR = os.getenv('MODEL_DIR', 'models')
 
+REQUIRED_FIELDS = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP']
+
 print(f"Loading model: {MODEL_NAME}")
 try:
-    model_path = os.path.join(MODEL_DIR, MODEL_NAME)
-    model = joblib.load(model_path)
-    print("Model loaded successfully!")
+    # Same loader as app.py: compiled model, cached artifact and INFERENCE_DTYPE
+    model = load_model(MODEL_NAME, model_dir=MODEL_DIR)
+    # Input columns, order and dtypes are resolved once here, not per request
+    print(f"Model loaded successfully! Input columns: {feature_schema(model).columns}")
 except Exception as e:
     print(f"Error loading model: {e}")
     model = None
 
-# extract_datetime_features function removed - now handled in predict_single_point
+# Reading checks shared with app.py, built once (VALIDATION_RANGES overrides the sensor ranges)
+validator = RequestValidator.from_env(fields=REQUIRED_FIELDS)
 
-def predict_single_point(model, X, Y, Z, EDA, HR, TEMP, datetime_str):
-    """Make prediction for a single data point - ensures DataFrame is maintained"""
-    # Parse datetime first
-    dt = pd.to_datetime(datetime_str)
-    
-    # Get expected column order from model (ColumnTransformer uses column NAMES, not indices)
-    if hasattr(model, 'feature_names_in_'):
-        expected_columns = model.feature_names_in_.tolist()
-    else:
-        # Fallback: use the standard order
-        expected_columns = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP', 
-                          'datetime_year', 'datetime_month', 'datetime_day', 
-                          'datetime_hour', 'datetime_dow']
-    
-    # Create DataFrame with values in EXACT order expected by model
-    # ColumnTransformer uses column NAMES (not indices), so it REQUIRES a DataFrame
-    # Create as list of lists to ensure exact order and column assignment
-    values = [
-        float(X),
-        float(Y),
-        float(Z),
-        float(EDA),
-        float(HR),
-        float(TEMP),
-        int(dt.year),
-        int(dt.month),
-        int(dt.day),
-        int(dt.hour),
-        int(dt.dayofweek)
-    ]
-    
-    # Create DataFrame with explicit column names - ColumnTransformer needs column names
-    df = pd.DataFrame([values], columns=expected_columns)
-    
-    # Ensure DataFrame type and reset index to avoid any index issues
-    if not isinstance(df, pd.DataFrame):
-        raise TypeError(f"Failed to create DataFrame, got {type(df)}")
-    
-    # Reset index to ensure clean DataFrame
-    df = df.reset_index(drop=True)
-    
-    # Verify we have a DataFrame (not array) - ColumnTransformer will fail with array
-    if not isinstance(df, pd.DataFrame):
-        raise TypeError(f"Expected pandas DataFrame, got {type(df)}")
-    
-    # Verify columns match exactly (ColumnTransformer uses column names)
-    if list(df.columns) != expected_columns:
-        df = df[expected_columns]
-        # Re-verify after reordering
-        if not isinstance(df, pd.DataFrame):
-            df = pd.DataFrame(df, columns=expected_columns)
-    
-    # Ensure all columns are present
-    missing_cols = set(expected_columns) - set(df.columns)
-    if missing_cols:
-        raise ValueError(f"Missing columns in DataFrame: {missing_cols}")
-    
-    # Make prediction - ColumnTransformer REQUIRES DataFrame with named columns
-    # It was trained with column names, so it cannot accept numpy arrays
-    prediction = model.predict(df)[0]
-    
-    # Get probabilities if available
-    try:
-        probabilities = model.predict_proba(df)[0]
-    except:
-        probabilities = None
-    
-    return prediction, probabilities
+# Synthetic requests run at startup before /readyz reports ready (WARMUP, WARMUP_ROUNDS, WARMUP_BATCH_SIZE)
+warmup = Warmup.from_env()
 
 @app.route('/')
 def home():
@@ -109,7 +48,9 @@ def home():
         'model': MODEL_NAME if model else 'not loaded',
         'endpoints': {
             '/predict': 'POST - Predict label from sensor data',
-            '/health': 'GET - Check API health'
+            '/health': 'GET - Check API health',
+            '/livez': 'GET - Liveness probe (process is up)',
+            '/readyz': 'GET - Readiness probe (model loaded and warmed up)'
         }
     })
 
@@ -118,9 +59,25 @@ def health():
     """Health check endpoint"""
     return jsonify({
         'status': 'healthy',
-        'model_loaded': model is not None
+        'model_loaded': model is not None,
+        'ready': model is not None and warmup.ready
     })
 
+@app.route('/livez', methods=['GET'])
+def livez():
+    """Liveness probe: the process is up and serving requests"""
+    return jsonify({'status': 'alive'})
+
+@app.route('/readyz', methods=['GET'])
+def readyz():
+    """Readiness probe: 200 once the model is loaded and warm-up has finished, 503 before"""
+    ready = model is not None and warmup.ready
+    return jsonify({
+        'status': 'ready' if ready else 'not ready',
+        'model_loaded': model is not None,
+        'warmup': warmup.describe()
+    }), 200 if ready else 503
+
 @app.route('/predict', methods=['POST'])
 def predict():
     """
@@ -136,49 +93,34 @@ def predict():
         "TEMP": 30.37,
         "datetime": "2020-05-08 22:11:34"  // optional
     }
+    
+    Invalid readings are rejected with 400 and an error code, as in app.py
+    (see request_validator.ERROR_CODES).
     """
     if model is None:
         return jsonify({'error': 'Model not loaded'}), 500
     
     try:
-        data = request.get_json()
-        
-        # Validate required fields
-        required_fields = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP']
-        missing_fields = [field for field in required_fields if field not in data]
-        
-        if missing_fields:
-            return jsonify({
-                'error': f'Missing required fields: {missing_fields}'
-            }), 400
+        data = request.get_json(silent=True)
+        checked = validator.validate([data])
+        if not checked.valid[0]:
+            return jsonify(checked.error_details(0)), 400
         
         # Get datetime or use current time
-        datetime_str = data.get('datetime', datetime.now().strftime("%Y-%m-%d %H:%M:%S"))
+        datetime_str = checked.datetimes[0] or datetime.now().strftime("%Y-%m-%d %H:%M:%S")
         
-        # Make prediction
-        predicted_label, probabilities = predict_single_point(
-            model=model,
-            X=float(data['X']),
-            Y=float(data['Y']),
-            Z=float(data['Z']),
-            EDA=float(data['EDA']),
-            HR=float(data['HR']),
-            TEMP=float(data['TEMP']),
-            datetime_str=datetime_str
-        )
+        # Make prediction (the row is assembled in the model's column order by its FeatureSchema)
+        _, df = checked.valid_frame(feature_schema(model), dtype=inference_dtype())
+        labels, probas = predict_frame(model, df)
+        predicted_label = labels[0]
+        probabilities = probas[0] if probas is not None else None
         
         # Prepare response
+        input_data = {field: data[field] for field in REQUIRED_FIELDS}
+        input_data['datetime'] = datetime_str
         response = {
             'predicted_label': float(predicted_label),
-            'input_data': {
-                'X': data['X'],
-                'Y': data['Y'],
-                'Z': data['Z'],
-                'EDA': data['EDA'],
-                'HR': data['HR'],
-                'TEMP': data['TEMP'],
-                'datetime': datetime_str
-            }
+            'input_data': input_data
         }
         
         # Add probabilities if available
@@ -209,6 +151,24 @@ def predict():
         
         return jsonify(error_details), 500
 
+def _warmup_steps():
+    """A single request and a burst of varied requests through the full /predict path"""
+    client = app.test_client()
+    readings = synthetic_readings(warmup.batch_size)
+
+    def post(payloads):
+        def step():
+            for payload in payloads:
+                response = client.post('/predict', json=payload)
+                if response.status_code != 200:
+                    raise RuntimeError(f"/predict returned {response.status_code}: {response.get_json()}")
+        return step
+
+    return [('predict', post(readings[:1])), ('predict_burst', post(readings))]
+
+if model is not None:
+    warmup.start(_warmup_steps())
+
 if __name__ == '__main__':
     app.run(host='0.0.0.0', port=port, debug=False)
 
@@ -0,0 +1,141 @@
+"""
+Import Profile
+Start-up cost of the command-line tools and servers: runs each entry point in
+fresh processes under `python -X importtime` and summarizes where the time
+goes (slowest top-level imports, slowest modules overall) next to the
+measured wall-clock start time.
+
+Usage:
+    python import_profile.py                          # every CLI entry point with --help
+    python import_profile.py "predict.py --help" app  # scripts (with arguments) or module names
+    python import_profile.py --top 20 --budget-ms 200 # exit non-zero if a start exceeds the budget
+"""
+import argparse
+import os
+import shlex
+import statistics
+import subprocess
+import sys
+import time
+
+# Entry points checked by default; servers are imported rather than started
+DEFAULT_TARGETS = [
+    'predict.py --help',
+    'view_stress_events.py --help',
+    'clear_sensor_data.py --help',
+    'sensor_simulator.py --help',
+    'compiled_models.py --help',
+    'model_artifacts.py --help',
+    'precision_report.py --help',
+]
+
+
+def _command(target):
+    """'script.py args' runs the script; anything else is imported as a module"""
+    parts = shlex.split(target)
+    if parts[0].endswith('.py'):
+        return [sys.executable, '-X', 'importtime'] + parts
+    return [sys.executable, '-X', 'importtime', '-c', f"import {target}"]
+
+
+def parse_importtime(stderr):
+    """
+    Parse `-X importtime` output
+
+    Returns a list of (module, self_us, cumulative_us, depth) in import order;
+    depth 0 is a module imported directly by the program
+    """
+    imports = []
+    for line in stderr.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # header line
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        imports.append((name.strip(), int(fields[0]), int(fields[1]), depth))
+    return imports
+
+
+def _run(command, cwd=None):
+    t0 = time.perf_counter()
+    completed = subprocess.run(command, capture_output=True, text=True, cwd=cwd, stdin=subprocess.DEVNULL,
+                               env=dict(os.environ, PYTHONDONTWRITEBYTECODE='1'), timeout=120)
+    return (time.perf_counter() - t0) * 1000, parse_importtime(completed.stderr)
+
+
+def interpreter_modules():
+    """Modules every interpreter imports before running a program (site, encodings, ...)"""
+    return {name for name, _, _, _ in _run([sys.executable, '-X', 'importtime', '-c', 'pass'])[1]}
+
+
+def profile(target, runs=3, cwd=None, baseline=None):
+    """
+    Profile one entry point
+
+    Parameters:
+    - target: 'script.py args' or a module name
+    - runs: Fresh processes; the start time is their median
+    - baseline: Module names to leave out (default: interpreter_modules())
+
+    Returns a dict with 'start_ms' (wall clock), 'import_ms' (the program's own
+    imports), 'direct' (modules the program imports itself) and 'imports'
+    ((module, self_us, cumulative_us, depth) of the fastest run)
+    """
+    if baseline is None:
+        baseline = interpreter_modules()
+    results = [_run(_command(target), cwd=cwd) for _ in range(runs)]
+    imports = [i for i in min(results, key=lambda result: result[0])[1] if i[0] not in baseline]
+    # A module target is itself the one top-level import; report what it imports
+    direct_depth = 0 if shlex.split(target)[0].endswith('.py') else 1
+    return {
+        'target': target,
+        'start_ms': statistics.median(start for start, _ in results),
+        'import_ms': sum(cumulative for _, _, cumulative, depth in imports if depth == 0) / 1000,
+        'direct': [i for i in imports if i[3] == direct_depth],
+        'imports': imports
+    }
+
+
+def print_profile(result, top=10):
+    """Print the slowest top-level imports and the slowest modules by self time"""
+    print(f"\n{result['target']}: start {result['start_ms']:.0f} ms, imports {result['import_ms']:.0f} ms")
+    direct = sorted(result['direct'], key=lambda i: -i[2])[:top]
+    print(f"  {'top-level import':<40}{'cumulative':>12}")
+    for name, _, cumulative, _ in direct:
+        print(f"  {name:<40}{cumulative / 1000:>10.1f}ms")
+    slowest = sorted(result['imports'], key=lambda i: -i[1])[:top]
+    print(f"  {'module (self time)':<40}{'self':>12}")
+    for name, self_us, _, _ in slowest:
+        print(f"  {name:<40}{self_us / 1000:>10.1f}ms")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Summarize `python -X importtime` for the entry points")
+    ap.add_argument("targets", nargs='*', help="Scripts with arguments (quoted) or module names")
+    ap.add_argument("--runs", type=int, default=3, help="Fresh processes per target (default: 3)")
+    ap.add_argument("--top", type=int, default=10, help="Imports listed per target (default: 10)")
+    ap.add_argument("--budget-ms", type=float, default=None,
+                    help="Exit non-zero if any target's median start time exceeds this")
+    args = ap.parse_args()
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    baseline = interpreter_modules()
+    results = [profile(target, runs=args.runs, cwd=here, baseline=baseline)
+               for target in args.targets or DEFAULT_TARGETS]
+    for result in results:
+        print_profile(result, top=args.top)
+
+    print(f"\n{'target':<40}{'start':>10}{'imports':>10}")
+    for result in results:
+        print(f"{result['target']:<40}{result['start_ms']:>8.0f}ms{result['import_ms']:>8.0f}ms")
+
+    if args.budget_ms is not None:
+        over = [r['target'] for r in results if r['start_ms'] > args.budget_ms]
+        if over:
+            raise SystemExit(f"Start time above {args.budget_ms:.0f} ms: {', '.join(over)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,187 @@
+"""
+Streaming Inference Sessions
+Per-device session state for the prediction API: class probabilities are
+smoothed across readings (EMA or fixed-window vote) in O(1) per reading,
+and idle sessions are evicted under a memory cap
+"""
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+SMOOTHING_MODES = ('ema', 'vote')
+
+
+class InferenceSession:
+    """
+    Smoothing state for one device
+
+    Parameters:
+    - device_id: Device the session belongs to
+    - smoothing: 'ema' (exponential moving average of probabilities) or
+      'vote' (majority of the last `window` predicted labels)
+    - alpha: EMA weight of the newest reading (0-1]
+    - window: Number of labels in the vote
+    """
+
+    __slots__ = ('device_id', 'smoothing', 'alpha', 'window', 'created', 'last_seen', 'readings',
+                 'lock', '_probs', '_labels', '_counts', '_pos')
+
+    def __init__(self, device_id, smoothing='ema', alpha=0.3, window=5):
+        if smoothing not in SMOOTHING_MODES:
+            raise ValueError(f"smoothing must be one of {SMOOTHING_MODES}")
+        alpha, window = float(alpha), int(window)
+        if not 0 < alpha <= 1:
+            raise ValueError("alpha must be in (0, 1]")
+        if window < 1:
+            raise ValueError("window must be at least 1")
+        self.device_id = device_id
+        self.smoothing = smoothing
+        self.alpha = alpha
+        self.window = window
+        self.created = self.last_seen = time.time()
+        self.readings = 0
+        self.lock = threading.Lock()  # held by callers applying a request's readings in order
+        self._probs = None  # EMA probabilities
+        self._labels = None  # vote ring buffer of class indices
+        self._counts = None  # votes per class in the ring
+        self._pos = 0
+
+    def update(self, probabilities):
+        """
+        Add one reading's class probabilities
+
+        Returns:
+        - (class_index, smoothed_probabilities) after this reading
+        """
+        probabilities = np.asarray(probabilities, dtype=np.float64)
+        self.readings += 1
+        if self.smoothing == 'ema':
+            if self._probs is None:
+                self._probs = probabilities.copy()
+            else:
+                self._probs += self.alpha * (probabilities - self._probs)
+            return int(self._probs.argmax()), self._probs
+
+        label = int(probabilities.argmax())
+        if self._labels is None:
+            self._labels = np.full(self.window, -1, dtype=np.int16)
+            self._counts = np.zeros(len(probabilities), dtype=np.int64)
+        leaving = self._labels[self._pos]
+        if leaving >= 0:
+            self._counts[leaving] -= 1
+        self._labels[self._pos] = label
+        self._counts[label] += 1
+        self._pos = (self._pos + 1) % self.window
+
+        votes = self._counts / min(self.readings, self.window)
+        best = self._counts.max()
+        # Ties go to the newest label when it is among the leaders
+        winner = label if self._counts[label] == best else int(self._counts.argmax())
+        return winner, votes
+
+    def describe(self):
+        return {
+            'device_id': self.device_id,
+            'smoothing': self.smoothing,
+            'alpha': self.alpha,
+            'window': self.window,
+            'readings': self.readings,
+            'created': self.created,
+            'idle_seconds': time.time() - self.last_seen
+        }
+
+
+class SessionStore:
+    """
+    Thread-safe LRU of inference sessions keyed by device ID
+
+    Parameters:
+    - max_sessions: Cap on open sessions; opening one more evicts the least recently used
+    - idle_ttl: Seconds without readings after which a session is evicted
+    - smoothing, alpha, window: Defaults for new sessions (see InferenceSession)
+
+    Sessions are kept in least-recently-used order, so idle eviction only ever
+    looks at the oldest entries (amortized O(1) per call).
+    """
+
+    def __init__(self, max_sessions=10000, idle_ttl=900.0, smoothing='ema', alpha=0.3, window=5):
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.defaults = {'smoothing': smoothing, 'alpha': alpha, 'window': window}
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.evicted_idle = 0
+        self.evicted_capacity = 0
+
+    @classmethod
+    def from_env(cls):
+        """Build a store from SESSION_* environment variables"""
+        return cls(
+            max_sessions=int(os.getenv('SESSION_MAX', '10000')),
+            idle_ttl=float(os.getenv('SESSION_IDLE_TTL', '900')),
+            smoothing=os.getenv('SESSION_SMOOTHING', 'ema'),
+            alpha=float(os.getenv('SESSION_ALPHA', '0.3')),
+            window=int(os.getenv('SESSION_WINDOW', '5'))
+        )
+
+    def _evict_idle(self, now):
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.idle_ttl:
+                break
+            self._sessions.popitem(last=False)
+            self.evicted_idle += 1
+
+    def open(self, device_id, **options):
+        """
+        Open (or reset) the session for a device
+
+        Parameters:
+        - options: smoothing, alpha, window overriding the store defaults
+        """
+        settings = dict(self.defaults)
+        settings.update({key: value for key, value in options.items() if value is not None})
+        session = InferenceSession(device_id, **settings)
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            self._sessions.pop(device_id, None)
+            while len(self._sessions) >= self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted_capacity += 1
+            self._sessions[device_id] = session
+        return session
+
+    def get(self, device_id):
+        """The device's session (marked as used), or None if it was never opened or was evicted"""
+        now = time.time()
+        with self._lock:
+            self._evict_idle(now)
+            session = self._sessions.get(device_id)
+            if session is not None:
+                session.last_seen = now
+                self._sessions.move_to_end(device_id)
+            return session
+
+    def close(self, device_id):
+        """Remove a session; returns False if it did not exist"""
+        with self._lock:
+            return self._sessions.pop(device_id, None) is not None
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def stats(self):
+        with self._lock:
+            self._evict_idle(time.time())
+            return {
+                'open_sessions': len(self._sessions),
+                'max_sessions': self.max_sessions,
+                'idle_ttl': self.idle_ttl,
+                'evicted_idle': self.evicted_idle,
+                'evicted_capacity': self.evicted_capacity,
+                'defaults': dict(self.defaults)
+            }
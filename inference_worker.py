@@ -0,0 +1,128 @@
+"""
+Background Inference Worker
+Ingests sensor readings, runs inference and persists stress events off the
+web request thread, publishing the results as an in-memory snapshot
+"""
+import threading
+import time
+import traceback
+
+
+class InferenceWorker:
+    """
+    Runs ingest -> inference -> persist continuously in a daemon thread.
+
+    Parameters:
+    - load_readings: Callable returning a DataFrame of sensor readings (with a 'timestamp' column)
+    - predict: Callable(readings) returning a dict of predictions per model
+    - persist: Optional callable(readings, predictions) that saves stress events
+    - ingest: Optional callable(readings) run before inference whenever new
+      readings arrive (e.g. to update a history buffer)
+    - interval: Seconds between polls for new readings
+
+    Renderers call snapshot() and never wait on models or on the event store.
+    """
+
+    def __init__(self, load_readings, predict, persist=None, ingest=None, interval=0.2):
+        self.load_readings = load_readings
+        self.predict = predict
+        self.persist = persist
+        self.ingest = ingest
+        self.interval = interval
+
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._last_timestamp = None
+        self._snapshot = {
+            'data': None,
+            'predictions': {},
+            'version': 0,
+            'updated_at': None,
+            'timings': {}
+        }
+
+    def start(self):
+        """Start the worker thread (no-op if it is already running)"""
+        with self._lock:
+            if self._thread is not None and self._thread.is_alive():
+                return self
+            self._stop_event.clear()
+            self._thread = threading.Thread(target=self._run, name='inference-worker', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self, timeout=5.0):
+        """Signal the worker to stop and wait for the current iteration to finish"""
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    @property
+    def running(self):
+        return self._thread is not None and self._thread.is_alive()
+
+    def snapshot(self):
+        """Latest published state; the dict is never mutated after publication"""
+        with self._lock:
+            return self._snapshot
+
+    def _publish(self, data, predictions, timings):
+        with self._lock:
+            self._snapshot = {
+                'data': data,
+                'predictions': predictions,
+                'version': self._snapshot['version'] + 1,
+                'updated_at': time.time(),
+                'timings': timings
+            }
+
+    def _run(self):
+        while not self._stop_event.is_set():
+            started = time.perf_counter()
+            try:
+                self.step()
+            except Exception as e:
+                print(f"Inference worker error: {e}")
+                traceback.print_exc()
+            elapsed = time.perf_counter() - started
+            self._stop_event.wait(max(0.0, self.interval - elapsed))
+
+    def step(self):
+        """
+        Run one ingest/inference/persist iteration.
+
+        Returns True if a new snapshot was published.
+        """
+        t0 = time.perf_counter()
+        data = self.load_readings()
+        t1 = time.perf_counter()
+
+        if data is None or data.empty:
+            if self._last_timestamp is None and self._snapshot['data'] is not None:
+                return False
+            self._last_timestamp = None
+            self._publish(data, {}, {'load_ms': (t1 - t0) * 1000})
+            return True
+
+        latest_timestamp = data.iloc[-1]['timestamp']
+        if latest_timestamp == self._last_timestamp:
+            return False
+        self._last_timestamp = latest_timestamp
+
+        if self.ingest is not None:
+            self.ingest(data)
+
+        predictions = self.predict(data)
+        t2 = time.perf_counter()
+        timings = {'load_ms': (t1 - t0) * 1000, 'inference_ms': (t2 - t1) * 1000}
+
+        # Publish before persisting so a slow event store never delays rendering
+        self._publish(data, predictions, timings)
+
+        if self.persist is not None:
+            try:
+                self.persist(data, predictions)
+            except Exception as e:
+                print(f"Error persisting stress events: {e}")
+        return True
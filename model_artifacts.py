@@ -0,0 +1,285 @@
+"""
+Model Artifacts
+Ahead-of-time export of the bundled models into a versioned, self-describing
+format that loads by memory-mapping arrays, without sklearn or unpickling:
+
+    models/<name>.artifact/
+        header.json    format version, kernel kind, input columns, classes,
+                       scalar parameters, source model checksum, and the file,
+                       dtype, shape and sha256 of every array
+        <array>.npy    one contiguous array per file
+
+predict.load_model picks up models/<name>.artifact in place of <name>.joblib
+when the artifact was exported from that exact joblib file.
+
+Usage:
+    python model_artifacts.py export       # every models/*.joblib -> models/*.artifact
+    python model_artifacts.py verify       # checksums and parity against the joblib models
+    python model_artifacts.py benchmark    # cold start and peak RSS vs joblib.load
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import subprocess
+import sys
+from datetime import datetime, timezone
+
+import numpy as np
+
+from compiled_models import KERNEL_KINDS, CompiledPipeline
+
+FORMAT = 'stress-model-artifact'
+FORMAT_VERSION = 1
+HEADER_FILE = 'header.json'
+
+
+class ArtifactError(Exception):
+    """An artifact is missing, corrupt, or from an unsupported format version"""
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def artifact_path(model_path):
+    """models/name.joblib -> models/name.artifact"""
+    return os.path.splitext(model_path)[0] + '.artifact'
+
+
+def export_artifact(compiled, path, source_path=None):
+    """
+    Write a compiled model (compiled_models.compile_model) as an artifact directory
+
+    Parameters:
+    - compiled: CompiledPipeline to export
+    - path: Artifact directory to create (replaced if it exists)
+    - source_path: The joblib file it was compiled from (its checksum goes in the header)
+
+    Returns the header dict
+    """
+    kernel = compiled.kernel
+    arrays = kernel.to_arrays(tables=True) if kernel.kind == 'trees' else kernel.to_arrays()
+
+    tmp = f"{path}.tmp-{os.getpid()}"
+    shutil.rmtree(tmp, ignore_errors=True)
+    os.makedirs(tmp)
+    header = {
+        'format': FORMAT,
+        'format_version': FORMAT_VERSION,
+        'kind': kernel.kind,
+        'columns': list(compiled.columns),
+        'classes': [c.item() if hasattr(c, 'item') else c for c in compiled.classes_],
+        'params': {},
+        'arrays': {},
+        'created': datetime.now(timezone.utc).isoformat(),
+        'numpy_version': np.__version__
+    }
+    if 'sklearn' in sys.modules:
+        header['sklearn_version'] = sys.modules['sklearn'].__version__
+    if source_path:
+        header['source'] = {'file': os.path.basename(source_path), 'sha256': file_sha256(source_path)}
+
+    for name, value in arrays.items():
+        if not isinstance(value, np.ndarray):
+            header['params'][name] = value.item() if hasattr(value, 'item') else value
+            continue
+        file_name = f"{name}.npy"
+        np.save(os.path.join(tmp, file_name), np.ascontiguousarray(value), allow_pickle=False)
+        header['arrays'][name] = {
+            'file': file_name,
+            'dtype': value.dtype.str,
+            'shape': list(value.shape),
+            'sha256': file_sha256(os.path.join(tmp, file_name))
+        }
+    with open(os.path.join(tmp, HEADER_FILE), 'w') as f:
+        json.dump(header, f, indent=2)
+
+    # Swap the finished directory into place so readers never see a partial artifact
+    if os.path.exists(path):
+        old = f"{path}.old-{os.getpid()}"
+        os.rename(path, old)
+        os.rename(tmp, path)
+        shutil.rmtree(old, ignore_errors=True)
+    else:
+        os.rename(tmp, path)
+    return header
+
+
+def read_header(path):
+    """Read and check an artifact's header.json"""
+    try:
+        with open(os.path.join(path, HEADER_FILE)) as f:
+            header = json.load(f)
+    except (OSError, ValueError) as e:
+        raise ArtifactError(f"Cannot read artifact header in {path}: {e}")
+    if header.get('format') != FORMAT:
+        raise ArtifactError(f"{path} is not a {FORMAT}")
+    if header.get('format_version', 0) > FORMAT_VERSION:
+        raise ArtifactError(f"{path} has format version {header['format_version']}; "
+                            f"this loader supports up to {FORMAT_VERSION}")
+    if header.get('kind') not in KERNEL_KINDS:
+        raise ArtifactError(f"{path} has unknown model kind {header.get('kind')!r}")
+    return header
+
+
+def load_artifact(path, verify=None, mmap=True):
+    """
+    Load an artifact as a CompiledPipeline
+
+    Parameters:
+    - path: Artifact directory
+    - verify: Check array checksums (default: on unless ARTIFACT_VERIFY=0)
+    - mmap: Memory-map the arrays instead of reading them into memory
+    """
+    if verify is None:
+        verify = os.getenv('ARTIFACT_VERIFY', '1') != '0'
+    header = read_header(path)
+    arrays = dict(header['params'])
+    for name, spec in header['arrays'].items():
+        file_path = os.path.join(path, spec['file'])
+        if verify and file_sha256(file_path) != spec['sha256']:
+            raise ArtifactError(f"Checksum mismatch for {file_path}")
+        try:
+            array = np.load(file_path, mmap_mode='r' if mmap else None, allow_pickle=False)
+        except (OSError, ValueError) as e:
+            raise ArtifactError(f"Cannot read {file_path}: {e}")
+        if array.dtype.str != spec['dtype'] or list(array.shape) != spec['shape']:
+            raise ArtifactError(f"{file_path} does not match its header (dtype/shape)")
+        arrays[name] = array
+    kernel = KERNEL_KINDS[header['kind']].from_arrays(arrays)
+    return CompiledPipeline(None, header['columns'], kernel, np.array(header['classes']))
+
+
+def is_current(path, source_path):
+    """True if the artifact at path was exported from source_path as it is now"""
+    try:
+        source = read_header(path).get('source')
+    except ArtifactError:
+        return False
+    return bool(source) and os.path.exists(source_path) and source['sha256'] == file_sha256(source_path)
+
+
+def _model_files(model_dir):
+    return sorted(f for f in os.listdir(model_dir) if f.endswith('.joblib'))
+
+
+def export_all(model_dir='models'):
+    """Export every compilable joblib model in model_dir next to it"""
+    import joblib
+    from compiled_models import compile_model
+
+    for file_name in _model_files(model_dir):
+        source_path = os.path.join(model_dir, file_name)
+        compiled = compile_model(joblib.load(source_path))
+        if compiled is None:
+            print(f"{file_name:<32} skipped (cannot be compiled)")
+            continue
+        path = artifact_path(source_path)
+        header = export_artifact(compiled, path, source_path=source_path)
+        size = sum(os.path.getsize(os.path.join(path, f)) for f in os.listdir(path))
+        print(f"{file_name:<32} -> {os.path.basename(path)} ({header['kind']}, {len(header['arrays'])} arrays, "
+              f"{size / 1024:.1f} KB)")
+
+
+def verify_all(model_dir='models', n=2000):
+    """Check every artifact's checksums, freshness and parity with its joblib model"""
+    import joblib
+    from compiled_models import _sample_frame
+
+    df = _sample_frame(n)
+    ok = True
+    for file_name in _model_files(model_dir):
+        source_path = os.path.join(model_dir, file_name)
+        path = artifact_path(source_path)
+        if not os.path.isdir(path):
+            print(f"{file_name:<32} no artifact")
+            continue
+        try:
+            compiled = load_artifact(path, verify=True)
+        except ArtifactError as e:
+            print(f"{file_name:<32} INVALID: {e}")
+            ok = False
+            continue
+        current = is_current(path, source_path)
+        error = float(np.abs(compiled.predict_proba(df) - joblib.load(source_path).predict_proba(df)).max())
+        ok &= current and error < compiled.kernel.tolerance
+        print(f"{file_name:<32} checksums ok, {'current' if current else 'STALE'}, max |dp| = {error:.2e}")
+    return ok
+
+
+# Child process for benchmark(): time one cold load and first prediction, report peak RSS
+_COLD_START = """
+import json, resource, sys, time
+import numpy as np
+mode, path, columns = sys.argv[1], sys.argv[2], json.loads(sys.argv[3])
+row = np.array([[-21.0, -53.0, 27.0, 0.21, 75.0, 30.4, 2020, 5, 8, 22, 4]])
+if mode == 'joblib':
+    # The sklearn pipeline needs a DataFrame; pandas is not part of the measured load
+    import pandas as pd
+    row = pd.DataFrame(row, columns=columns)
+baseline_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+t0 = time.perf_counter()
+if mode == 'joblib':
+    import joblib
+    model = joblib.load(path)
+else:
+    from model_artifacts import load_artifact
+    model = load_artifact(path)
+t1 = time.perf_counter()
+model.predict_proba(row)
+t2 = time.perf_counter()
+print(json.dumps({'load_ms': (t1 - t0) * 1000, 'first_predict_ms': (t2 - t1) * 1000,
+                  'baseline_rss_mb': baseline_rss / 1024,
+                  'peak_rss_mb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024}))
+"""
+
+
+def benchmark(model_dir='models', runs=5):
+    """Compare cold-start load time and peak RSS of joblib.load vs load_artifact, in fresh processes"""
+    here = os.path.dirname(os.path.abspath(__file__))
+    env = dict(os.environ, PYTHONPATH=here + os.pathsep + os.environ.get('PYTHONPATH', ''))
+    print(f"Median of {runs} fresh processes; +RSS is peak RSS over the process before loading")
+    print(f"{'model':<22}{'loader':<10}{'load':>11}{'1st predict':>13}{'peak RSS':>11}{'+RSS':>10}")
+    for file_name in _model_files(model_dir):
+        source_path = os.path.join(model_dir, file_name)
+        path = artifact_path(source_path)
+        if not os.path.isdir(path):
+            print(f"{file_name:<22} no artifact (run: python model_artifacts.py export)")
+            continue
+        columns = read_header(path)['columns']
+        for mode, target in (('joblib', source_path), ('artifact', path)):
+            results = []
+            for _ in range(runs):
+                output = subprocess.run([sys.executable, '-c', _COLD_START, mode, target, json.dumps(columns)],
+                                        check=True, capture_output=True, text=True, env=env).stdout
+                results.append(json.loads(output))
+            median = {key: float(np.median([r[key] for r in results])) for key in results[0]}
+            print(f"{file_name.replace('.joblib', ''):<22}{mode:<10}{median['load_ms']:>9.1f}ms"
+                  f"{median['first_predict_ms']:>11.2f}ms{median['peak_rss_mb']:>9.1f}MB"
+                  f"{median['peak_rss_mb'] - median['baseline_rss_mb']:>8.1f}MB")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Export, verify or benchmark model artifacts")
+    ap.add_argument("command", choices=['export', 'verify', 'benchmark'])
+    ap.add_argument("--model_dir", type=str, default="models", help="Directory with joblib models")
+    ap.add_argument("--runs", type=int, default=5, help="Processes per measurement (benchmark)")
+    args = ap.parse_args()
+
+    if args.command == 'export':
+        export_all(args.model_dir)
+    elif args.command == 'verify':
+        if not verify_all(args.model_dir):
+            raise SystemExit("Some artifacts are invalid, stale or differ from their models")
+    else:
+        benchmark(args.model_dir, runs=args.runs)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Precision Report
+Accuracy drift of the float32 inference mode (INFERENCE_DTYPE=float32) against
+the default float64 path: every model scores the same CSV both ways and the
+report shows how often their labels agree, how far the probabilities move,
+accuracy against the label column, and the time and memory of each pass.
+
+Usage:
+    python precision_report.py --csv balanced_data.csv
+    python precision_report.py --csv balanced_data.csv --json drift.json --min-agreement 0.999
+"""
+import argparse
+import json
+import os
+import time
+
+import numpy as np
+
+from predict import load_model, predict_from_csv
+
+
+def _score(model_name, model_dir, csv_file, dtype, target_column):
+    model = load_model(model_name, model_dir=model_dir, dtype=dtype)
+    t0 = time.perf_counter()
+    original_df, preds, probas = predict_from_csv(model, csv_file, target_column=target_column, dtype=dtype)
+    seconds = time.perf_counter() - t0
+    feature_bytes = int(sum(original_df[col].memory_usage(index=False, deep=False)
+                            for col in original_df.columns if original_df[col].dtype.kind == 'f'))
+    return {
+        'labels': np.asarray(preds, dtype=np.float64),
+        'probabilities': probas,
+        'target': original_df[target_column].to_numpy() if target_column in original_df.columns else None,
+        'seconds': seconds,
+        'bytes': feature_bytes + (probas.nbytes if probas is not None else 0)
+    }
+
+
+def compare(model_name, model_dir, csv_file, target_column='label'):
+    """
+    Score csv_file with one model in float64 and float32
+
+    Returns a dict with rows, agreement (share of identical labels), disagreements,
+    max/mean absolute probability difference, and per-dtype accuracy, seconds and
+    bytes (float input columns plus probabilities)
+    """
+    results = {dtype: _score(model_name, model_dir, csv_file, dtype, target_column)
+               for dtype in ('float64', 'float32')}
+    full, reduced = results['float64'], results['float32']
+    agree = full['labels'] == reduced['labels']
+    report = {
+        'model': model_name,
+        'rows': int(len(agree)),
+        'agreement': float(agree.mean()) if len(agree) else 1.0,
+        'disagreements': int((~agree).sum())
+    }
+    if full['probabilities'] is not None:
+        diff = np.abs(full['probabilities'] - reduced['probabilities'].astype(np.float64))
+        report['max_abs_dp'] = float(diff.max())
+        report['mean_abs_dp'] = float(diff.mean())
+    for dtype, result in results.items():
+        report[dtype] = {'seconds': result['seconds'], 'bytes': result['bytes']}
+        if result['target'] is not None:
+            report[dtype]['accuracy'] = float((result['labels'] == result['target']).mean())
+    return report
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Label agreement of float32 vs float64 inference")
+    ap.add_argument("--csv", type=str, default="balanced_data.csv", help="Labelled CSV to score")
+    ap.add_argument("--model_dir", type=str, default="models", help="Directory with joblib models")
+    ap.add_argument("--models", type=str, default=None,
+                    help="Comma-separated model files (default: every .joblib in model_dir)")
+    ap.add_argument("--target", type=str, default="label", help="Label column (for accuracy)")
+    ap.add_argument("--json", type=str, default=None, help="Also write the report to this JSON file")
+    ap.add_argument("--min-agreement", type=float, default=0.999,
+                    help="Exit non-zero if any model's label agreement is below this")
+    args = ap.parse_args()
+
+    names = (args.models.split(',') if args.models
+             else sorted(f for f in os.listdir(args.model_dir) if f.endswith('.joblib')))
+    reports = [compare(name, args.model_dir, args.csv, target_column=args.target) for name in names]
+
+    print(f"float32 vs float64 on {args.csv}")
+    print(f"{'model':<24}{'rows':>8}{'agreement':>11}{'differ':>8}{'max |dp|':>11}"
+          f"{'acc64':>8}{'acc32':>8}{'time64':>9}{'time32':>9}{'MB64':>7}{'MB32':>7}")
+    for r in reports:
+        full, reduced = r['float64'], r['float32']
+        print(f"{r['model'].replace('.joblib', ''):<24}{r['rows']:>8}{r['agreement']:>11.5%}{r['disagreements']:>8}"
+              f"{r.get('max_abs_dp', float('nan')):>11.2e}"
+              f"{full.get('accuracy', float('nan')):>8.4f}{reduced.get('accuracy', float('nan')):>8.4f}"
+              f"{full['seconds']:>8.2f}s{reduced['seconds']:>8.2f}s"
+              f"{full['bytes'] / 1e6:>7.1f}{reduced['bytes'] / 1e6:>7.1f}")
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'csv': args.csv, 'min_agreement': args.min_agreement, 'models': reports}, f, indent=2)
+        print(f"\nReport saved to: {args.json}")
+
+    below = [r['model'] for r in reports if r['agreement'] < args.min_agreement]
+    if below:
+        raise SystemExit(f"Label agreement below {args.min_agreement:.3%} for: {', '.join(below)}")
+
+
+if __name__ == "__main__":
+    main()
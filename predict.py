@@ -1,20 +1,104 @@
-import joblib
-import pandas as pd
 import numpy as np
 import argparse
 import os
+from compiled_models import compile_model, load_bundle
+from model_artifacts import artifact_path, is_current, load_artifact
+from feature_schema import DATETIME_FIELDS, DEFAULT_COLUMNS, SENSOR_COLUMNS, FeatureSchema, feature_schema
 
-def load_model(model_name, model_dir="models"):
+# pandas and joblib (which pulls in sklearn when unpickling) are imported where
+# used, so `--help`, artifact loading and array-only callers start without them
+
+DATETIME_COLUMNS = list(DATETIME_FIELDS)
+DTYPES = ('float64', 'float32')
+# Column layout of readings_to_frame when no model is given
+DEFAULT_SCHEMA = FeatureSchema(DEFAULT_COLUMNS)
+
+
+def inference_dtype(dtype=None):
+    """
+    Resolves the inference precision: dtype if given, else the INFERENCE_DTYPE
+    environment variable ('float64' by default, or 'float32').
+    """
+    dtype = np.dtype(dtype or os.getenv('INFERENCE_DTYPE', 'float64'))
+    if dtype.name not in DTYPES:
+        raise ValueError(f"Inference dtype must be one of {DTYPES}, got {dtype.name}")
+    return dtype
+
+
+def cast_features(df, dtype=None):
+    """
+    Casts featurized columns for the inference precision.
+    
+    In float32 mode sensor columns become float32 and the datetime parts small
+    integers (int16 year, int8 others), so a batch takes half the memory of the
+    float64 frame; float64 mode leaves the frame unchanged.
+    """
+    if inference_dtype(dtype) != np.float32:
+        return df
+    casts = {col: np.float32 for col in SENSOR_COLUMNS if col in df.columns}
+    casts.update({col: np.int16 if col == 'datetime_year' else np.int8
+                  for col in DATETIME_COLUMNS if col in df.columns})
+    return df.astype(casts)
+
+
+def load_model(model_name, model_dir="models", compiled=None, dtype=None):
     """
     Loads a joblib model stored in the given directory.
+    
+    Supported pipelines are returned as array-based compiled models with the same
+    predict/predict_proba interface (see compiled_models.py); others load as-is.
+    Set compiled=False, or the COMPILED_MODELS=0 environment variable, to always
+    get the sklearn model.
+    
+    An up-to-date exported artifact next to the joblib file (name.artifact, see
+    model_artifacts.py) is memory-mapped instead of unpickling the model, as are
+    artifact directories and .npz weight bundles named directly.
+    
+    With dtype='float32' (or INFERENCE_DTYPE=float32) compiled models compute
+    and return probabilities in float32; sklearn models are unaffected.
+    
+    The model's input columns are resolved here, once (see feature_schema.py).
+    Columns that cannot be derived from a reading are reported here; predictions
+    from readings then raise ValueError, while tables that have them still work.
     """
+    if compiled is None:
+        compiled = os.getenv('COMPILED_MODELS', '1') != '0'
+    model = _load(model_name, model_dir, compiled)
+    dtype = inference_dtype(dtype)
+    if dtype != np.float64 and hasattr(model, 'with_dtype'):
+        model = model.with_dtype(dtype)
+    schema = feature_schema(model)
+    if schema.unknown_columns:
+        print(f"Warning: {model_name} needs input columns that cannot be derived from a reading: "
+              f"{schema.unknown_columns}")
+    return model
+
+
+def _load(model_name, model_dir, compiled):
     path = os.path.join(model_dir, model_name)
+    if model_name.endswith('.artifact'):
+        return load_artifact(path)
+    if model_name.endswith('.npz'):
+        # Compiled weight bundle (compiled_models.py --export)
+        return load_bundle(path)
+    
+    exported = artifact_path(path)
+    if compiled and os.path.isdir(exported):
+        if not os.path.exists(path) or is_current(exported, path):
+            return load_artifact(exported)
+        print(f"Artifact {exported} was exported from a different {model_name}; loading the joblib model")
     if not os.path.exists(path):
         raise FileNotFoundError(f"Model file not found: {path}")
-    return joblib.load(path)
+    import joblib
+    model = joblib.load(path)
+    if compiled:
+        compiled_model = compile_model(model)
+        if compiled_model is not None:
+            return compiled_model
+    return model
 
 
-def predict_single_point(model, X, Y, Z, EDA, HR, TEMP, datetime_str, id_val=None):
+def predict_single_point(model, X, Y, Z, EDA, HR, TEMP, datetime_str, id_val=None, dtype=None):
     """
     Predicts label for a single data point.
     
@@ -25,90 +109,104 @@ def predict_single_point(model, X, Y, Z, EDA, HR, TEMP, datetime_str, id_val=Non
     - HR: Heart rate
     - TEMP: Temperature
     - datetime_str: Datetime string (e.g., '2020-07-08 14:03:00')
-    - id_val: Optional ID value
+    - id_val: Optional ID value (not a model input)
+    - dtype: 'float64' or 'float32' features (default: INFERENCE_DTYPE)
     
     Returns:
     - predicted_label: The predicted label
     - probabilities: Class probabilities (if available)
     """
-    # Create dataframe with single row
-    data = {
-        'X': [X],
-        'Y': [Y],
-        'Z': [Z],
-        'EDA': [EDA],
-        'HR': [HR],
-        'TEMP': [TEMP],
-        'datetime': [datetime_str]
-    }
-    if id_val is not None:
-        data['id'] = [id_val]
+    # One row, assembled directly in the model's column order
+    reading = {'X': X, 'Y': Y, 'Z': Z, 'EDA': EDA, 'HR': HR, 'TEMP': TEMP, 'datetime': datetime_str}
+    df = feature_schema(model).frame([reading], dtype=inference_dtype(dtype))
     
-    df = pd.DataFrame(data)
-    
-    # Extract datetime features
-    df['datetime'] = pd.to_datetime(df['datetime'])
-    df['datetime_hour'] = df['datetime'].dt.hour
-    df['datetime_day'] = df['datetime'].dt.day
-    df['datetime_month'] = df['datetime'].dt.month
-    df['datetime_year'] = df['datetime'].dt.year
-    df['datetime_dow'] = df['datetime'].dt.dayofweek
+    labels, probas = predict_frame(model, df)
+    return labels[0], probas[0] if probas is not None else None
+
+
+def readings_to_frame(readings, dtype=None, schema=None):
+    """
+    Builds the model input DataFrame for several readings.
     
-    # Drop non-feature columns
-    non_feature_cols = ['id', 'datetime', 'Unnamed: 0']
-    for col in non_feature_cols:
-        if col in df.columns:
-            df = df.drop(columns=[col])
+    Parameters:
+    - readings: List of dicts with X, Y, Z, EDA, HR, TEMP and an optional
+      datetime string (defaults to the current time)
+    - dtype: 'float64' or 'float32' features (default: INFERENCE_DTYPE)
+    - schema: FeatureSchema of the model the frame is for (default: the bundled
+      models' columns)
     
-    # Predict
-    pred = model.predict(df)[0]
-    proba = None
+    Returns:
+    - DataFrame with the sensor columns and extracted datetime features, in model order
+    """
+    return (schema or DEFAULT_SCHEMA).frame(readings, dtype=inference_dtype(dtype))
+
+
+def predict_frame(model, df):
+    """
+    Predicts labels for a featurized DataFrame (see readings_to_frame).
     
+    Returns:
+    - predicted_labels: Array of predicted labels
+    - probabilities: (n, n_classes) array of class probabilities (None if not available)
+    """
     if hasattr(model, "predict_proba"):
-        proba = model.predict_proba(df)[0]
+        # One pass: the predicted label is the most probable class
+        probas = model.predict_proba(df)
+        return model.classes_[probas.argmax(axis=1)], probas
+    return model.predict(df), None
+
+
+def predict_readings(model, readings):
+    """
+    Predicts labels for several readings with a single model call.
+    
+    Parameters:
+    - model: Loaded joblib model
+    - readings: List of dicts with X, Y, Z, EDA, HR, TEMP and an optional
+      datetime string (defaults to the current time)
     
-    return pred, proba
+    Returns:
+    - predicted_labels: Array of predicted labels
+    - probabilities: (n, n_classes) array of class probabilities (None if not available)
+    """
+    return predict_frame(model, readings_to_frame(readings, schema=feature_schema(model)))
 
 
-def predict_from_csv(model, csv_file, target_column="label"):
+def predict_from_csv(model, csv_file, target_column="label", dtype=None):
     """
     Loads CSV, drops target if present, extracts datetime features, runs prediction.
     Returns original dataframe, predictions, and probabilities.
+
+    In float32 mode (dtype or INFERENCE_DTYPE) sensor columns are parsed as float32.
     """
-    df = pd.read_csv(csv_file)
-    original_df = df.copy()
+    import pandas as pd
 
-    # If target is present, drop for prediction
-    if target_column in df.columns:
-        df_features = df.drop(columns=[target_column])
-    else:
-        df_features = df.copy()
-
-    # Extract datetime features if datetime column exists
-    if 'datetime' in df_features.columns:
-        df_features['datetime'] = pd.to_datetime(df_features['datetime'])
-        df_features['datetime_hour'] = df_features['datetime'].dt.hour
-        df_features['datetime_day'] = df_features['datetime'].dt.day
-        df_features['datetime_month'] = df_features['datetime'].dt.month
-        df_features['datetime_year'] = df_features['datetime'].dt.year
-        df_features['datetime_dow'] = df_features['datetime'].dt.dayofweek
-
-    # Drop non-feature columns if they exist (but keep datetime features we just created)
-    non_feature_cols = ['id', 'datetime', 'Unnamed: 0']
-    for col in non_feature_cols:
-        if col in df_features.columns:
-            df_features = df_features.drop(columns=[col])
-
-    preds = model.predict(df_features)
-    probas = None
-
-    # If the model supports predict_proba
-    if hasattr(model, "predict_proba"):
-        probas = model.predict_proba(df_features)
+    dtype = inference_dtype(dtype)
+    original_df = pd.read_csv(csv_file, dtype={col: dtype for col in SENSOR_COLUMNS})
+
+    # Only the model's columns are used (never target_column, id or index columns),
+    # derived from the datetime column when the CSV does not have them
+    df_features = feature_schema(model).from_table(original_df, dtype=dtype)
 
+    # One pass: labels come from the probabilities when the model has them
+    preds, probas = predict_frame(model, df_features)
     return original_df, preds, probas
 
 
+def save_predictions(output_df, output_path):
+    """
+    Saves a predictions DataFrame as CSV, or as Parquet for a .parquet path
+    (keeps float32 columns float32; needs pyarrow or fastparquet)
+    """
+    if output_path.endswith('.parquet'):
+        try:
+            output_df.to_parquet(output_path, index=False)
+        except ImportError as e:
+            raise SystemExit(f"Parquet output needs pyarrow (pip install pyarrow): {e}")
+    else:
+        output_df.to_csv(output_path, index=False)
+
+
 def main():
     ap = argparse.ArgumentParser()
     ap.add_argument("--model", type=str, required=True,
@@ -118,16 +216,20 @@ def main():
     ap.add_argument("--model_dir", type=str, default="models",
                     help="Directory where joblib models are stored")
     ap.add_argument("--output", type=str, default=None,
-                    help="Output CSV file path to save predictions (default: input_file_predictions.csv)")
+                    help="Output CSV (or .parquet) file path to save predictions (default: input_file_predictions.csv)")
+    ap.add_argument("--dtype", type=str, choices=DTYPES, default=None,
+                    help="Inference precision (default: INFERENCE_DTYPE or float64)")
     args = ap.parse_args()
 
     # Load model
     print(f"Loading model: {args.model}")
-    model = load_model(args.model, model_dir=args.model_dir)
+    model = load_model(args.model, model_dir=args.model_dir, dtype=args.dtype)
 
     # Predict
     print(f"Reading input data: {args.csv}")
-    original_df, preds, probas = predict_from_csv(model, args.csv)
+    original_df, preds, probas = predict_from_csv(model, args.csv, dtype=args.dtype)
+
+    import pandas as pd
 
     # Create output dataframe with predictions
     output_df = original_df.copy()
@@ -147,7 +249,7 @@ def main():
         output_path = args.output
 
     # Save predictions
-    output_df.to_csv(output_path, index=False)
+    save_predictions(output_df, output_path)
     print(f"\nPredictions saved to: {output_path}")
     print(f"Total predictions: {len(preds)}")
     print(f"\nPrediction summary:")
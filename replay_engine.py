@@ -0,0 +1,423 @@
+"""
+Replay Engine
+Drift-corrected scheduling, sinks and rate/jitter reporting for
+sensor_simulator's high-rate, time-warp and as-fast-as-possible modes
+"""
+import json
+import math
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+SENSOR_COLUMNS = ['X', 'Y', 'Z', 'EDA', 'HR', 'TEMP']
+
+
+def format_timestamps(timestamps):
+    """Format datetime64 values like the original dataset ('YYYY-MM-DD HH:MM:SS.ffffff')"""
+    return np.char.replace(np.datetime_as_string(timestamps.astype('datetime64[us]'), unit='us'), 'T', ' ')
+
+
+def batch_to_records(batch, start=0):
+    """
+    Convert a batch into reading dicts (the sensor_data.json format)
+
+    Parameters:
+    - batch: Dict of arrays with 'values' (n, 6) and 'timestamps' (n,) datetime64
+    - start: Only convert readings from this position on
+    """
+    timestamps = format_timestamps(batch['timestamps'][start:]).tolist()
+    records = [
+        dict(zip(SENSOR_COLUMNS, values), timestamp=timestamp)
+        for values, timestamp in zip(batch['values'][start:].tolist(), timestamps)
+    ]
+    if 'device_ids' in batch:
+        for record, device_id in zip(records, batch['device_ids'][start:].tolist()):
+            record['device_id'] = device_id
+    return records
+
+
+def batch_to_api_records(batch):
+    """Convert a batch into /predict request bodies ('datetime' and 'id' as app.py expects)"""
+    timestamps = format_timestamps(batch['timestamps']).tolist()
+    records = [
+        dict(zip(SENSOR_COLUMNS, values), datetime=timestamp)
+        for values, timestamp in zip(batch['values'].tolist(), timestamps)
+    ]
+    if 'device_ids' in batch:
+        for record, device_id in zip(records, batch['device_ids'].tolist()):
+            record['id'] = device_id
+    return records
+
+
+class Ticker:
+    """
+    Drift-corrected periodic scheduler
+
+    Parameters:
+    - interval: Seconds between ticks
+
+    Tick k is due at start + k * interval, so oversleeping or slow work in one
+    tick shortens the next wait instead of pushing every later tick back.
+    Lateness (actual wakeup - due time) is recorded for jitter reporting.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.start = time.perf_counter()
+        self.ticks = 0
+        self.lateness = []
+
+    def wait(self):
+        """Sleep until the next tick is due; returns its scheduled time in seconds since start"""
+        self.ticks += 1
+        due = self.start + self.ticks * self.interval
+        delay = due - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        self.lateness.append(time.perf_counter() - due)
+        return self.ticks * self.interval
+
+
+class ReplayStats:
+    """Readings, achieved rate, sink time and scheduler jitter of a replay run"""
+
+    def __init__(self, target_rate=None):
+        self.target_rate = target_rate
+        self.start = time.perf_counter()
+        self.readings = 0
+        self.batches = 0
+        self.sink_seconds = 0.0
+
+    def record(self, n, sink_seconds):
+        self.readings += n
+        self.batches += 1
+        self.sink_seconds += sink_seconds
+
+    def summary(self, ticker=None):
+        elapsed = time.perf_counter() - self.start
+        summary = {
+            'readings': self.readings,
+            'batches': self.batches,
+            'elapsed_s': elapsed,
+            'achieved_rate': self.readings / elapsed if elapsed > 0 else 0.0,
+            'target_rate': self.target_rate,
+            'sink_s': self.sink_seconds
+        }
+        if ticker is not None and ticker.lateness:
+            lateness_ms = np.asarray(ticker.lateness) * 1000
+            summary.update({
+                'jitter_mean_ms': float(lateness_ms.mean()),
+                'jitter_p99_ms': float(np.percentile(lateness_ms, 99)),
+                'jitter_max_ms': float(lateness_ms.max())
+            })
+        return summary
+
+    @staticmethod
+    def format(summary):
+        text = (f"{summary['readings']:,} readings in {summary['elapsed_s']:.1f}s | "
+                f"{summary['achieved_rate']:,.0f}/s")
+        if summary['target_rate']:
+            text += f" (target {summary['target_rate']:,.0f}/s)"
+        if 'jitter_mean_ms' in summary:
+            text += (f" | jitter mean {summary['jitter_mean_ms']:.2f}ms "
+                     f"p99 {summary['jitter_p99_ms']:.2f}ms max {summary['jitter_max_ms']:.2f}ms")
+        return text
+
+
+class NullSink:
+    """Discards readings (measures the generator and scheduler alone)"""
+
+    def write(self, batch):
+        pass
+
+    def close(self):
+        pass
+
+
+class FileSink:
+    """
+    Keeps the latest readings in a JSON file for the dashboard
+
+    Parameters:
+    - path: JSON file (the dashboard's sensor_data.json)
+    - keep: Number of most recent readings kept in the file
+    - flush_interval: Minimum seconds between file rewrites; readings in
+      between only update the in-memory window
+    - device_id: In fleet mode, only keep this device's readings (the dashboard shows one wearable)
+
+    The file is replaced atomically, so readers never see a partial write.
+    """
+
+    def __init__(self, path, keep=1000, flush_interval=0.2, device_id=None):
+        self.path = path
+        self.flush_interval = flush_interval
+        self.device_id = device_id
+        self._window = deque(maxlen=keep)
+        self._last_flush = 0.0
+        self._dirty = False
+        if os.path.exists(path):
+            try:
+                with open(path, 'r') as f:
+                    self._window.extend(json.load(f))
+            except (OSError, ValueError):
+                pass
+
+    def write(self, batch):
+        if self.device_id is not None and 'device_ids' in batch:
+            keep = batch['device_ids'] == self.device_id
+            batch = {key: values[keep] for key, values in batch.items()}
+        n = len(batch['timestamps'])
+        # Only the newest readings can survive in the window
+        self._window.extend(batch_to_records(batch, start=max(0, n - self._window.maxlen)))
+        self._dirty = True
+        if time.perf_counter() - self._last_flush >= self.flush_interval:
+            self.flush()
+
+    def flush(self):
+        if not self._dirty:
+            return
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(list(self._window), f, indent=2)
+        os.replace(tmp, self.path)
+        self._last_flush = time.perf_counter()
+        self._dirty = False
+
+    def close(self):
+        self.flush()
+
+
+class LogSink:
+    """
+    Appends every reading as a JSON line (one file for the whole fleet)
+
+    Parameters:
+    - path: JSONL file; readings carry device_id in fleet mode
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._file = open(path, 'a')
+
+    def write(self, batch):
+        self._file.write(''.join(json.dumps(record) + '\n' for record in batch_to_records(batch)))
+
+    def close(self):
+        self._file.close()
+
+
+class HttpSink:
+    """
+    Posts readings to the prediction API and scores the predictions live
+
+    Parameters:
+    - url: API base URL (e.g. http://localhost:5000)
+    - endpoint: 'batch' posts to /predict/batch, 'single' posts one reading per /predict request
+    - max_batch: Readings per /predict/batch request (count trigger)
+    - max_wait: Seconds a reading may wait for its batch to fill (time trigger, checked on write)
+    - concurrency: Maximum requests in flight; write() blocks when all are busy (backpressure)
+    - timeout: Request timeout in seconds
+    - max_retries: Retries per request (default 0: failures are counted, not retried)
+    - compress: gzip request bodies
+
+    Requests go through a stress_client.StressClient whose keep-alive connection
+    pool is sized to the concurrency. Per-request latency, server errors, predicted
+    label counts and accuracy against the replayed 'label' column are tracked.
+    """
+
+    def __init__(self, url, endpoint='batch', max_batch=100, max_wait=0.5, concurrency=4, timeout=30.0,
+                 max_retries=0, compress=False):
+        from stress_client import StressClient
+
+        if endpoint not in ('batch', 'single'):
+            raise ValueError(f"Unknown endpoint: {endpoint}")
+        self.endpoint = endpoint
+        self.url = url.rstrip('/') + ('/predict/batch' if endpoint == 'batch' else '/predict')
+        self.max_batch = max_batch if endpoint == 'batch' else 1
+        self.max_wait = max_wait
+
+        self.client = StressClient(url, timeout=timeout, pool_size=concurrency, max_retries=max_retries,
+                                   compress=compress, batch_size=self.max_batch)
+        self._executor = ThreadPoolExecutor(max_workers=concurrency, thread_name_prefix='http-sink')
+        self._slots = threading.BoundedSemaphore(concurrency)
+
+        self._pending, self._pending_labels = [], []
+        self._pending_since = None
+        self._lock = threading.Lock()
+        self._start = time.perf_counter()
+        self.stats = {'requests': 0, 'failed_requests': 0, 'sent': 0, 'predicted': 0, 'errors': 0,
+                      'scored': 0, 'correct': 0}
+        self.predicted_counts = {}
+        self._first_error = True
+
+    def write(self, batch):
+        records = batch_to_api_records(batch)
+        labels = batch['labels'].tolist() if 'labels' in batch else [float('nan')] * len(records)
+        if self._pending_since is None:
+            self._pending_since = time.perf_counter()
+        self._pending.extend(records)
+        self._pending_labels.extend(labels)
+
+        while len(self._pending) >= self.max_batch:
+            self._submit(self._pending[:self.max_batch], self._pending_labels[:self.max_batch])
+            del self._pending[:self.max_batch], self._pending_labels[:self.max_batch]
+            self._pending_since = time.perf_counter() if self._pending else None
+        if self._pending and time.perf_counter() - self._pending_since >= self.max_wait:
+            self._flush_pending()
+
+    def _flush_pending(self):
+        if self._pending:
+            self._submit(self._pending, self._pending_labels)
+        self._pending, self._pending_labels = [], []
+        self._pending_since = None
+
+    def _submit(self, records, labels):
+        self._slots.acquire()
+        self._executor.submit(self._post, records, labels)
+
+    def _post(self, records, labels):
+        try:
+            try:
+                if self.endpoint == 'batch':
+                    results = self.client.predict_batch(records)
+                else:
+                    results = [self.client.predict(records[0])]
+            except Exception as e:
+                with self._lock:
+                    self.stats['requests'] += 1
+                    self.stats['failed_requests'] += 1
+                    self.stats['sent'] += len(records)
+                    first, self._first_error = self._first_error, False
+                if first:
+                    print(f"Error posting readings to {self.url}: {e}")
+                return
+
+            with self._lock:
+                self.stats['requests'] += 1
+                self.stats['sent'] += len(records)
+                for result, label in zip(results, labels):
+                    if 'predicted_label' not in result:
+                        self.stats['errors'] += 1
+                        continue
+                    predicted = result['predicted_label']
+                    self.stats['predicted'] += 1
+                    self.predicted_counts[predicted] = self.predicted_counts.get(predicted, 0) + 1
+                    if label == label:  # not NaN
+                        self.stats['scored'] += 1
+                        self.stats['correct'] += predicted == label
+        finally:
+            self._slots.release()
+
+    def summary(self):
+        """Request counts, latency percentiles (ms), prediction throughput and live accuracy"""
+        with self._lock:
+            summary = dict(self.stats)
+            summary['predicted_counts'] = dict(sorted(self.predicted_counts.items()))
+        elapsed = time.perf_counter() - self._start
+        summary['predictions_per_s'] = summary['predicted'] / elapsed if elapsed > 0 else 0.0
+        summary['accuracy'] = summary['correct'] / summary['scored'] if summary['scored'] else None
+        client_stats = self.client.stats()
+        summary.update({key: value for key, value in client_stats.items() if key.startswith('latency_')})
+        summary['retries'] = client_stats['retries']
+        return summary
+
+    def report(self):
+        summary = self.summary()
+        text = (f"HTTP: {summary['requests']} requests ({summary['failed_requests']} failed), "
+                f"{summary['predicted']:,} predictions ({summary['predictions_per_s']:,.0f}/s)")
+        if 'latency_p50_ms' in summary:
+            text += (f" | latency p50 {summary['latency_p50_ms']:.1f}ms p95 {summary['latency_p95_ms']:.1f}ms "
+                     f"p99 {summary['latency_p99_ms']:.1f}ms")
+        if summary['accuracy'] is not None:
+            text += f" | accuracy {summary['accuracy']:.1%} over {summary['scored']:,}"
+        return text
+
+    def close(self):
+        self._flush_pending()
+        self._executor.shutdown(wait=True)
+        self.client.close()
+        print(self.report())
+        if self.predicted_counts:
+            print(f"HTTP: predicted labels {self.summary()['predicted_counts']}")
+
+
+def run_replay(source, sink, rate=None, speed=None, duration=None, max_readings=None, tick=0.01,
+               batch_size=10000, report_interval=5.0, target_rate=None):
+    """
+    Drive a reading source into a sink
+
+    Parameters:
+    - source: Object with take(n) -> batch of the next n readings, and (for speed mode)
+      due(replay_seconds) -> number of readings at or before that point in the recording
+    - sink: Object with write(batch) and close()
+    - rate: Readings per second (rate mode)
+    - speed: Replay-speed multiplier over the recording's own timing (speed mode)
+    - With neither rate nor speed, readings are produced as fast as possible in batch_size chunks
+    - duration: Stop after this many seconds
+    - max_readings: Stop after this many readings
+    - tick: Scheduler period in seconds (rate mode uses at least 1 / rate)
+    - report_interval: Seconds between progress lines (None disables)
+    - target_rate: Expected readings per second to report against (default: rate)
+
+    Returns:
+    - Summary dict with readings, achieved_rate and scheduler jitter (mean/p99/max ms)
+    """
+    ticker = None
+    if rate:
+        ticker = Ticker(max(tick, 1.0 / rate))
+    elif speed:
+        ticker = Ticker(tick)
+    stats = ReplayStats(target_rate=target_rate or rate)
+    if ticker is not None:
+        stats.start = ticker.start
+    next_report = report_interval
+    emitted = 0
+    scheduled = 0.0
+
+    try:
+        while True:
+            if ticker is None:
+                n = batch_size
+            else:
+                # Readings due by the scheduled time (not the actual wakeup), so no drift accumulates
+                if rate:
+                    due = math.floor(rate * scheduled + 1e-9) + 1
+                else:
+                    due = source.due(scheduled * speed)
+                n = due - emitted
+            if max_readings is not None:
+                n = min(n, max_readings - emitted)
+
+            if n > 0:
+                batch = source.take(n)
+                t0 = time.perf_counter()
+                sink.write(batch)
+                stats.record(n, time.perf_counter() - t0)
+                emitted += n
+
+            elapsed = time.perf_counter() - stats.start
+            if max_readings is not None and emitted >= max_readings:
+                break
+            if duration is not None and elapsed >= duration:
+                break
+            if report_interval and elapsed >= next_report:
+                print(ReplayStats.format(stats.summary(ticker)))
+                if hasattr(sink, 'report'):
+                    print(sink.report())
+                next_report += report_interval
+            if ticker is not None:
+                scheduled = ticker.wait()
+    except KeyboardInterrupt:
+        print("\nReplay stopped.")
+    finally:
+        sink.close()
+
+    summary = stats.summary(ticker)
+    print(ReplayStats.format(summary))
+    if hasattr(sink, 'summary'):
+        summary['sink'] = sink.summary()
+    return summary
@@ -0,0 +1,324 @@
+"""
+Request Validator
+Converts JSON readings to a NumPy matrix in one pass over the payload: values
+are written straight into a preallocated float matrix, and each row gets a
+validity flag and an error code (missing field, not a number, NaN/infinite,
+out of range, bad datetime) instead of being checked field by field in the
+request loop.
+
+Usage:
+    python request_validator.py --benchmark             # validation cost at 1 to 10k rows
+    python request_validator.py --benchmark --rows 50000 --invalid 0
+"""
+import argparse
+import os
+import time
+from itertools import chain, repeat
+from operator import itemgetter
+
+import numpy as np
+
+from feature_schema import SENSOR_COLUMNS, parse_datetimes
+
+# Row error codes
+OK = 0
+NOT_AN_OBJECT = 1
+MISSING = 2
+NOT_NUMERIC = 3
+NOT_FINITE = 4
+OUT_OF_RANGE = 5
+BAD_DATETIME = 6
+ERROR_CODES = {
+    OK: 'ok',
+    NOT_AN_OBJECT: 'not_an_object',
+    MISSING: 'missing',
+    NOT_NUMERIC: 'not_numeric',
+    NOT_FINITE: 'not_finite',
+    OUT_OF_RANGE: 'out_of_range',
+    BAD_DATETIME: 'bad_datetime'
+}
+
+# Physically possible sensor values; readings outside are rejected as sensor faults
+DEFAULT_RANGES = {
+    'X': (-128.0, 128.0),  # accelerometer, 1/64 g
+    'Y': (-128.0, 128.0),
+    'Z': (-128.0, 128.0),
+    'EDA': (0.0, 100.0),  # microsiemens
+    'HR': (20.0, 250.0),  # beats per minute
+    'TEMP': (0.0, 50.0)  # skin temperature, Celsius
+}
+
+
+def parse_ranges(spec):
+    """
+    Parse value ranges from "field=low:high,field=low:high" (e.g. VALIDATION_RANGES)
+
+    Returns a dict of field -> (low, high); an empty bound is unbounded
+    """
+    ranges = {}
+    for item in (spec or '').split(','):
+        if item.strip():
+            field, _, bounds = item.partition('=')
+            low, _, high = bounds.partition(':')
+            ranges[field.strip()] = (float(low) if low.strip() else -np.inf, float(high) if high.strip() else np.inf)
+    return ranges
+
+
+class ValidationResult:
+    """
+    Validated readings
+
+    Attributes:
+    - fields: Field of each matrix column
+    - values: (n, n_fields) matrix of field values (rows with errors hold NaN or the raw values)
+    - valid: (n,) bool mask of rows without errors
+    - errors: (n,) uint8 error code per row (see ERROR_CODES)
+    - error_fields: (n,) index into fields of the first invalid field (-1 for valid rows)
+    - datetimes: Datetime string (or None) of each row
+    - timestamps: (n,) datetime64 of each row (the current time for rows without
+      a datetime, NaT for rows whose datetime is invalid)
+    - seconds: Time spent validating
+    """
+
+    __slots__ = ('fields', 'ranges', 'values', 'valid', 'errors', 'error_fields', 'datetimes', 'timestamps',
+                 'seconds', '_missing')
+
+    def __init__(self, fields, ranges, values, errors, error_fields, datetimes, timestamps, missing, seconds):
+        self.fields = fields
+        self.ranges = ranges
+        self.values = values
+        self.errors = errors
+        self.error_fields = error_fields
+        self.valid = errors == OK
+        self.datetimes = datetimes
+        self.timestamps = timestamps
+        self.seconds = seconds
+        self._missing = missing
+
+    def __len__(self):
+        return len(self.errors)
+
+    @property
+    def all_valid(self):
+        return bool(self.valid.all())
+
+    def error_message(self, row):
+        """Readable error for a row (None if it is valid)"""
+        code = self.errors[row]
+        if code == OK:
+            return None
+        if code == NOT_AN_OBJECT:
+            return "Reading must be a JSON object"
+        if code == MISSING:
+            return f"Missing fields: {self._missing[row]}"
+        if code == BAD_DATETIME:
+            return f"Invalid datetime: {self.datetimes[row]!r}"
+        field = self.fields[self.error_fields[row]]
+        if code == NOT_NUMERIC:
+            return f"{field} is not a number"
+        if code == NOT_FINITE:
+            return f"{field} must be a finite number"
+        low, high = self.ranges[field]
+        return f"{field} is outside the valid range [{low:g}, {high:g}]"
+
+    def error_details(self, row):
+        """Error message and code (see ERROR_CODES) of an invalid row, as returned by the APIs"""
+        return {'error': self.error_message(row), 'code': ERROR_CODES[int(self.errors[row])]}
+
+    def valid_frame(self, schema, dtype=np.float64):
+        """
+        Model input of the valid rows
+
+        Parameters:
+        - schema: FeatureSchema of the model
+        - dtype: Float dtype of the frame (predict.inference_dtype() for the configured mode)
+
+        Returns (valid_rows, frame): row numbers of the valid readings and their
+        frame in model column order (None if no row is valid)
+        """
+        valid_rows = self.valid.nonzero()[0]
+        if not len(valid_rows):
+            return valid_rows, None
+        return valid_rows, schema.frame_from_matrix(self.values[valid_rows], self.fields,
+                                                    self.timestamps[valid_rows], dtype=dtype)
+
+    def describe_errors(self):
+        """Count of rows per error name"""
+        codes, counts = np.unique(self.errors, return_counts=True)
+        return {ERROR_CODES[int(code)]: int(count) for code, count in zip(codes, counts)}
+
+
+class RequestValidator:
+    """
+    Schema-driven validator for sensor readings, built once at startup
+
+    Parameters:
+    - fields: Numeric fields every reading must have, in matrix column order
+    - ranges: Dict of field -> (low, high) allowed values (default: DEFAULT_RANGES)
+    - dtype: Matrix dtype (np.float32 for the float32 inference mode)
+    """
+
+    def __init__(self, fields=None, ranges=None, dtype=np.float64):
+        self.fields = list(fields or SENSOR_COLUMNS)
+        ranges = dict(DEFAULT_RANGES, **(ranges or {}))
+        self.ranges = {field: ranges.get(field, (-np.inf, np.inf)) for field in self.fields}
+        self.dtype = np.dtype(dtype)
+        self._low = np.array([self.ranges[f][0] for f in self.fields], dtype=self.dtype)
+        self._high = np.array([self.ranges[f][1] for f in self.fields], dtype=self.dtype)
+        self._getter = itemgetter(*self.fields) if len(self.fields) > 1 else (lambda item: (item[self.fields[0]],))
+        self._nan_row = (np.nan,) * len(self.fields)
+
+    @classmethod
+    def from_env(cls, fields=None, dtype=np.float64):
+        """Build a validator with VALIDATION_RANGES overriding the default ranges"""
+        return cls(fields=fields, ranges=parse_ranges(os.getenv('VALIDATION_RANGES', '')), dtype=dtype)
+
+    def validate(self, items):
+        """
+        Validate a list of readings in one pass
+
+        Returns a ValidationResult; never raises for bad readings
+        """
+        t0 = time.perf_counter()
+        n, k = len(items), len(self.fields)
+        errors = np.zeros(n, dtype=np.uint8)
+        error_fields = np.full(n, -1, dtype=np.int16)
+        missing = {}
+        try:
+            # The single walk over the payload: each reading's fields go straight into the matrix
+            values = np.fromiter(chain.from_iterable(map(self._getter, items)), self.dtype, count=n * k)
+            values = values.reshape(n, k)
+            datetimes = list(map(dict.get, items, repeat('datetime')))
+        except (KeyError, TypeError, ValueError):
+            # Some reading is malformed: walk again row by row to record which and why
+            values = np.empty((n, k), dtype=self.dtype)
+            datetimes = self._validate_rows(items, values, errors, error_fields, missing)
+
+        bad_value = ~np.isfinite(values)
+        with np.errstate(invalid='ignore'):
+            out_of_range = (values < self._low) | (values > self._high)
+        for mask, code in ((bad_value, NOT_FINITE), (out_of_range, OUT_OF_RANGE)):
+            flagged = np.flatnonzero(mask.any(axis=1) & (errors == OK))
+            if len(flagged):
+                errors[flagged] = code
+                error_fields[flagged] = mask[flagged].argmax(axis=1)
+
+        # null values arrive as NaN; report them as missing
+        for i in np.flatnonzero(errors == NOT_FINITE):
+            if items[i].get(self.fields[error_fields[i]]) is None:
+                errors[i] = MISSING
+                missing[i] = [field for field in self.fields if items[i].get(field) is None]
+
+        # Datetimes are parsed together, each in its own format; a bad one fails only its row
+        timestamps = parse_datetimes(datetimes, errors='coerce').to_numpy()
+        errors[np.isnat(timestamps) & (errors == OK)] = BAD_DATETIME
+
+        return ValidationResult(self.fields, self.ranges, values, errors, error_fields, datetimes, timestamps,
+                                missing, time.perf_counter() - t0)
+
+    def _validate_rows(self, items, values, errors, error_fields, missing, chunk=256):
+        """Fill values row by row, recording missing and non-numeric fields; returns the datetimes"""
+        getter, nan_row = self._getter, self._nan_row
+        rows = []
+        datetimes = []
+        for i, item in enumerate(items):
+            try:
+                rows.append(getter(item))
+                datetimes.append(item.get('datetime'))
+            except (KeyError, TypeError, AttributeError):
+                rows.append(nan_row)
+                datetimes.append(None)
+                if isinstance(item, dict):
+                    errors[i] = MISSING
+                    missing[i] = [field for field in self.fields if field not in item]
+                    error_fields[i] = self.fields.index(missing[i][0])
+                else:
+                    errors[i] = NOT_AN_OBJECT
+
+        # Convert in chunks; only a chunk holding a non-numeric value is converted row by row
+        for start in range(0, len(rows), chunk):
+            try:
+                values[start:start + chunk] = rows[start:start + chunk]
+                continue
+            except (TypeError, ValueError):
+                pass
+            for i in range(start, min(start + chunk, len(rows))):
+                try:
+                    values[i] = rows[i]
+                except (TypeError, ValueError):
+                    values[i] = np.nan
+                    errors[i] = NOT_NUMERIC
+                    error_fields[i] = next(j for j, value in enumerate(rows[i]) if not _is_number(value))
+        return datetimes
+
+
+def _is_number(value):
+    try:
+        float(value)
+        return not isinstance(value, (list, dict))
+    except (TypeError, ValueError):
+        return False
+
+
+def _legacy_validate(items, fields):
+    """The per-item checks the API used before (for the benchmark)"""
+    rows = []
+    for item in items:
+        missing = [field for field in fields if field not in item]
+        if missing:
+            continue
+        try:
+            rows.append({field: float(item[field]) for field in fields})
+        except (TypeError, ValueError):
+            continue
+    return rows
+
+
+def benchmark(sizes=(1, 100, 1000, 10000), invalid_share=0.01, runs=5):
+    """Time validation against the old per-item checks and against featurization"""
+    from feature_schema import DEFAULT_COLUMNS, FeatureSchema
+    from warmup import synthetic_readings
+
+    validator = RequestValidator()
+    schema = FeatureSchema(DEFAULT_COLUMNS)
+    print(f"Median of {runs} runs; {invalid_share:.0%} of rows invalid")
+    print(f"{'rows':>8}{'validate':>12}{'per row':>10}{'old checks':>12}{'featurize':>12}{'valid':>8}")
+    for n in sizes:
+        items = synthetic_readings(n, seed=n)
+        if invalid_share:
+            step = max(1, int(round(1 / invalid_share)))
+            for i in range(step - 1, n, step):
+                items[i] = {**items[i], 'HR': ['nan', None, 'abc', 1e6][(i // step) % 4]}
+        timings = {'validate': [], 'old': [], 'featurize': []}
+        for _ in range(runs):
+            t0 = time.perf_counter()
+            result = validator.validate(items)
+            t1 = time.perf_counter()
+            _legacy_validate(items, validator.fields)
+            t2 = time.perf_counter()
+            schema.frame_from_matrix(result.values[result.valid], validator.fields,
+                                     result.timestamps[result.valid])
+            t3 = time.perf_counter()
+            timings['validate'].append(t1 - t0)
+            timings['old'].append(t2 - t1)
+            timings['featurize'].append(t3 - t2)
+        median = {key: float(np.median(value)) * 1000 for key, value in timings.items()}
+        print(f"{n:>8}{median['validate']:>10.3f}ms{median['validate'] / n * 1000:>8.2f}us"
+              f"{median['old']:>10.3f}ms{median['featurize']:>10.3f}ms{int(result.valid.sum()):>8}")
+
+
+def main():
+    ap = argparse.ArgumentParser(description="Benchmark the request validator")
+    ap.add_argument("--benchmark", action="store_true", help="Time validation at several batch sizes")
+    ap.add_argument("--rows", type=int, default=10000, help="Largest batch size (default: 10000)")
+    ap.add_argument("--invalid", type=float, default=0.01, help="Share of invalid readings (default: 0.01)")
+    args = ap.parse_args()
+
+    if args.benchmark:
+        benchmark(sizes=sorted({1, 100, 1000, args.rows}), invalid_share=args.invalid)
+    else:
+        ap.print_help()
+
+
+if __name__ == "__main__":
+    main()
@@ -5,47 +5,120 @@ Uses actual data from balanced_data.csv for realistic predictions
 import json
 import time
 import random
-import pandas as pd
+import numpy as np
 from datetime import datetime
 import os
+from replay_engine import SENSOR_COLUMNS, Ticker, FileSink, NullSink, LogSink, HttpSink, run_replay
 
 DATA_FILE = "sensor_data.json"
 TRAINING_DATA_FILE = "balanced_data.csv"
 
 # Load training data once at startup
 _training_data = None
+_features = None  # (n, 6) float array of SENSOR_COLUMNS
+_labels = None  # (n,) label per row (NaN when the file has no label column)
+_datetimes = None  # (n,) recorded datetime64 per row (NaT when missing or unparseable)
+_label_indices = {}  # stress level -> row indices with that label (None -> all rows)
+_rng = np.random.default_rng()
 _current_indices = {None: 0, 0: 0, 1: 0, 2: 0}  # Track index for each stress level
-_current_timestamp = None  # Track sequential timestamp
+_current_timestamp = None  # Track sequential timestamp (numpy datetime64[us])
+
+def set_seed(seed):
+    """Seed the sampler so runs are reproducible"""
+    global _rng
+    _rng = np.random.default_rng(seed)
 
 def load_training_data():
-    """Load training data from CSV file"""
-    global _training_data, _current_timestamp
+    """Load training data from CSV file and precompute feature arrays and per-label indices"""
+    global _training_data, _features, _labels, _datetimes, _label_indices, _current_timestamp
     if _training_data is None:
         if os.path.exists(TRAINING_DATA_FILE):
+            import pandas as pd  # only needed here; --help and imports start without it
             print(f"Loading training data from {TRAINING_DATA_FILE}...")
             _training_data = pd.read_csv(TRAINING_DATA_FILE)
             print(f"Loaded {len(_training_data)} data points")
             # Don't shuffle - keep original order for sequential processing
+            _features = _training_data[SENSOR_COLUMNS].to_numpy(dtype=np.float64)
+            if 'label' in _training_data.columns:
+                _labels = _training_data['label'].to_numpy(dtype=np.float64)
+            else:
+                _labels = np.full(len(_training_data), np.nan)
+            if 'datetime' in _training_data.columns:
+                _datetimes = pd.to_datetime(_training_data['datetime'], errors='coerce').to_numpy()
+            else:
+                _datetimes = np.full(len(_training_data), np.datetime64('NaT'), dtype='datetime64[ns]')
+            _label_indices = {None: np.arange(len(_training_data))}
+            for level in (0, 1, 2):
+                indices = np.flatnonzero(_labels == float(level))
+                # Fallback to all data if no matches
+                _label_indices[level] = indices if len(indices) else _label_indices[None]
             # Initialize timestamp from first row or use current time as base
             if len(_training_data) > 0:
                 try:
                     # Try to parse the first datetime from the dataset
-                    first_dt_str = _training_data.iloc[0]['datetime']
-                    first_dt = pd.to_datetime(first_dt_str)
-                    # Convert pandas Timestamp to Python datetime
-                    if hasattr(first_dt, 'to_pydatetime'):
-                        _current_timestamp = first_dt.to_pydatetime()
-                    else:
-                        _current_timestamp = first_dt
+                    first_dt = pd.to_datetime(_training_data.iloc[0]['datetime'])
+                    _current_timestamp = first_dt.to_datetime64().astype('datetime64[us]')
                 except:
                     # If parsing fails, use current time as base
-                    _current_timestamp = datetime.now()
+                    _current_timestamp = np.datetime64(datetime.now(), 'us')
             else:
-                _current_timestamp = datetime.now()
+                _current_timestamp = np.datetime64(datetime.now(), 'us')
         else:
             raise FileNotFoundError(f"Training data file not found: {TRAINING_DATA_FILE}")
     return _training_data
 
+def sample_indices(n, stress_level=None, shuffle=True):
+    """
+    Pick n training rows
+    
+    Parameters:
+    - n: Number of rows
+    - stress_level: If None, draws from all data. If 0, 1, or 2, only rows with that label
+    - shuffle: If True, draws uniformly with the seeded generator; if False, continues
+      in dataset order from where the previous call stopped (wrapping around)
+    
+    Returns:
+    - Integer array of row indices into the precomputed feature arrays
+    """
+    if _training_data is None:
+        load_training_data()
+    
+    pool = _label_indices[stress_level]
+    if shuffle:
+        return pool[_rng.integers(0, len(pool), size=n)]
+    idx = _current_indices[stress_level]
+    _current_indices[stress_level] = (idx + n) % len(pool)
+    return pool[(idx + np.arange(n)) % len(pool)]
+
+def next_timestamps(n, step_seconds=1.0):
+    """Reserve n sequential timestamps (step_seconds apart) as a datetime64[us] array"""
+    global _current_timestamp
+    if _current_timestamp is None:
+        _current_timestamp = np.datetime64(datetime.now(), 'us')
+    step = np.timedelta64(int(round(step_seconds * 1e6)), 'us')
+    timestamps = _current_timestamp + step * np.arange(n)
+    _current_timestamp = _current_timestamp + step * n
+    return timestamps
+
+def generate_sensor_batch(n, stress_level=None, shuffle=True):
+    """
+    Get n sensor readings from the training dataset at once
+    
+    Parameters:
+    - n: Number of readings
+    - stress_level, shuffle: As for generate_sensor_data()
+    
+    Returns:
+    - Dict of arrays: 'values' (n, 6) in SENSOR_COLUMNS order, 'labels' (n,),
+      'timestamps' (n,) datetime64[us], one second apart and continuing the sequence
+    """
+    indices = sample_indices(n, stress_level=stress_level, shuffle=shuffle)
+    return {
+        'values': _features[indices],
+        'labels': _labels[indices],
+        'timestamps': next_timestamps(n)
+    }
+
 def generate_sensor_data(stress_level=None, shuffle=True):
     """
     Get actual sensor data from training dataset
@@ -54,56 +127,203 @@ def generate_sensor_data(stress_level=None, shuffle=True):
     - stress_level: If None, uses data in order. If 0, 1, or 2, filters by that label
     - shuffle: If True, randomly selects from matching data
     """
-    global _current_indices, _training_data, _current_timestamp
+    idx = sample_indices(1, stress_level=stress_level, shuffle=shuffle)[0]
     
-    # Load training data if not already loaded
-    if _training_data is None:
+    # Generate sequential timestamp (increment by 1 second each time)
+    timestamp_str = next_timestamps(1)[0].item().strftime("%Y-%m-%d %H:%M:%S.%f")
+    
+    # Convert to dict with sequential timestamp
+    data = dict(zip(SENSOR_COLUMNS, _features[idx].tolist()))
+    data['timestamp'] = timestamp_str
+    
+    return data
+
+class SamplerSource:
+    """
+    Replay source that samples training rows (rate and as-fast-as-possible modes)
+    
+    Parameters:
+    - stress_level: Fixed stress level (0, 1, 2) or None for all data
+    - cycle_stress: If True, cycles through stress levels 1->2->0->1... every 10 readings
+    - shuffle: If True, randomly samples; if False, goes through the data sequentially
+    - step_seconds: Spacing of the generated timestamps
+    """
+    
+    def __init__(self, stress_level=None, cycle_stress=False, shuffle=True, step_seconds=1.0):
         load_training_data()
+        self.stress_level = stress_level
+        self.cycle_stress = cycle_stress
+        self.shuffle = shuffle
+        self.step_seconds = step_seconds
+        self.position = 0
     
-    # Filter by stress level if specified
-    if stress_level is not None:
-        filtered_data = _training_data[_training_data['label'] == float(stress_level)]
-        if len(filtered_data) == 0:
-            # Fallback to all data if no matches
-            filtered_data = _training_data
-        if shuffle:
-            row = filtered_data.sample(n=1).iloc[0]
+    def take(self, n):
+        if self.cycle_stress:
+            # Same schedule as run_simulator(cycle_stress=True)
+            levels = ((self.position + np.arange(n)) // 10 + 1) % 3
+            indices = np.empty(n, dtype=np.int64)
+            for level in (0, 1, 2):
+                mask = levels == level
+                if mask.any():
+                    indices[mask] = sample_indices(int(mask.sum()), stress_level=level, shuffle=self.shuffle)
         else:
-            idx = _current_indices[stress_level]
-            row = filtered_data.iloc[idx % len(filtered_data)]
-            _current_indices[stress_level] = (idx + 1) % len(filtered_data)
-    else:
-        # Use data in order (or shuffled)
-        if shuffle:
-            row = _training_data.sample(n=1).iloc[0]
-        else:
-            idx = _current_indices[None]
-            row = _training_data.iloc[idx % len(_training_data)]
-            _current_indices[None] = (idx + 1) % len(_training_data)
+            indices = sample_indices(n, stress_level=self.stress_level, shuffle=self.shuffle)
+        self.position += n
+        return {
+            'values': _features[indices],
+            'labels': _labels[indices],
+            'timestamps': next_timestamps(n, self.step_seconds)
+        }
+
+class TimelineSource:
+    """
+    Replay source that plays the dataset in order with its recorded timing (speed mode)
     
-    # Generate sequential timestamp (increment by 1 second each time)
-    if _current_timestamp is None:
-        _current_timestamp = datetime.now()
+    Parameters:
+    - max_gap: Gaps between consecutive rows longer than this many seconds (or negative,
+      e.g. where one device's recording ends and the next begins) are replaced by the
+      typical row spacing
     
-    # Format timestamp to match original dataset format (with microseconds)
-    timestamp_str = _current_timestamp.strftime("%Y-%m-%d %H:%M:%S.%f")
+    The recording loops; each pass continues the timestamps after the previous one.
+    """
     
-    # Increment timestamp for next call (add 1 second)
-    from datetime import timedelta
-    _current_timestamp += timedelta(seconds=1)
+    def __init__(self, max_gap=60.0):
+        load_training_data()
+        n = len(_training_data)
+        seconds = _datetimes.astype('datetime64[ns]').astype('int64') / 1e9
+        deltas = np.diff(seconds)
+        good = np.isfinite(deltas) & (deltas > 0) & (deltas <= max_gap) & ~np.isnat(_datetimes[1:])
+        typical = float(np.median(deltas[good])) if good.any() else 1.0
+        deltas = np.where(good, deltas, typical)
+        
+        self.offsets = np.concatenate([[0.0], np.cumsum(deltas)])  # seconds since the first row
+        self.span = self.offsets[-1] + typical  # length of one pass
+        self.n = n
+        first = _datetimes[0] if n and not np.isnat(_datetimes[0]) else np.datetime64(datetime.now())
+        self.first = np.datetime64(first, 'us')
+        self.position = 0
     
-    # Convert to dict with sequential timestamp
-    data = {
-        'X': float(row['X']),
-        'Y': float(row['Y']),
-        'Z': float(row['Z']),
-        'EDA': float(row['EDA']),
-        'HR': float(row['HR']),
-        'TEMP': float(row['TEMP']),
-        'timestamp': timestamp_str
-    }
+    def due(self, replay_seconds):
+        """Number of readings recorded at or before replay_seconds into the (looped) recording"""
+        passes, into_pass = divmod(replay_seconds, self.span)
+        return int(passes) * self.n + int(np.searchsorted(self.offsets, into_pass, side='right'))
     
-    return data
+    def take(self, n):
+        positions = self.position + np.arange(n)
+        rows = positions % self.n
+        offsets = (positions // self.n) * self.span + self.offsets[rows]
+        self.position += n
+        return {
+            'values': _features[rows],
+            'labels': _labels[rows],
+            'timestamps': self.first + np.round(offsets * 1e6).astype('int64').astype('timedelta64[us]')
+        }
+
+class FleetSource:
+    """
+    Replay source for many concurrent devices (fleet mode)
+    
+    Parameters:
+    - n_devices: Number of simulated wearables
+    - device_rate: Readings per second per device
+    - stress_level: Fixed stress level (0, 1, 2) for every device, or None for all data
+    - cycle_stress: If True, each device cycles 1->2->0... every 10 readings, starting
+      at its own random point in the cycle
+    - shuffle: If True, randomly samples; if False, goes through the data sequentially
+    - clock_jitter: Std (seconds) of per-reading noise on device timestamps
+    - clock_skew: Std (seconds) of a fixed per-device clock offset
+    - id_prefix: Device IDs are id_prefix + zero-padded index
+    
+    Each device reports at its own random phase within the period, so readings
+    arrive spread out rather than in one burst per second. Readings are produced
+    in global time order; due() counts those scheduled at or before a time, so
+    run_replay(speed=...) plays the fleet in real time (speed=1) or time-warped.
+    """
+    
+    def __init__(self, n_devices, device_rate=1.0, stress_level=None, cycle_stress=False, shuffle=True,
+                 clock_jitter=0.0, clock_skew=0.0, id_prefix='device-'):
+        load_training_data()
+        self.n = n_devices
+        self.period = 1.0 / device_rate
+        self.stress_level = stress_level
+        self.cycle_stress = cycle_stress
+        self.shuffle = shuffle
+        self.clock_jitter = clock_jitter
+        
+        width = len(str(n_devices - 1))
+        self.device_ids = np.array([f"{id_prefix}{i:0{width}d}" for i in range(n_devices)])
+        # Devices ordered by phase, so position -> (period k, slot) is time-ordered
+        phases = _rng.uniform(0, self.period, size=n_devices)
+        self.order = np.argsort(phases)
+        self.phases = phases[self.order]
+        self.skew = _rng.normal(0, clock_skew, size=n_devices) if clock_skew else np.zeros(n_devices)
+        self.cycle_offset = _rng.integers(0, 30, size=n_devices)
+        self.first = _current_timestamp if _current_timestamp is not None else np.datetime64(datetime.now(), 'us')
+        self.position = 0
+    
+    def due(self, replay_seconds):
+        """Number of readings scheduled at or before replay_seconds"""
+        periods, into_period = divmod(replay_seconds, self.period)
+        return int(periods) * self.n + int(np.searchsorted(self.phases, into_period, side='right'))
+    
+    def take(self, n):
+        positions = self.position + np.arange(n)
+        self.position += n
+        k, slot = np.divmod(positions, self.n)
+        devices = self.order[slot]
+        
+        if self.cycle_stress:
+            levels = ((k + self.cycle_offset[devices]) // 10 + 1) % 3
+            indices = np.empty(n, dtype=np.int64)
+            for level in (0, 1, 2):
+                mask = levels == level
+                if mask.any():
+                    indices[mask] = sample_indices(int(mask.sum()), stress_level=level, shuffle=self.shuffle)
+        else:
+            indices = sample_indices(n, stress_level=self.stress_level, shuffle=self.shuffle)
+        
+        seconds = k * self.period + self.phases[slot] + self.skew[devices]
+        if self.clock_jitter:
+            seconds = seconds + _rng.normal(0, self.clock_jitter, size=n)
+        return {
+            'values': _features[indices],
+            'labels': _labels[indices],
+            'timestamps': self.first + np.round(seconds * 1e6).astype('int64').astype('timedelta64[us]'),
+            'device_ids': self.device_ids[devices]
+        }
+
+def make_sink(kind, path=DATA_FILE, log_file="sensor_log.jsonl", url="http://localhost:5000", device_id=None,
+              **http_options):
+    """Build the sink selected by --sink (http_options are passed to HttpSink)"""
+    if kind == 'file':
+        return FileSink(path, device_id=device_id)
+    if kind == 'null':
+        return NullSink()
+    if kind == 'log':
+        return LogSink(log_file)
+    if kind == 'http':
+        return HttpSink(url, **http_options)
+    raise ValueError(f"Unknown sink: {kind}")
+
+def benchmark_sampling(n=1000000, batch_size=100000, stress_level=None):
+    """Report readings per second for batched sampling and for single readings"""
+    load_training_data()
+    
+    t0 = time.perf_counter()
+    done = 0
+    while done < n:
+        batch = generate_sensor_batch(min(batch_size, n - done), stress_level=stress_level)
+        done += len(batch['labels'])
+    batch_s = time.perf_counter() - t0
+    
+    singles = min(n, 100000)
+    t0 = time.perf_counter()
+    for _ in range(singles):
+        generate_sensor_data(stress_level=stress_level)
+    single_s = time.perf_counter() - t0
+    
+    print(f"Batched ({batch_size} per batch): {n / batch_s:,.0f} readings/s")
+    print(f"Single readings:               {singles / single_s:,.0f} readings/s")
 
 def save_sensor_data(data):
     """Save sensor data to JSON file"""
@@ -159,6 +379,7 @@ def run_simulator(interval=1.0, stress_level=None, cycle_stress=False, sequentia
     
     current_cycle_level = 0
     cycle_count = 0
+    ticker = Ticker(interval)
     
     try:
         while True:
@@ -182,7 +403,7 @@ def run_simulator(interval=1.0, stress_level=None, cycle_stress=False, sequentia
                   f"EDA:{sensor_data['EDA']:.3f} HR:{sensor_data['HR']:.1f} TEMP:{sensor_data['TEMP']:.2f}"
                   f"{stress_indicator}")
             
-            time.sleep(interval)
+            ticker.wait()
     except KeyboardInterrupt:
         print("\n\nSimulator stopped.")
 
@@ -198,8 +419,102 @@ if __name__ == "__main__":
                        help="Cycle through stress levels 0->1->2->0...")
     parser.add_argument("--sequential", action="store_true",
                        help="Go through data sequentially instead of random sampling")
+    parser.add_argument("--seed", type=int, default=None,
+                       help="Random seed for reproducible sampling")
+    parser.add_argument("--benchmark", type=int, default=None, metavar="N",
+                       help="Time sampling N readings instead of running the simulator")
+    replay = parser.add_mutually_exclusive_group()
+    replay.add_argument("--rate", type=float, default=None,
+                       help="Replay mode: emit this many readings per second (drift-corrected)")
+    replay.add_argument("--speed", type=float, default=None,
+                       help="Replay mode: play the dataset in order with its recorded timing, "
+                            "sped up by this factor")
+    replay.add_argument("--fast", action="store_true",
+                       help="Replay mode: emit readings as fast as possible (benchmarks)")
+    parser.add_argument("--duration", type=float, default=None,
+                       help="Replay modes: stop after this many seconds")
+    parser.add_argument("--count", type=int, default=None,
+                       help="Replay modes: stop after this many readings")
+    parser.add_argument("--batch-size", type=int, default=10000,
+                       help="Readings per batch in --fast mode (default: 10000)")
+    parser.add_argument("--sink", type=str, choices=['file', 'null', 'log', 'http'], default='file',
+                       help="Where readings go (default: file, i.e. %s); without a replay mode, "
+                            "other sinks get one reading per --interval" % DATA_FILE)
+    parser.add_argument("--log-file", type=str, default="sensor_log.jsonl",
+                       help="JSON lines file for --sink log (default: sensor_log.jsonl)")
+    parser.add_argument("--url", type=str, default="http://localhost:5000",
+                       help="Prediction API base URL for --sink http (default: http://localhost:5000)")
+    parser.add_argument("--endpoint", type=str, choices=['batch', 'single'], default='batch',
+                       help="--sink http: post to /predict/batch or one reading per /predict (default: batch)")
+    parser.add_argument("--http-batch", type=int, default=100,
+                       help="--sink http: readings per /predict/batch request (default: 100)")
+    parser.add_argument("--http-max-wait", type=float, default=0.5,
+                       help="--sink http: seconds before a partial batch is sent (default: 0.5)")
+    parser.add_argument("--concurrency", type=int, default=4,
+                       help="--sink http: maximum requests in flight (default: 4)")
+    parser.add_argument("--gzip", action="store_true",
+                       help="--sink http: gzip request bodies")
+    parser.add_argument("--devices", type=int, default=None,
+                       help="Fleet mode: simulate this many devices (real time; --speed warps, --fast floods)")
+    parser.add_argument("--device-rate", type=float, default=1.0,
+                       help="Fleet mode: readings per second per device (default: 1.0)")
+    parser.add_argument("--clock-jitter", type=float, default=0.0,
+                       help="Fleet mode: std in seconds of per-reading device clock noise")
+    parser.add_argument("--clock-skew", type=float, default=0.0,
+                       help="Fleet mode: std in seconds of each device's fixed clock offset")
     
     args = parser.parse_args()
+    if args.seed is not None:
+        set_seed(args.seed)
+    if args.benchmark:
+        benchmark_sampling(args.benchmark, stress_level=args.stress_level)
+        raise SystemExit
+    
+    http_options = dict(endpoint=args.endpoint, max_batch=args.http_batch, max_wait=args.http_max_wait,
+                        concurrency=args.concurrency, compress=args.gzip)
+    if args.sink != 'file' and not (args.devices or args.rate or args.speed or args.fast):
+        # The classic simulator only writes DATA_FILE: send other sinks one reading per --interval
+        if args.interval <= 0:
+            parser.error("--interval must be positive")
+        args.rate = 1.0 / args.interval
+    if args.devices or args.rate or args.speed or args.fast:
+        try:
+            load_training_data()
+        except FileNotFoundError as e:
+            print(f"Error: {e}")
+            raise SystemExit(1)
+        if args.devices:
+            if args.rate:
+                parser.error("--rate does not apply to fleet mode; use --device-rate")
+            source = FleetSource(args.devices, device_rate=args.device_rate, stress_level=args.stress_level,
+                                 cycle_stress=args.cycle, shuffle=not args.sequential,
+                                 clock_jitter=args.clock_jitter, clock_skew=args.clock_skew)
+            speed = None if args.fast else (args.speed or 1.0)
+            print(f"Simulating {args.devices} devices at {args.device_rate} Hz"
+                  + (f" ({args.speed}x speed)" if args.speed else "") + (" as fast as possible" if args.fast else ""))
+            print("Press Ctrl+C to stop\n")
+            sink = make_sink(args.sink, log_file=args.log_file, url=args.url,
+                             device_id=source.device_ids[0], **http_options)
+            run_replay(source, sink, speed=speed, duration=args.duration, max_readings=args.count,
+                       batch_size=args.batch_size,
+                       target_rate=args.devices * args.device_rate * speed if speed else None)
+            raise SystemExit
+        if args.speed:
+            if args.stress_level is not None or args.cycle:
+                parser.error("--speed replays the recording as is; it cannot be combined with "
+                             "--stress-level or --cycle")
+            source = TimelineSource()
+            print(f"Replaying {TRAINING_DATA_FILE} at {args.speed}x recorded speed")
+        else:
+            source = SamplerSource(stress_level=args.stress_level, cycle_stress=args.cycle,
+                                   shuffle=not args.sequential,
+                                   step_seconds=1.0 / args.rate if args.rate else 1.0)
+            print(f"Replaying at {args.rate:,.0f} readings/s" if args.rate else "Replaying as fast as possible")
+        print("Press Ctrl+C to stop\n")
+        run_replay(source, make_sink(args.sink, log_file=args.log_file, url=args.url, **http_options),
+                   rate=args.rate, speed=args.speed,
+                   duration=args.duration, max_readings=args.count, batch_size=args.batch_size)
+        raise SystemExit
     run_simulator(
         interval=args.interval, 
         stress_level=args.stress_level, 
@@ -0,0 +1,287 @@
+"""
+Stress Prediction API Client
+Pooled, batching, retrying client for app.py's /predict and /predict/batch
+endpoints, with an asyncio variant and per-call latency statistics
+"""
+import asyncio
+import gzip
+import json
+import random
+import threading
+import time
+from array import array
+from concurrent.futures import Future, ThreadPoolExecutor
+
+import numpy as np
+import requests
+from requests.adapters import HTTPAdapter
+
+# Worth retrying: throttling and server-side failures (4xx other than 429 are the caller's fault)
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+class StressAPIError(Exception):
+    """The API rejected a request or could not be reached after all retries"""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+
+class StressClient:
+    """
+    Client for the stress prediction API
+
+    Parameters:
+    - base_url: API base URL (e.g. http://localhost:5000)
+    - timeout: Seconds per HTTP attempt
+    - pool_size: Keep-alive connections kept open (and auto-batch requests in flight)
+    - max_retries: Retries per call on connection errors, timeouts and 429/5xx responses
+    - backoff_base, backoff_max: Exponential backoff bounds in seconds ("full jitter": each
+      wait is uniform between 0 and the bound)
+    - compress: gzip request bodies (app.py accepts Content-Encoding: gzip). Responses are
+      requested gzip-compressed either way and decoded transparently
+    - batch_size: Readings per /predict/batch request (predict_batch chunks, submit batches)
+    - flush_interval: Seconds a submit()ted reading waits for its batch to fill
+
+    predict() and predict_batch() are synchronous. submit() queues a reading for
+    automatic batching and returns a Future of its result. Use the client as a
+    context manager, or call close(), to flush pending readings.
+    """
+
+    def __init__(self, base_url, timeout=10.0, pool_size=10, max_retries=3, backoff_base=0.2,
+                 backoff_max=5.0, compress=False, batch_size=100, flush_interval=0.2):
+        self.base_url = base_url.rstrip('/')
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.compress = compress
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+        self.session.headers.update({'Accept-Encoding': 'gzip'})
+
+        self._stats_lock = threading.Lock()
+        self._latencies = array('d')
+        self._counts = {'calls': 0, 'errors': 0, 'retries': 0}
+
+        # Auto-batching state (see submit)
+        self._pending = []
+        self._pending_lock = threading.Condition()
+        self._closing = False
+        self._batcher = None
+        self._senders = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='stress-client')
+
+    # -- HTTP ------------------------------------------------------------------
+
+    def _post(self, path, body):
+        """POST JSON with retries; returns the decoded response"""
+        data = json.dumps(body).encode()
+        headers = {'Content-Type': 'application/json'}
+        if self.compress:
+            data = gzip.compress(data, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+
+        t0 = time.perf_counter()
+        for attempt in range(self.max_retries + 1):
+            error, status = None, None
+            try:
+                response = self.session.post(self.base_url + path, data=data, headers=headers,
+                                             timeout=self.timeout)
+                status = response.status_code
+                if status < 400:
+                    payload = response.json()
+                    self._record(time.perf_counter() - t0, attempt)
+                    return payload
+                error = f"HTTP {status}: {response.text[:200]}"
+                if status not in RETRY_STATUSES:
+                    break
+            except (requests.ConnectionError, requests.Timeout) as e:
+                error = str(e)
+            if attempt < self.max_retries:
+                time.sleep(random.uniform(0, min(self.backoff_max, self.backoff_base * (2 ** attempt))))
+
+        self._record(time.perf_counter() - t0, attempt, failed=True)
+        raise StressAPIError(f"POST {path} failed: {error}", status=status)
+
+    def _record(self, latency, retries, failed=False):
+        with self._stats_lock:
+            self._counts['calls'] += 1
+            self._counts['retries'] += retries
+            if failed:
+                self._counts['errors'] += 1
+            else:
+                self._latencies.append(latency)
+
+    # -- Synchronous API -------------------------------------------------------
+
+    def predict(self, reading):
+        """
+        Predict one reading via /predict
+
+        Parameters:
+        - reading: Dict with X, Y, Z, EDA, HR, TEMP (optional datetime, id)
+
+        Returns the API response (predicted_label, probabilities, confidence)
+        """
+        return self._post('/predict', reading)
+
+    def predict_batch(self, readings):
+        """
+        Predict many readings via /predict/batch, batch_size readings per request
+
+        Returns one result per reading, in order; invalid readings get a result with an 'error' key
+        """
+        results = []
+        for start in range(0, len(readings), self.batch_size):
+            payload = self._post('/predict/batch', {'data': readings[start:start + self.batch_size]})
+            results.extend(payload.get('predictions', []))
+        return results
+
+    def predict_ensemble(self, reading, combine=None, weights=None, models=None):
+        """
+        Predict with every model of the server's ensemble via /predict/ensemble
+
+        Parameters:
+        - reading: One reading dict, or a list of readings (sent as one batch)
+        - combine: 'mean', 'weighted' or 'vote' (default: the server's ENSEMBLE_COMBINE)
+        - weights: Dict of model name -> weight
+        - models: Subset of model names to run
+
+        Returns the API response: combined verdict, per-model results and timing_ms
+        """
+        body = {'data': reading} if isinstance(reading, list) else dict(reading)
+        options = {'combine': combine, 'weights': weights, 'models': models}
+        body.update({key: value for key, value in options.items() if value is not None})
+        return self._post('/predict/ensemble', body)
+
+    # -- Automatic batching ----------------------------------------------------
+
+    def submit(self, reading):
+        """Queue a reading for the next /predict/batch request; returns a Future of its result"""
+        future = Future()
+        with self._pending_lock:
+            if self._closing:
+                raise RuntimeError("Client is closed")
+            if self._batcher is None:
+                self._batcher = threading.Thread(target=self._run_batcher, name='stress-client-batcher',
+                                                 daemon=True)
+                self._batcher.start()
+            self._pending.append((reading, future))
+            # Wake the batcher when a batch starts (to time its flush_interval) or is full
+            if len(self._pending) == 1 or len(self._pending) >= self.batch_size:
+                self._pending_lock.notify()
+        return future
+
+    def _run_batcher(self):
+        while True:
+            with self._pending_lock:
+                if not self._pending and not self._closing:
+                    self._pending_lock.wait()
+                if self._pending and len(self._pending) < self.batch_size and not self._closing:
+                    # Give the batch flush_interval to fill up
+                    self._pending_lock.wait(self.flush_interval)
+                batch, self._pending = self._pending[:self.batch_size], self._pending[self.batch_size:]
+                if not batch and self._closing:
+                    return
+            if batch:
+                self._senders.submit(self._send_batch, batch)
+
+    def _send_batch(self, batch):
+        try:
+            payload = self._post('/predict/batch', {'data': [reading for reading, _ in batch]})
+            results = payload.get('predictions', [])
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            for _, future in batch[len(results):]:
+                future.set_exception(StressAPIError("Missing result in batch response"))
+        except Exception as e:
+            for _, future in batch:
+                future.set_exception(e)
+
+    def flush(self):
+        """Send queued readings now and wait for their results"""
+        with self._pending_lock:
+            futures = [future for _, future in self._pending]
+            self._pending_lock.notify()
+        for future in futures:
+            try:
+                future.result()
+            except Exception:
+                pass
+
+    def close(self):
+        """Flush queued readings, wait for in-flight requests and close connections"""
+        with self._pending_lock:
+            self._closing = True
+            self._pending_lock.notify()
+        if self._batcher is not None:
+            self._batcher.join()
+        self._senders.shutdown(wait=True)
+        self.session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # -- Statistics ------------------------------------------------------------
+
+    def stats(self):
+        """Call counts plus latency percentiles in ms (successful calls, retries included)"""
+        with self._stats_lock:
+            stats = dict(self._counts)
+            latencies = np.frombuffer(self._latencies, dtype=np.float64) * 1000 if self._latencies else None
+        if latencies is not None:
+            stats.update({
+                'latency_p50_ms': float(np.percentile(latencies, 50)),
+                'latency_p95_ms': float(np.percentile(latencies, 95)),
+                'latency_p99_ms': float(np.percentile(latencies, 99)),
+                'latency_max_ms': float(latencies.max())
+            })
+        return stats
+
+
+class AsyncStressClient:
+    """
+    asyncio variant of StressClient
+
+    Takes the same parameters. Calls run the pooled synchronous client on a
+    thread pool (pool_size workers), so coroutines never block the event loop.
+    """
+
+    def __init__(self, base_url, pool_size=10, **kwargs):
+        self.client = StressClient(base_url, pool_size=pool_size, **kwargs)
+        self._executor = ThreadPoolExecutor(max_workers=pool_size, thread_name_prefix='stress-client-async')
+
+    async def _call(self, func, *args):
+        return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+
+    async def predict(self, reading):
+        return await self._call(self.client.predict, reading)
+
+    async def predict_batch(self, readings):
+        return await self._call(self.client.predict_batch, readings)
+
+    async def submit(self, reading):
+        """Auto-batched prediction; resolves to this reading's result"""
+        return await asyncio.wrap_future(self.client.submit(reading))
+
+    def stats(self):
+        return self.client.stats()
+
+    async def close(self):
+        await self._call(self.client.close)
+        self._executor.shutdown(wait=False)
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
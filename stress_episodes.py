@@ -0,0 +1,233 @@
+"""
+Stress Episode Detection
+Collapses per-reading stress predictions into episode transitions
+(start, optional periodic summaries, end) so only those are persisted
+"""
+import itertools
+import numbers
+import os
+import uuid
+
+import numpy as np
+import pandas as pd
+
+EPISODE_START = 'episode_start'
+EPISODE_SUMMARY = 'episode_summary'
+EPISODE_END = 'episode_end'
+
+# Per-key state: [phase, start, last_stress, peak, confidence_sum, readings, last_summary, episode_id]
+_IDLE, _CANDIDATE, _ACTIVE = 0, 1, 2
+
+
+def _to_seconds(timestamp):
+    """Seconds since the epoch for a float, datetime or pandas Timestamp"""
+    if isinstance(timestamp, numbers.Real):
+        return float(timestamp)
+    return pd.Timestamp(timestamp).value / 1e9
+
+
+class EpisodeDetector:
+    """
+    Streaming stress episode detector with O(1) state per (device, model).
+
+    Parameters:
+    - enter_level: Stress level at or above which a reading counts as stressed
+    - enter_confidence: Confidence required to start an episode; once started,
+      stressed readings extend it at any confidence (hysteresis)
+    - min_duration: Seconds a stressed run must last before its start is emitted;
+      shorter runs are discarded
+    - exit_after: Seconds without stressed readings before an episode ends
+    - summary_interval: Seconds between summary events while an episode lasts (None disables)
+
+    update() returns the (usually empty) list of events to persist.
+    """
+
+    def __init__(self, enter_level=1, enter_confidence=0.6, min_duration=10.0,
+                 exit_after=30.0, summary_interval=None):
+        self.enter_level = enter_level
+        self.enter_confidence = enter_confidence
+        self.min_duration = min_duration
+        self.exit_after = exit_after
+        self.summary_interval = summary_interval
+        self._states = {}
+
+    @classmethod
+    def from_env(cls):
+        """Build a detector from EPISODE_* environment variables"""
+        summary_interval = os.getenv('EPISODE_SUMMARY_INTERVAL')
+        return cls(
+            enter_level=float(os.getenv('EPISODE_ENTER_LEVEL', '1')),
+            enter_confidence=float(os.getenv('EPISODE_ENTER_CONFIDENCE', '0.6')),
+            min_duration=float(os.getenv('EPISODE_MIN_DURATION', '10')),
+            exit_after=float(os.getenv('EPISODE_EXIT_AFTER', '30')),
+            summary_interval=float(summary_interval) if summary_interval else None
+        )
+
+    def _event(self, event_type, key, state, now):
+        device_id, model_name = key
+        event = {
+            'event_type': event_type,
+            'episode_id': state[7],
+            'device_id': device_id,
+            'model_name': model_name,
+            'start_time': pd.Timestamp(state[1], unit='s').isoformat(),
+            'peak_level': state[3],
+            'mean_confidence': state[4] / state[5],
+            'readings': state[5],
+        }
+        if event_type == EPISODE_END:
+            event['end_time'] = pd.Timestamp(state[2], unit='s').isoformat()
+            event['duration_seconds'] = state[2] - state[1]
+        else:
+            event['duration_seconds'] = now - state[1]
+        return event
+
+    def update(self, timestamp, level, confidence, device_id='default', model_name=None):
+        """
+        Feed one prediction.
+
+        Parameters:
+        - timestamp: Reading time (seconds, datetime or Timestamp); must not decrease per key
+        - level: Predicted stress level
+        - confidence: Prediction confidence (0-1)
+        """
+        now = _to_seconds(timestamp)
+        key = (device_id, model_name)
+        state = self._states.get(key)
+        if state is None:
+            state = self._states[key] = [_IDLE, 0.0, 0.0, 0.0, 0.0, 0, 0.0, None]
+
+        events = []
+        stressed = level >= self.enter_level
+        phase = state[0]
+
+        if phase != _IDLE and now - state[2] >= self.exit_after:
+            # No stressed reading for exit_after seconds
+            if phase == _ACTIVE:
+                events.append(self._event(EPISODE_END, key, state, now))
+            state[0] = phase = _IDLE
+
+        if stressed:
+            if phase == _IDLE:
+                if confidence < self.enter_confidence:
+                    return events
+                state[:] = [_CANDIDATE, now, now, float(level), 0.0, 0, now, uuid.uuid4().hex]
+                phase = _CANDIDATE
+            state[2] = now
+            state[3] = max(state[3], float(level))
+            state[4] += float(confidence)
+            state[5] += 1
+
+            if phase == _CANDIDATE and now - state[1] >= self.min_duration:
+                state[0] = _ACTIVE
+                state[6] = now
+                events.append(self._event(EPISODE_START, key, state, now))
+            elif (phase == _ACTIVE and self.summary_interval is not None
+                  and now - state[6] >= self.summary_interval):
+                state[6] = now
+                events.append(self._event(EPISODE_SUMMARY, key, state, now))
+        elif phase == _CANDIDATE:
+            # Too short to count as an episode
+            state[0] = _IDLE
+
+        return events
+
+    def flush(self):
+        """End every open episode (e.g. at shutdown or end of a replay)"""
+        events = []
+        for key, state in self._states.items():
+            if state[0] == _ACTIVE:
+                events.append(self._event(EPISODE_END, key, state, state[2]))
+            state[0] = _IDLE
+        return events
+
+    def open_episodes(self):
+        """Number of episodes currently in progress"""
+        return sum(1 for state in self._states.values() if state[0] == _ACTIVE)
+
+
+def replay_report(timestamps, levels, confidences, device_ids=None, model_name=None, detector=None):
+    """
+    Compare per-reading writes with episode writes over a replayed sequence.
+
+    Parameters:
+    - timestamps, levels, confidences: Sequences in time order (per device)
+    - device_ids: Optional sequence of device IDs (default: one device)
+
+    Returns a dict with write counts and the reduction factor.
+    """
+    detector = detector or EpisodeDetector()
+    if device_ids is None:
+        device_ids = itertools.repeat('default')
+
+    per_reading_writes = 0
+    counts = {EPISODE_START: 0, EPISODE_SUMMARY: 0, EPISODE_END: 0}
+    for timestamp, level, confidence, device_id in zip(timestamps, levels, confidences, device_ids):
+        if level > 0:
+            per_reading_writes += 1
+        for event in detector.update(timestamp, level, confidence, device_id=device_id, model_name=model_name):
+            counts[event['event_type']] += 1
+    for event in detector.flush():
+        counts[event['event_type']] += 1
+
+    episode_writes = sum(counts.values())
+    return {
+        'per_reading_writes': per_reading_writes,
+        'episode_writes': episode_writes,
+        'episodes': counts[EPISODE_START],
+        'summaries': counts[EPISODE_SUMMARY],
+        'reduction': per_reading_writes / episode_writes if episode_writes else float('inf'),
+    }
+
+
+def main():
+    import argparse
+    from predict import load_model, predict_from_csv
+
+    ap = argparse.ArgumentParser(description="Report the stress event write reduction of episode detection")
+    ap.add_argument("--csv", type=str, default="balanced_data.csv",
+                    help="Data to replay (default: balanced_data.csv)")
+    ap.add_argument("--model", type=str, default=None,
+                    help="Model to replay predictions from (default: all models in --model_dir)")
+    ap.add_argument("--model_dir", type=str, default="models")
+    ap.add_argument("--labels", action="store_true",
+                    help="Replay the 'label' column (confidence 1.0) instead of model predictions")
+    ap.add_argument("--min-duration", type=float, default=10.0)
+    ap.add_argument("--exit-after", type=float, default=30.0)
+    ap.add_argument("--summary-interval", type=float, default=None)
+    args = ap.parse_args()
+
+    df = pd.read_csv(args.csv)
+    timestamps = pd.to_datetime(df['datetime']).to_numpy().astype('datetime64[ns]').astype('int64') / 1e9
+    ids = df['id'].astype(str).to_numpy() if 'id' in df.columns else np.zeros(len(df), dtype=int)
+    # Replay each device in time order
+    order = np.lexsort((timestamps, ids))
+    timestamps, device_ids = timestamps[order], ids[order].tolist()
+
+    if args.labels:
+        runs = {'label': (df['label'].to_numpy(), np.ones(len(df)))}
+    else:
+        model_files = [args.model] if args.model else sorted(
+            f for f in os.listdir(args.model_dir) if f.endswith('.joblib'))
+        runs = {}
+        for model_file in model_files:
+            model = load_model(model_file, model_dir=args.model_dir)
+            _, preds, probas = predict_from_csv(model, args.csv)
+            runs[model_file.replace('.joblib', '')] = (preds, probas.max(axis=1))
+
+    print(f"Replaying {len(df)} readings from {args.csv}")
+    print("="*72)
+    print(f"{'source':22s} {'per-reading':>12s} {'episode':>9s} {'episodes':>9s} {'reduction':>11s}")
+    for name, (levels, confidences) in runs.items():
+        levels, confidences = np.asarray(levels)[order], np.asarray(confidences)[order]
+        detector = EpisodeDetector(min_duration=args.min_duration, exit_after=args.exit_after,
+                                   summary_interval=args.summary_interval)
+        report = replay_report(timestamps, levels, confidences, device_ids=device_ids,
+                               model_name=name, detector=detector)
+        print(f"{name:22s} {report['per_reading_writes']:12d} {report['episode_writes']:9d} "
+              f"{report['episodes']:9d} {report['reduction']:10.1f}x")
+    print("="*72)
+
+
+if __name__ == "__main__":
+    main()
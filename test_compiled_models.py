@@ -0,0 +1,170 @@
+"""
+Test compiled models: parity with the sklearn pipelines they replace
+"""
+import os
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pandas as pd
+from sklearn.compose import ColumnTransformer
+from sklearn.ensemble import GradientBoostingClassifier
+from sklearn.linear_model import LogisticRegression
+from sklearn.pipeline import Pipeline
+from sklearn.preprocessing import StandardScaler
+
+from compiled_models import (CompiledPipeline, LinearKernel, MLPKernel, compile_model, fold_standard_scaler,
+                             load_bundle, save_bundle, _sample_frame)
+from predict import load_model
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+
+
+def test_gradient_boosting_parity():
+    """Compiled probabilities and labels match predict_proba/predict, columns in any order"""
+    model = load_model('gradient_boosting.joblib', model_dir=MODEL_DIR, compiled=False)
+    compiled = compile_model(model)
+    assert isinstance(compiled, CompiledPipeline)
+
+    df = _sample_frame(3000, seed=1)
+    shuffled = df[df.columns[::-1]].assign(id='5C')
+    assert np.allclose(compiled.predict_proba(shuffled), model.predict_proba(df), rtol=0, atol=1e-12)
+    assert np.array_equal(compiled.predict(df), model.predict(df))
+    assert np.allclose(compiled.predict_proba(df.iloc[:1]), model.predict_proba(df.iloc[:1]), rtol=0, atol=1e-12)
+
+
+def test_threshold_ties():
+    """Inputs exactly on a split threshold go left, as in sklearn"""
+    model = load_model('gradient_boosting.joblib', model_dir=MODEL_DIR, compiled=False)
+    compiled = compile_model(model)
+    prep = model.named_steps['prep'].transformers_[0][1]
+    tree = model.named_steps['model'].estimators_[0, 0].tree_
+    df = _sample_frame(50, seed=2)
+    # Put the root split's feature exactly on its threshold (in the original units)
+    column = compiled.columns[tree.feature[0]]
+    scaled = np.float32(tree.threshold[0])
+    df[column] = float(scaled) * prep.scale_[tree.feature[0]] + prep.mean_[tree.feature[0]]
+    assert np.allclose(compiled.predict_proba(df), model.predict_proba(df), rtol=0, atol=1e-12)
+
+
+def test_deep_binary_trees():
+    """Binary models (sigmoid link) and trees with more than 8 leaves"""
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame(rng.normal(size=(2000, 4)), columns=['a', 'b', 'c', 'd'])
+    y = (df['a'] * df['b'] + np.sin(3 * df['c']) > 0).astype(int)
+    model = Pipeline([
+        ('prep', ColumnTransformer([('num', StandardScaler(), ['a', 'b', 'c', 'd'])])),
+        ('model', GradientBoostingClassifier(n_estimators=30, max_depth=5, random_state=0))
+    ]).fit(df, y)
+    compiled = compile_model(model)
+    assert compiled is not None
+    assert np.allclose(compiled.predict_proba(df), model.predict_proba(df), rtol=0, atol=1e-12)
+    assert np.array_equal(compiled.predict(df), model.predict(df))
+
+
+def test_mlp_float32_parity():
+    """The float32 forward pass stays within tolerance of sklearn, for single rows and chunked batches"""
+    model = load_model('mlp_classifier.joblib', model_dir=MODEL_DIR, compiled=False)
+    compiled = compile_model(model)
+    assert isinstance(compiled.kernel, MLPKernel) and compiled.kernel.coefs[0].dtype == np.float32
+
+    df = _sample_frame(2500, seed=3)  # more rows than one buffer chunk
+    expected = model.predict_proba(df)
+    assert np.abs(compiled.predict_proba(df) - expected).max() < MLPKernel.tolerance
+    assert np.abs(compiled.predict_proba(df.iloc[7:8]) - expected[7:8]).max() < MLPKernel.tolerance
+    # Labels agree wherever sklearn's top two classes are not within float32 noise
+    top2 = np.sort(expected, axis=1)[:, -2:]
+    clear = top2[:, 1] - top2[:, 0] > 1e-4
+    assert np.array_equal(compiled.predict(df)[clear], model.predict(df)[clear])
+
+
+def test_mlp_buffers_are_per_thread():
+    """Concurrent calls with different batch sizes do not share activation buffers"""
+    compiled = load_model('mlp_classifier.joblib', model_dir=MODEL_DIR)
+    frames = [_sample_frame(n, seed=n) for n in (1, 5, 300, 1500)] * 4
+    expected = [compiled.predict_proba(df) for df in frames]
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(compiled.predict_proba, frames))
+    assert all(np.array_equal(r, e) for r, e in zip(results, expected))
+
+
+def test_bundle_loads_without_sklearn():
+    """An exported .npz bundle predicts like the compiled model in a process that never imports sklearn"""
+    compiled = load_model('mlp_classifier.joblib', model_dir=MODEL_DIR)
+    df = _sample_frame(20, seed=4)
+    with tempfile.TemporaryDirectory() as tmp:
+        save_bundle(compiled, os.path.join(tmp, 'mlp.npz'))
+        np.save(os.path.join(tmp, 'input.npy'), df[compiled.columns].to_numpy())
+        script = (
+            "import sys, numpy as np; from predict import load_model; "
+            f"m = load_model('mlp.npz', model_dir={tmp!r}); "
+            f"np.save({os.path.join(tmp, 'output.npy')!r}, m.predict_proba(np.load({os.path.join(tmp, 'input.npy')!r}))); "
+            "assert 'sklearn' not in sys.modules"
+        )
+        subprocess.run([sys.executable, '-c', script], check=True,
+                       cwd=os.path.dirname(os.path.abspath(__file__)))
+        assert np.array_equal(np.load(os.path.join(tmp, 'output.npy')), compiled.predict_proba(df))
+
+
+def test_fold_standard_scaler():
+    """Folded weights give the same affine map as scaling first"""
+    rng = np.random.default_rng(5)
+    X, weights, bias = rng.normal(size=(50, 4)), rng.normal(size=(4, 3)), rng.normal(size=3)
+    mean, scale = rng.normal(size=4) * 100, rng.uniform(0.1, 10, size=4)
+    folded_weights, folded_bias = fold_standard_scaler(weights, bias, mean, scale)
+    assert np.allclose(X @ folded_weights + folded_bias, ((X - mean) / scale) @ weights + bias, rtol=1e-12)
+
+
+def test_logistic_regression_folding_parity():
+    """The folded model matches the unfolded pipeline and survives a bundle round trip"""
+    model = load_model('logistic_regression.joblib', model_dir=MODEL_DIR, compiled=False)
+    compiled = compile_model(model)
+    assert isinstance(compiled.kernel, LinearKernel) and compiled.kernel.link == 'softmax'
+    df = _sample_frame(3000, seed=6)
+    assert np.allclose(compiled.predict_proba(df), model.predict_proba(df), rtol=0, atol=1e-12)
+    assert np.array_equal(compiled.predict(df), model.predict(df))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        save_bundle(compiled, os.path.join(tmp, 'lr.npz'))
+        assert np.array_equal(load_bundle(os.path.join(tmp, 'lr.npz')).predict_proba(df), compiled.predict_proba(df))
+
+
+def test_logistic_regression_links():
+    """Binary (sigmoid) and one-vs-rest models fold correctly too"""
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame(rng.normal(size=(600, 3)) * [1, 10, 100] + [0, 50, 2020], columns=['a', 'b', 'c'])
+    for y, options in [((df['a'] > 0).astype(int), {}),
+                       (np.digitize(df['a'], [-0.5, 0.5]), {'solver': 'liblinear'})]:
+        model = Pipeline([
+            ('prep', ColumnTransformer([('num', StandardScaler(), ['a', 'b', 'c'])])),
+            ('model', LogisticRegression(**options))
+        ]).fit(df, y)
+        compiled = compile_model(model)
+        assert np.allclose(compiled.predict_proba(df), model.predict_proba(df), rtol=0, atol=1e-12)
+
+
+def test_load_model_switch():
+    """load_model compiles supported models unless COMPILED_MODELS=0"""
+    assert isinstance(load_model('gradient_boosting.joblib', model_dir=MODEL_DIR), CompiledPipeline)
+    assert not isinstance(load_model('gradient_boosting.joblib', model_dir=MODEL_DIR, compiled=False),
+                          CompiledPipeline)
+    os.environ['COMPILED_MODELS'] = '0'
+    try:
+        assert not isinstance(load_model('gradient_boosting.joblib', model_dir=MODEL_DIR), CompiledPipeline)
+    finally:
+        del os.environ['COMPILED_MODELS']
+
+
+if __name__ == "__main__":
+    print("Testing compiled models")
+    print("="*60)
+    for test in [test_gradient_boosting_parity, test_threshold_ties, test_deep_binary_trees,
+                 test_mlp_float32_parity, test_mlp_buffers_are_per_thread, test_bundle_loads_without_sklearn,
+                 test_fold_standard_scaler, test_logistic_regression_folding_parity,
+                 test_logistic_regression_links, test_load_model_switch]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,143 @@
+"""
+Test the dashboard's update callback: a full Patch on first load and after a
+history reset, extendData (trimmed to the window) for new buckets, and
+nothing sent when no new reading arrived; and the episode flush at exit
+No browser or running worker needed (the worker's snapshot is stubbed)
+"""
+import pandas as pd
+import pytest
+from dash import Patch, no_update
+
+import dashboard
+from downsampling import MinMaxBucketer
+from stress_episodes import EPISODE_END, EpisodeDetector
+
+START = pd.Timestamp('2020-05-08 22:00:00')
+N_GRAPHS = len(dashboard.GRAPH_SERIES)
+
+
+class _Feed:
+    """Stands in for the inference worker: readings go to the history and the snapshot"""
+
+    def __init__(self, monkeypatch):
+        self.df = pd.DataFrame()
+        # Four 10-second buckets over a 40-second window
+        monkeypatch.setattr(dashboard, 'HISTORY', MinMaxBucketer(dashboard.SENSOR_COLUMNS, window_seconds=40,
+                                                                 max_points=8))
+        monkeypatch.setattr(dashboard, 'ensure_worker_started', lambda: None)
+        monkeypatch.setattr(dashboard.WORKER, 'snapshot', lambda: {'data': self.df, 'predictions': {}})
+
+    def add(self, *seconds):
+        rows = [{'timestamp': START + pd.Timedelta(seconds=s), 'X': 1.0, 'Y': 2.0, 'Z': 3.0, 'EDA': 0.2,
+                 'HR': 70.0 + s, 'TEMP': 30.0} for s in seconds]
+        self.df = pd.concat([self.df, pd.DataFrame(rows)], ignore_index=True)
+        dashboard.ingest_history(self.df)
+
+    def clear(self):
+        self.df = pd.DataFrame()
+
+
+def _tick(state):
+    """Run the callback; returns (figures, extends, new_state)"""
+    outputs = dashboard.update_dashboard(0, state)
+    return outputs[2:2 + N_GRAPHS], outputs[2 + N_GRAPHS:2 + 2 * N_GRAPHS], outputs[-1]
+
+
+def test_first_load_resets(monkeypatch):
+    """The first tick replaces the figures with the whole window"""
+    feed = _Feed(monkeypatch)
+    feed.add(0, 5, 10)
+    figures, extends, state = _tick(None)
+    assert all(isinstance(figure, Patch) for figure in figures) and extends == [no_update] * N_GRAPHS
+    assert state['seq'] == 1 and state['has_points']
+
+
+def test_new_buckets_extend(monkeypatch):
+    """Later ticks append only new buckets, trimmed to the window's points per series"""
+    feed = _Feed(monkeypatch)
+    feed.add(0, 5, 10)
+    _, _, state = _tick(None)
+    feed.add(15, 20)
+    figures, extends, new_state = _tick(state)
+    assert figures == [no_update] * N_GRAPHS and new_state['seq'] == 2
+    hr = extends[list(dashboard.GRAPH_SERIES).index('hr-graph')]
+    update, indices, max_points = hr
+    assert update['y'] == [[80.0, 85.0]] and indices == [0]
+    assert max_points == {'x': [4], 'y': [4]}
+    accel = extends[list(dashboard.GRAPH_SERIES).index('accelerometer-graph')]
+    assert accel[1] == [0, 1, 2] and accel[2] == {'x': [2, 2, 2], 'y': [2, 2, 2]}
+
+    # A new reading in the open bucket changes the status but sends no points
+    feed.add(25)
+    figures, extends, state = _tick(new_state)
+    assert figures == [no_update] * N_GRAPHS and extends == [no_update] * N_GRAPHS
+    # No new reading: nothing at all is sent
+    assert dashboard.update_dashboard(0, state) == [no_update] * (3 + 2 * N_GRAPHS)
+
+
+def test_expired_buckets_trimmed(monkeypatch):
+    """After a gap, maxPoints drops the buckets that left the window, not a fixed count"""
+    feed = _Feed(monkeypatch)
+    feed.add(0, 5, 10, 15, 20)
+    _, _, state = _tick(None)
+    feed.add(30)
+    _, extends, state = _tick(state)
+    update, _, max_points = extends[list(dashboard.GRAPH_SERIES).index('hr-graph')]
+    assert update['y'] == [[90.0]] and max_points == {'x': [5], 'y': [5]}
+    # Across the gap the buckets up to 20 leave the window: the browser appends 30 and keeps only that
+    feed.add(60)
+    _, extends, state = _tick(state)
+    update, _, max_points = extends[list(dashboard.GRAPH_SERIES).index('hr-graph')]
+    assert update['y'] == [[100.0]] and max_points == {'x': [1], 'y': [1]}
+
+
+def test_history_reset(monkeypatch):
+    """A rewound data file starts a new history epoch, which resends the figures"""
+    feed = _Feed(monkeypatch)
+    feed.add(100, 110, 120)
+    _, _, state = _tick(None)
+    feed.clear()
+    feed.add(0, 10)
+    figures, extends, new_state = _tick(state)
+    assert all(isinstance(figure, Patch) for figure in figures) and extends == [no_update] * N_GRAPHS
+    assert new_state['epoch'] == state['epoch'] + 1 and new_state['seq'] == 1
+
+
+def test_no_data(monkeypatch):
+    """Without readings the graphs are cleared once and show the no-data annotation"""
+    feed = _Feed(monkeypatch)
+    figures, extends, state = _tick(None)
+    assert all(isinstance(figure, Patch) for figure in figures) and extends == [no_update] * N_GRAPHS
+    assert state['last_timestamp'] is None and not state['has_points']
+    assert dashboard.update_dashboard(0, state) == [no_update] * (3 + 2 * N_GRAPHS)
+    feed.add(0, 10)
+    figures, _, state = _tick(state)
+    assert all(isinstance(figure, Patch) for figure in figures) and state['has_points']
+
+
+def test_flush_episodes_at_exit(monkeypatch):
+    """Episodes still open at shutdown are queued as end events after the worker stops"""
+    calls = []
+    monkeypatch.setattr(dashboard, 'EPISODES', EpisodeDetector(min_duration=0, exit_after=30))
+    monkeypatch.setattr(dashboard.WORKER, 'stop', lambda: calls.append('stop'))
+    monkeypatch.setattr(dashboard, 'enqueue_stress_event', lambda **event: calls.append(event))
+    for seconds in range(5):
+        dashboard.EPISODES.update(START + pd.Timedelta(seconds=seconds), 2, 0.9, model_name='gradient_boosting')
+    dashboard.flush_episodes()
+    assert calls[0] == 'stop' and len(calls) == 2
+    assert calls[1]['model_name'] == 'gradient_boosting' and calls[1]['stress_level'] == 2
+    assert calls[1]['extra']['event_type'] == EPISODE_END
+    dashboard.flush_episodes()
+    assert calls[2:] == ['stop']  # nothing left open
+
+
+if __name__ == "__main__":
+    print("Testing dashboard updates")
+    print("="*60)
+    for test in [test_first_load_resets, test_new_buckets_extend, test_expired_buckets_trimmed,
+                 test_history_reset, test_no_data, test_flush_episodes_at_exit]:
+        with pytest.MonkeyPatch.context() as monkeypatch:
+            test(monkeypatch)
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,114 @@
+"""
+Test the min/max bucketer: per-bucket min/max selection, window expiry,
+epoch resets and the incremental updates sent to dashboard clients
+"""
+import pandas as pd
+
+from downsampling import MinMaxBucketer
+
+START = pd.Timestamp('2020-05-08 22:00:00')
+
+
+def _bucketer(max_points=8):
+    """Four 10-second buckets over a 40-second window"""
+    return MinMaxBucketer(['HR', 'EDA'], window_seconds=40, max_points=max_points)
+
+
+def _add(bucketer, seconds, hr, eda=0.5):
+    bucketer.add(START + pd.Timedelta(seconds=seconds), {'HR': hr, 'EDA': eda})
+
+
+def _times(xs):
+    return [(pd.Timestamp(x) - START).total_seconds() for x in xs]
+
+
+def test_bucket_min_max():
+    """A closed bucket keeps its min and max in time order; a flat series keeps one point"""
+    bucketer = _bucketer()
+    for seconds, hr in [(0, 70), (2, 90), (4, 60), (6, 80)]:
+        _add(bucketer, seconds, hr)
+    assert bucketer.window_series() == ({'HR': ([], []), 'EDA': ([], [])}, 0)  # the open bucket is not sent
+    _add(bucketer, 10, 75)
+    series, seq = bucketer.window_series()
+    assert seq == 1
+    xs, ys = series['HR']
+    assert _times(xs) == [2, 4] and ys == [90.0, 60.0]  # max came first
+    assert _times(series['EDA'][0]) == [0] and series['EDA'][1] == [0.5]
+    # Late readings are ignored
+    _add(bucketer, 5, 200)
+    _add(bucketer, 20, 75)
+    assert bucketer.window_series()[0]['HR'][1] == [90.0, 60.0, 75.0]
+
+
+def test_window_expiry():
+    """Buckets older than the window (which includes the open bucket) are dropped, also across a gap"""
+    bucketer = _bucketer()
+    for seconds in range(0, 50, 10):
+        _add(bucketer, seconds, 70 + seconds)
+    series, seq = bucketer.window_series()
+    assert seq == 4 and _times(series['HR'][0]) == [10, 20, 30]
+    _add(bucketer, 50, 100)
+    assert _times(bucketer.window_series()[0]['HR'][0]) == [20, 30, 40]
+    # After a gap longer than the window only the bucket that just closed is kept
+    _add(bucketer, 200, 100)
+    series, seq = bucketer.window_series()
+    assert seq == 6 and _times(series['HR'][0]) == []
+    _add(bucketer, 210, 100)
+    assert _times(bucketer.window_series()[0]['HR'][0]) == [200]
+
+
+def test_updates_since():
+    """Clients get only newer buckets, or the whole window when they fell behind or the epoch changed"""
+    bucketer = _bucketer()
+    series, epoch, seq, full, window_points = bucketer.updates_since(None, None)
+    assert full and seq == 0 and window_points == {'HR': 0, 'EDA': 0}
+    for seconds in [0, 5, 10, 15, 20]:
+        _add(bucketer, seconds, 70 + seconds)
+    series, epoch, seq, full, window_points = bucketer.updates_since(epoch, 0)
+    assert not full and seq == 2 and series['HR'][1] == [70.0, 75.0, 80.0, 85.0]
+    assert window_points == {'HR': 4, 'EDA': 2}
+    series, epoch, seq, full, _ = bucketer.updates_since(epoch, seq)
+    assert not full and series['HR'] == ([], [])
+
+    # A client whose next bucket has expired reloads the window
+    for seconds in range(30, 90, 10):
+        _add(bucketer, seconds, 70)
+    series, epoch, new_seq, full, _ = bucketer.updates_since(epoch, seq)
+    assert full and new_seq == 8 and _times(series['HR'][0]) == [50, 60, 70]
+
+    # reset() starts a new epoch, so clients of the old one get the (empty) window
+    bucketer.reset()
+    series, new_epoch, seq, full, window_points = bucketer.updates_since(epoch, new_seq)
+    assert full and new_epoch == epoch + 1 and seq == 0 and series['HR'] == ([], [])
+    assert window_points == {'HR': 0, 'EDA': 0}
+
+
+def test_window_points_trim_by_time():
+    """Keeping window_points newest points after each append leaves exactly the window"""
+    bucketer = _bucketer()
+    client = {'HR': [], 'EDA': []}
+    series, epoch, seq, _, _ = bucketer.updates_since(None, None)
+    # Two-point buckets, then sparse one-point buckets and a short gap
+    readings = [(0, 70), (5, 90), (10, 60), (15, 80), (20, 70), (30, 70), (45, 75), (61, 75), (70, 80), (75, 75)]
+    for seconds, hr in readings:
+        _add(bucketer, seconds, hr)
+        series, epoch, new_seq, full, window_points = bucketer.updates_since(epoch, seq)
+        assert not full
+        if new_seq == seq:
+            continue
+        seq = new_seq
+        for column in client:
+            # What Plotly's extendTraces does with maxPoints
+            client[column] = (client[column] + series[column][0])[-window_points[column]:]
+        assert client == {column: bucketer.window_series()[0][column][0] for column in client}
+    assert _times(client['HR']) == [45, 61]
+
+
+if __name__ == "__main__":
+    print("Testing min/max downsampling")
+    print("="*60)
+    for test in [test_bucket_min_max, test_window_expiry, test_updates_since, test_window_points_trim_by_time]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,122 @@
+"""
+Test the model ensemble: combining rules and the /predict/ensemble endpoint
+No deployment needed (uses Flask's test client with the committed models)
+"""
+import os
+
+import numpy as np
+
+os.environ.setdefault('MODEL_NAME', 'logistic_regression.joblib')
+os.environ.setdefault('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+import app as api  # noqa: E402
+from ensemble import ModelEnsemble, parse_weights  # noqa: E402
+from predict import predict_readings  # noqa: E402
+
+READING = {"X": -21.0, "Y": -53.0, "Z": 27.0, "EDA": 0.213944, "HR": 75.07, "TEMP": 30.37,
+           "datetime": "2020-05-08 22:11:34"}
+
+
+class _FixedModel:
+    """Returns the same probabilities for every row"""
+
+    def __init__(self, probabilities, classes=(0.0, 1.0, 2.0)):
+        self.classes_ = np.array(classes)
+        self._probabilities = np.asarray(probabilities, dtype=np.float64)
+
+    def predict_proba(self, df):
+        return np.tile(self._probabilities, (len(df), 1))
+
+
+def test_combining_rules():
+    """Mean, weighted mean and (weighted) vote over three models"""
+    ensemble = ModelEnsemble({
+        'a': _FixedModel([0.6, 0.4, 0.0]),
+        'b': _FixedModel([0.4, 0.6, 0.0]),
+        'c': _FixedModel([0.0, 0.3, 0.7])
+    }, weights=parse_weights('c=4'))
+    rows = [0, 1]
+
+    mean = ensemble.predict(rows, combine='mean')
+    assert np.allclose(mean['probabilities'][0], [1 / 3, 1.3 / 3, 0.7 / 3])
+    assert list(mean['labels']) == [1.0, 1.0]
+
+    weighted = ensemble.predict(rows, combine='weighted')
+    assert np.allclose(weighted['probabilities'][0], [1 / 6, 2.2 / 6, 2.8 / 6])
+    assert weighted['labels'][0] == 2.0
+
+    vote = ensemble.predict(rows, combine='vote', weights={'c': 1})
+    assert np.allclose(vote['probabilities'][0], [1 / 3, 1 / 3, 1 / 3])
+    assert ensemble.predict(rows, combine='vote', names=['a', 'b', 'b'])['labels'][0] == 1.0
+    assert set(mean['models']) == {'a', 'b', 'c'} and mean['models']['a']['seconds'] >= 0
+    ensemble.close()
+    try:
+        ModelEnsemble({'a': _FixedModel([0.6, 0.4, 0.0])}, weights=parse_weights('a=-1'))
+        assert False, "negative weights are rejected"
+    except ValueError:
+        pass
+
+
+def test_missing_classes_are_aligned():
+    """A model trained on fewer classes contributes zero probability to the others"""
+    ensemble = ModelEnsemble({
+        'full': _FixedModel([0.2, 0.2, 0.6]),
+        'binary': _FixedModel([0.9, 0.1], classes=(0.0, 2.0))
+    })
+    result = ensemble.predict([0], combine='mean')
+    assert np.allclose(result['probabilities'][0], [0.55, 0.1, 0.35])
+    ensemble.close()
+
+
+def test_ensemble_endpoint_matches_individual_models():
+    """Per-model results equal each model's own predictions; batches return one entry per reading"""
+    client = api.app.test_client()
+    payload = single = client.post('/predict/ensemble', json=READING).get_json()
+    assert set(payload['models']) == set(api.ensemble.models)
+    for name, model in api.ensemble.models.items():
+        labels, probas = predict_readings(model, [READING])
+        assert payload['models'][name]['predicted_label'] == float(labels[0])
+        assert np.isclose(payload['models'][name]['confidence'], probas[0].max())
+    assert set(payload['timing_ms']) >= {'validate', 'featurize', 'total'} | set(api.ensemble.models)
+
+    batch = client.post('/predict/ensemble', json={'data': [READING] * 4, 'combine': 'vote',
+                                                    'models': ['logistic_regression']}).get_json()
+    assert batch['count'] == 4 and list(batch['predictions'][0]['models']) == ['logistic_regression']
+
+    assert client.post('/predict/ensemble', json={**READING, 'combine': 'median'}).status_code == 400
+    assert client.post('/predict/ensemble', json={**READING, 'models': ['nope']}).status_code == 400
+    for options, message in [({'models': 'logistic_regression'}, "models must be a list of model names"),
+                             ({'models': [1, 2]}, "models must be a list of model names"),
+                             ({'combine': 'weighted', 'weights': {'gradient_boosting': -1, 'mlp_classifier': 5}},
+                              "Model weights must be non-negative numbers: ['gradient_boosting']"),
+                             ({'weights': {'mlp_classifier': '2'}},
+                              "Model weights must be non-negative numbers: ['mlp_classifier']"),
+                             ({'weights': [1, 2]}, "weights must map model names to numbers")]:
+        response = client.post('/predict/ensemble', json={**READING, **options})
+        assert response.status_code == 400 and response.get_json() == {'error': message}
+        batch = client.post('/predict/ensemble', json={'data': [READING], **options})
+        assert batch.status_code == 400 and batch.get_json() == {'error': message}
+    zero = client.post('/predict/ensemble', json={**READING, 'combine': 'weighted', 'weights': {'mlp_classifier': 0}})
+    assert zero.status_code == 200
+    assert client.post('/predict/ensemble', json={'X': 1.0}).status_code == 400
+    assert client.post('/predict/ensemble', json={**READING, 'HR': 'fast'}).status_code == 400
+
+    # Invalid readings in a batch get an error in their place; datetimes may mix formats
+    readings = [{**READING, 'datetime': '2020-05-08 22:11:34.250000'}, {**READING, 'EDA': float('inf')},
+                {k: v for k, v in READING.items() if k != 'datetime'}, {**READING, 'datetime': 12345}]
+    response = client.post('/predict/ensemble', json={'data': readings})
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['count'] == 4 and payload['invalid'] == 2 and 'validate' in payload['timing_ms']
+    assert [p.get('code') for p in payload['predictions']] == [None, 'not_finite', None, 'bad_datetime']
+    assert payload['predictions'][0]['predicted_label'] == single['predicted_label']
+
+
+if __name__ == "__main__":
+    print("Testing model ensemble")
+    print("="*60)
+    for test in [test_combining_rules, test_missing_classes_are_aligned,
+                 test_ensemble_endpoint_matches_individual_models]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,199 @@
+"""
+Test the durable stress event buffer: outage, restart and crash recovery
+Runs fully offline
+"""
+import os
+import tempfile
+import time
+from datetime import datetime, timezone
+
+import firebase_config
+from event_buffer import EventBuffer
+
+
+class FlakyBackend:
+    """Commit function that fails while `down` is set and records documents by ID"""
+
+    def __init__(self, down=False):
+        self.down = down
+        self.documents = {}
+        self.commits = 0
+
+    def __call__(self, batch):
+        if self.down:
+            raise ConnectionError("backend unavailable")
+        self.commits += 1
+        for event_id, event_data in batch:
+            self.documents[event_id] = event_data
+
+
+def _wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_outage_is_buffered_then_replayed():
+    """Events appended while the backend is down are replayed in batches once it returns"""
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = FlakyBackend(down=True)
+        buffer = EventBuffer(tmp, backend, batch_size=20, backoff_base=0.01, backoff_max=0.05)
+        stamp = datetime(2024, 1, 15, 10, 0, tzinfo=timezone.utc)
+        for i in range(50):
+            assert buffer.append({'stress_level': 2.0, 'timestamp': stamp}, f"event-{i}")
+
+        _wait_for(lambda: buffer.metrics()['retries'] >= 2)
+        metrics = buffer.metrics()
+        assert metrics['depth'] == 50 and metrics['replayed'] == 0
+        assert metrics['replay_lag'] > 0
+
+        backend.down = False
+        assert buffer.flush(timeout=5)
+        assert len(backend.documents) == 50
+        assert backend.commits == 3
+        assert backend.documents['event-7']['timestamp'] == stamp
+        assert buffer.metrics()['replay_lag'] == 0.0
+        buffer.close()
+
+
+def test_restart_replays_leftovers_once():
+    """Events not replayed before close are replayed by the next buffer, without repeats"""
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = FlakyBackend()
+        buffer = EventBuffer(tmp, backend, batch_size=10)
+        for i in range(15):
+            buffer.append({'n': i}, f"first-{i}")
+        assert buffer.flush(timeout=5)
+        backend.down = True
+        for i in range(15):
+            buffer.append({'n': i}, f"second-{i}")
+        assert not buffer.close(timeout=0.1)
+
+        backend.down = False
+        replayed = []
+        reopened = EventBuffer(tmp, lambda batch: replayed.extend(event_id for event_id, _ in batch))
+        assert reopened.flush(timeout=5)
+        assert replayed == [f"second-{i}" for i in range(15)]
+        reopened.close()
+
+
+def test_partial_record_is_discarded():
+    """A torn last line from a crash mid-append is dropped on open"""
+    with tempfile.TemporaryDirectory() as tmp:
+        buffer = EventBuffer(tmp, FlakyBackend(down=True), backoff_base=60)
+        for i in range(3):
+            buffer.append({'n': i}, f"event-{i}")
+        buffer.close(timeout=0)
+        segment = sorted(name for name in os.listdir(tmp) if name.endswith('.log'))[-1]
+        with open(os.path.join(tmp, segment), 'ab') as f:
+            f.write(b'{"id":"event-3","t":1')
+
+        backend = FlakyBackend()
+        reopened = EventBuffer(tmp, backend)
+        assert reopened.flush(timeout=5)
+        assert sorted(backend.documents) == ['event-0', 'event-1', 'event-2']
+        reopened.close()
+
+
+def test_segments_rotate_and_are_removed():
+    """Replayed segments are deleted"""
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = FlakyBackend(down=True)
+        buffer = EventBuffer(tmp, backend, batch_size=7, segment_max_bytes=200, backoff_base=0.01)
+        for i in range(40):
+            buffer.append({'n': i}, f"event-{i}")
+        assert buffer.metrics()['segments'] > 3
+        backend.down = False
+        assert buffer.flush(timeout=5)
+        buffer.close()
+        assert len(backend.documents) == 40
+        assert len([name for name in os.listdir(tmp) if name.endswith('.log')]) == 1
+
+
+class _EOFHook:
+    """Wraps a segment file and runs `hook` once when a read first hits EOF past the start"""
+
+    def __init__(self, f, state):
+        self._f = f
+        self._state = state
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self._f.close()
+
+    def __iter__(self):
+        return iter(self._f)
+
+    def seek(self, offset):
+        return self._f.seek(offset)
+
+    def readline(self):
+        line = self._f.readline()
+        if not line and self._f.tell() > 0 and self._state['hook'] is not None:
+            hook, self._state['hook'] = self._state['hook'], None
+            hook()
+        return line
+
+
+def test_append_and_rotation_after_reader_eof():
+    """A line appended to a segment after the replayer read it to EOF is replayed even if the writer rotates"""
+    import event_buffer
+
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = FlakyBackend()
+        state = {'hook': None}
+        segment_one = os.path.join(tmp, event_buffer._segment_name(1))
+
+        def hooked_open(path, mode='r', *args, **kwargs):
+            f = open(path, mode, *args, **kwargs)
+            return _EOFHook(f, state) if path == segment_one and mode == 'rb' else f
+
+        event_buffer.open = hooked_open
+        try:
+            buffer = EventBuffer(tmp, backend, batch_size=10, poll_interval=0.01)
+
+            def append_then_rotate():
+                # Between the replayer's EOF on segment 1 and its check for rotation
+                buffer.segment_max_bytes = buffer._writer.tell() + 1
+                buffer.append({'n': 1}, 'event-1')
+                buffer.append({'n': 2}, 'event-2')
+
+            state['hook'] = append_then_rotate
+            buffer.append({'n': 0}, 'event-0')
+            assert buffer.flush(timeout=5)
+            assert state['hook'] is None and buffer.metrics()['segments'] == 1
+            buffer.close()
+        finally:
+            del event_buffer.open
+        assert sorted(backend.documents) == ['event-0', 'event-1', 'event-2']
+        assert buffer.metrics()['replayed'] == 3 and buffer.depth == 0
+
+
+def test_save_stress_event_goes_through_buffer():
+    """With a buffer running, save_stress_event() returns immediately and the store catches up"""
+    with tempfile.TemporaryDirectory() as tmp:
+        firebase_config.configure_event_store('sqlite', os.path.join(tmp, 'events.db'))
+        try:
+            firebase_config.start_event_buffer(os.path.join(tmp, 'buffer'), fsync=False)
+            assert firebase_config.save_stress_event(2, 0.9, {'HR': 95.0}, model_name='mlp_classifier')
+            assert firebase_config.enqueue_stress_event(1, 0.7, model_name='gradient_boosting')
+            assert firebase_config.stop_event_buffer(timeout=5)
+            events = firebase_config.get_stress_events(limit=10)
+            assert sorted(event['model_name'] for event in events) == ['gradient_boosting', 'mlp_classifier']
+        finally:
+            firebase_config.configure_event_store('firestore')
+
+
+if __name__ == "__main__":
+    print("Testing durable stress event buffer")
+    print("="*60)
+    for test in [test_outage_is_buffered_then_replayed, test_restart_replays_leftovers_once,
+                 test_partial_record_is_discarded, test_segments_rotate_and_are_removed,
+                 test_append_and_rotation_after_reader_eof, test_save_stress_event_goes_through_buffer]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,127 @@
+"""
+Test the SQLite stress event store and its use through firebase_config
+Runs fully offline
+"""
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta, timezone
+
+import firebase_config
+from event_store import SQLiteEventStore
+
+START = datetime(2024, 1, 15, 10, 0, tzinfo=timezone.utc)
+
+
+def _events(n=25):
+    models = ['logistic_regression', 'gradient_boosting', 'mlp_classifier']
+    return [
+        (f"event-{i:03d}", {
+            'timestamp': START + timedelta(seconds=i),
+            'stress_level': float(1 + i % 2),
+            'confidence': 0.5 + i / 100,
+            'model_name': models[i % 3],
+            'sensor_data': {'HR': 80.0 + i}
+        })
+        for i in range(n)
+    ]
+
+
+def test_pages_cover_all_events_newest_first():
+    """Cursor pagination returns every event exactly once, newest first"""
+    store = SQLiteEventStore(':memory:')
+    store.save_events(_events(25))
+
+    seen, cursor = [], None
+    while True:
+        page, cursor = store.query_events(page_size=10, cursor=cursor)
+        seen.extend(event['id'] for event in page)
+        if cursor is None:
+            break
+    assert seen == [f"event-{i:03d}" for i in reversed(range(25))]
+
+
+def test_filters_and_projection():
+    """Time range, level and model filters combine; fields limits the payload"""
+    store = SQLiteEventStore(':memory:')
+    store.save_events(_events(30))
+
+    events, _ = store.query_events(
+        page_size=100,
+        start_time=START + timedelta(seconds=10),
+        end_time=(START + timedelta(seconds=20)).isoformat(),
+        stress_levels=[2],
+        model_name='gradient_boosting',
+        fields=['stress_level']
+    )
+    assert [event['id'] for event in events] == ['event-019', 'event-013']
+    assert set(events[0]) == {'id', 'timestamp', 'stress_level'}
+
+
+def test_replace_is_idempotent():
+    """Saving an existing ID replaces the event instead of duplicating it"""
+    store = SQLiteEventStore(':memory:')
+    store.save_events(_events(5))
+    store.save_events(_events(5))
+    events, _ = store.query_events(page_size=100)
+    assert len(events) == 5
+
+
+def test_aggregate():
+    """Counts and mean confidence per stress level"""
+    store = SQLiteEventStore(':memory:')
+    store.save_events(_events(10))
+    summary = store.aggregate('stress_level')
+    assert summary[1.0]['count'] == 5 and summary[2.0]['count'] == 5
+    assert abs(summary[1.0]['mean_confidence'] - 0.54) < 1e-9
+
+
+def test_firebase_config_uses_sqlite_backend():
+    """save_stress_event/get_stress_events go to the store when EVENT_STORE=sqlite"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'events.db')
+        firebase_config.configure_event_store('sqlite', path)
+        try:
+            assert firebase_config.save_stress_event(2, 0.9, {'HR': 95.0}, model_name='mlp_classifier')
+            firebase_config.start_event_writer(flush_size=10, flush_interval=0.01)
+            assert firebase_config.enqueue_stress_event(1, 0.7, model_name='gradient_boosting')
+            assert firebase_config.stop_event_writer(timeout=5)
+
+            events = firebase_config.get_stress_events(limit=10)
+            assert sorted(event['model_name'] for event in events) == ['gradient_boosting', 'mlp_classifier']
+            assert all(isinstance(event['timestamp'], datetime) for event in events)
+        finally:
+            firebase_config.configure_event_store('firestore')
+
+
+def test_sqlite_backend_without_firebase_admin():
+    """Events saved, queued or buffered for the SQLite store never import firebase_admin"""
+    saved = {name: module for name, module in sys.modules.items() if name.split('.')[0] == 'firebase_admin'}
+    sys.modules['firebase_admin'] = None  # any import of it now fails
+    with tempfile.TemporaryDirectory() as tmp:
+        firebase_config.configure_event_store('sqlite', os.path.join(tmp, 'events.db'))
+        try:
+            assert firebase_config.save_stress_event(2, 0.9, model_name='mlp_classifier')
+            firebase_config.start_event_writer(flush_size=10, flush_interval=0.01)
+            assert firebase_config.enqueue_stress_event(1, 0.7, model_name='gradient_boosting')
+            assert firebase_config.stop_event_writer(timeout=5)
+            firebase_config.start_event_buffer(os.path.join(tmp, 'buffer'), fsync=False)
+            assert firebase_config.save_stress_event(0, 0.8, model_name='logistic_regression')
+            assert firebase_config.stop_event_buffer(timeout=5)
+            assert len(firebase_config.get_stress_events(limit=10)) == 3
+        finally:
+            firebase_config.configure_event_store('firestore')
+            del sys.modules['firebase_admin']
+            sys.modules.update(saved)
+
+
+if __name__ == "__main__":
+    print("Testing SQLite event store")
+    print("="*60)
+    for test in [test_pages_cover_all_events_newest_first, test_filters_and_projection,
+                 test_replace_is_idempotent, test_aggregate, test_firebase_config_uses_sqlite_backend,
+                 test_sqlite_backend_without_firebase_admin]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,149 @@
+"""
+Test the batched stress event writer against a fake Firestore client
+No Firebase project or network access needed
+"""
+import time
+import firebase_config
+from firebase_config import BatchedEventWriter, commit_firestore_batch, build_stress_event
+
+
+class FakeDocument:
+    def __init__(self, collection, doc_id):
+        self.collection = collection
+        self.id = doc_id
+
+
+class FakeCollection:
+    def __init__(self, name):
+        self.name = name
+
+    def document(self, doc_id):
+        return FakeDocument(self, doc_id)
+
+
+class FakeBatch:
+    def __init__(self, client):
+        self.client = client
+        self.writes = []
+
+    def set(self, doc_ref, data):
+        self.writes.append((doc_ref.id, data))
+
+    def commit(self):
+        if self.client.failures_left > 0:
+            self.client.failures_left -= 1
+            raise ConnectionError("Firestore unavailable")
+        self.client.commits.append(self.writes)
+        for doc_id, data in self.writes:
+            self.client.documents[doc_id] = data
+
+
+class FakeFirestoreClient:
+    """Records batch commits; fails the first `failures` commits"""
+
+    def __init__(self, failures=0):
+        self.failures_left = failures
+        self.commits = []
+        self.documents = {}
+
+    def collection(self, name):
+        return FakeCollection(name)
+
+    def batch(self):
+        return FakeBatch(self)
+
+
+def _event(level=1):
+    return build_stress_event(level, 0.9, {'HR': 80.0}, model_name='mlp_classifier')
+
+
+def test_groups_events_into_batches():
+    """Events are committed in batches of at most flush_size"""
+    client = FakeFirestoreClient()
+    writer = BatchedEventWriter(lambda batch: commit_firestore_batch(batch, client=client),
+                                flush_size=10, flush_interval=0.05)
+    for _ in range(25):
+        assert writer.submit(_event())
+    assert writer.close(timeout=5)
+
+    assert len(client.documents) == 25
+    assert all(len(commit) <= 10 for commit in client.commits)
+    assert len(client.commits) < 25
+    metrics = writer.metrics()
+    assert metrics['committed'] == 25 and metrics['queue_depth'] == 0
+    print(f"  {len(client.commits)} commits for 25 events")
+
+
+def test_flushes_partial_batch_after_interval():
+    """A partial batch is committed once flush_interval elapses"""
+    client = FakeFirestoreClient()
+    writer = BatchedEventWriter(lambda batch: commit_firestore_batch(batch, client=client),
+                                flush_size=100, flush_interval=0.05)
+    writer.submit(_event())
+    assert writer.flush(timeout=2)
+    assert len(client.documents) == 1
+    writer.close()
+
+
+def test_retries_with_idempotent_ids():
+    """Failed commits are retried and reuse the same document IDs"""
+    client = FakeFirestoreClient(failures=2)
+    writer = BatchedEventWriter(lambda batch: commit_firestore_batch(batch, client=client),
+                                flush_size=5, flush_interval=0.01, backoff_base=0.01)
+    for _ in range(5):
+        writer.submit(_event())
+    assert writer.close(timeout=5)
+
+    metrics = writer.metrics()
+    assert metrics['retries'] == 2
+    assert metrics['committed'] == 5 and metrics['failed'] == 0
+    assert len(client.documents) == 5
+
+
+def test_gives_up_after_max_retries():
+    """A batch that keeps failing is counted as failed instead of blocking the queue"""
+    client = FakeFirestoreClient(failures=100)
+    writer = BatchedEventWriter(lambda batch: commit_firestore_batch(batch, client=client),
+                                flush_size=5, flush_interval=0.01, max_retries=1, backoff_base=0.01)
+    writer.submit(_event())
+    assert writer.close(timeout=5)
+    assert writer.metrics()['failed'] == 1
+
+
+def test_bounded_queue_drops_when_full():
+    """submit() never blocks; events beyond max_queue_size are dropped"""
+    def slow_commit(batch):
+        time.sleep(0.2)
+
+    writer = BatchedEventWriter(slow_commit, flush_size=1, flush_interval=0.01, max_queue_size=2)
+    results = [writer.submit(_event()) for _ in range(10)]
+    assert not all(results)
+    assert writer.metrics()['dropped'] > 0
+    writer.close(timeout=5)
+
+
+def test_enqueue_uses_module_writer():
+    """enqueue_stress_event() goes through the writer started with start_event_writer()"""
+    client = FakeFirestoreClient()
+    firebase_config.firestore_db = client
+    try:
+        firebase_config.start_event_writer(flush_size=10, flush_interval=0.01)
+        assert firebase_config.enqueue_stress_event(2, 0.8, {'HR': 90.0}, model_name='gradient_boosting')
+        assert firebase_config.stop_event_writer(timeout=5)
+    finally:
+        firebase_config.firestore_db = None
+
+    (event,) = client.documents.values()
+    assert event['stress_level'] == 2.0 and event['model_name'] == 'gradient_boosting'
+
+
+if __name__ == "__main__":
+    print("Testing batched stress event writer")
+    print("="*60)
+    for test in [test_groups_events_into_batches, test_flushes_partial_batch_after_interval,
+                 test_retries_with_idempotent_ids, test_gives_up_after_max_retries,
+                 test_bounded_queue_drops_when_full, test_enqueue_uses_module_writer]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
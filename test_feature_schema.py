@@ -0,0 +1,134 @@
+"""
+Test the feature schema: column resolution at load and frames assembled in model order
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+from feature_schema import DEFAULT_COLUMNS, FeatureSchema, feature_schema, parse_datetimes
+from predict import load_model, predict_readings, predict_single_point
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+READING = {"X": -21.0, "Y": -53.0, "Z": 27.0, "EDA": 0.213944, "HR": 75.07, "TEMP": 30.37,
+           "datetime": "2020-05-08 22:11:34"}
+
+
+class _Prep:
+    """Fitted ColumnTransformer stand-in"""
+    transformers_ = [('num', object(), ['HR', 'X', 'datetime_hour']), ('remainder', 'drop', [3, 4])]
+
+
+class _Pipeline:
+    steps = [('prep', _Prep()), ('model', object())]
+
+
+def test_resolved_from_models():
+    """sklearn pipelines and compiled models report the columns in training order"""
+    sklearn_model = load_model('gradient_boosting.joblib', model_dir=MODEL_DIR, compiled=False)
+    compiled = load_model('gradient_boosting.joblib', model_dir=MODEL_DIR)
+    expected = list(sklearn_model.feature_names_in_)
+    assert feature_schema(sklearn_model).columns == expected == feature_schema(compiled).columns
+    # Falls back to the ColumnTransformer's columns, then to the bundled models' layout
+    assert FeatureSchema.from_model(_Pipeline()).columns == ['HR', 'X', 'datetime_hour']
+    assert FeatureSchema.from_model(object()).columns == DEFAULT_COLUMNS
+
+
+def test_cached_per_model():
+    """The schema is built once per model object"""
+    model = load_model('logistic_regression.joblib', model_dir=MODEL_DIR)
+    assert feature_schema(model) is feature_schema(model)
+    assert feature_schema(model) is not feature_schema(load_model('logistic_regression.joblib', model_dir=MODEL_DIR))
+
+
+def test_frame_in_model_order():
+    """Frames come out in schema order with derived datetime fields and the mode's dtypes"""
+    schema = FeatureSchema(['datetime_dow', 'HR', 'datetime_year', 'X'])
+    df = schema.frame([READING, {**READING, 'datetime': '2021-01-03 07:00:00'}])
+    assert list(df.columns) == ['datetime_dow', 'HR', 'datetime_year', 'X']
+    assert df['datetime_dow'].tolist() == [4, 6] and df['datetime_year'].tolist() == [2020, 2021]
+    assert df['HR'].dtype == np.float64
+    reduced = schema.frame([READING], dtype=np.float32)
+    assert reduced['HR'].dtype == np.float32 and reduced['datetime_year'].dtype == np.int16
+    assert schema.frame([{k: v for k, v in READING.items() if k != 'datetime'}],
+                        now='2020-05-08 22:11:34')['datetime_year'].iloc[0] == 2020
+
+
+def test_mixed_datetime_formats():
+    """Each reading's datetime parses in its own format; bad values raise ValueError"""
+    schema = FeatureSchema(DEFAULT_COLUMNS)
+    df = schema.frame([{**READING, 'datetime': '2020-05-08 22:11:34.250000'}, READING,
+                       {**READING, 'datetime': None}], now='2021-01-03 07:00:00')
+    assert df['datetime_hour'].tolist() == [22, 22, 7]
+    assert parse_datetimes(['2020-05-08 22:11:34', 'garbage', 12345], errors='coerce').isna().tolist() == \
+        [False, True, True]
+    for bad in ['garbage', 12345]:
+        try:
+            schema.frame([{**READING, 'datetime': bad}])
+            assert False, "invalid datetimes are rejected"
+        except ValueError:
+            pass
+
+
+def test_from_table():
+    """Tables derive datetime fields from 'datetime' unless the derived columns are present"""
+    schema = FeatureSchema(DEFAULT_COLUMNS)
+    table = pd.DataFrame([{**READING, 'id': '5C', 'label': 2.0}])
+    df = schema.from_table(table)
+    assert list(df.columns) == DEFAULT_COLUMNS and df['datetime_hour'].iloc[0] == 22
+    derived = df.assign(extra=1)
+    assert schema.from_table(derived).equals(df)
+    try:
+        schema.from_table(table.drop(columns=['datetime']))
+        assert False, "a table without datetime needs the derived columns"
+    except ValueError:
+        pass
+
+
+def test_underivable_columns():
+    """Columns a reading cannot provide fail on the first frame from readings, not at load"""
+    schema = FeatureSchema(['X', 'humidity', 'datetime_hour'])
+    assert schema.unknown_columns == ['humidity']
+    for build in [lambda: schema.frame([READING]),
+                  lambda: schema.frame_from_matrix(np.zeros((1, 6)), DEFAULT_COLUMNS[:6], [None])]:
+        try:
+            build()
+            assert False, "readings have no humidity"
+        except ValueError as e:
+            assert 'humidity' in str(e)
+    # Tables that have the column still work
+    table = pd.DataFrame([{**READING, 'humidity': 40.0}])
+    assert schema.from_table(table)['humidity'].tolist() == [40.0]
+    try:
+        schema.from_table(table.drop(columns=['humidity']))
+        assert False, "a table without the column cannot be scored"
+    except ValueError:
+        pass
+
+
+def test_predictions_unchanged():
+    """Schema frames give the same predictions as a frame built column by column"""
+    model = load_model('gradient_boosting.joblib', model_dir=MODEL_DIR, compiled=False)
+    dt = pd.Timestamp(READING['datetime'])
+    manual = pd.DataFrame([{'X': READING['X'], 'Y': READING['Y'], 'Z': READING['Z'], 'EDA': READING['EDA'],
+                            'HR': READING['HR'], 'TEMP': READING['TEMP'], 'datetime_hour': dt.hour,
+                            'datetime_day': dt.day, 'datetime_month': dt.month, 'datetime_year': dt.year,
+                            'datetime_dow': dt.dayofweek}])
+    expected = model.predict_proba(manual[model.feature_names_in_])[0]
+    label, proba = predict_single_point(model, READING['X'], READING['Y'], READING['Z'], READING['EDA'],
+                                        READING['HR'], READING['TEMP'], READING['datetime'])
+    assert np.allclose(proba, expected, rtol=0, atol=1e-12) and label == model.classes_[expected.argmax()]
+    labels, probas = predict_readings(model, [READING] * 3)
+    assert np.allclose(probas, expected, rtol=0, atol=1e-12)
+
+
+if __name__ == "__main__":
+    print("Testing feature schema")
+    print("="*60)
+    for test in [test_resolved_from_models, test_cached_per_model, test_frame_in_model_order,
+                 test_mixed_datetime_formats, test_from_table, test_underivable_columns,
+                 test_predictions_unchanged]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,183 @@
+"""
+Test Firestore pagination in query_stress_events() against a fake client that
+runs the query (filters, projection, ordering, start_after cursor, limit) in
+memory
+No Firebase project or network access needed
+"""
+import operator
+from datetime import datetime, timedelta, timezone
+
+import firebase_config
+from event_store import decode_cursor, encode_cursor
+
+START = datetime(2024, 1, 15, 10, 0, tzinfo=timezone.utc)
+OPERATORS = {'==': operator.eq, '>=': operator.ge, '<': operator.lt, 'in': lambda value, allowed: value in allowed}
+
+
+class FakeSnapshot:
+    def __init__(self, doc_id, data):
+        self.id = doc_id
+        self._data = data
+
+    def to_dict(self):
+        return dict(self._data)
+
+
+class FakeQuery:
+    """Immutable query like Firestore's: each call returns a new query with one more step"""
+
+    def __init__(self, client, steps=()):
+        self.client = client
+        self.steps = list(steps)
+
+    def _with(self, *step):
+        return FakeQuery(self.client, self.steps + [step])
+
+    def where(self, filter):
+        return self._with('where', filter.field_path, filter.op_string, filter.value)
+
+    def order_by(self, field, direction='ASCENDING'):
+        return self._with('order_by', field, direction)
+
+    def select(self, fields):
+        return self._with('select', list(fields))
+
+    def start_after(self, values):
+        return self._with('start_after', dict(values))
+
+    def limit(self, count):
+        return self._with('limit', count)
+
+    def stream(self):
+        self.client.queries.append(self.steps)
+        rows = list(self.client.documents.items())
+        orders = []
+        for step in self.steps:
+            if step[0] == 'where':
+                _, field, op, value = step
+                rows = [(doc_id, data) for doc_id, data in rows if OPERATORS[op](data[field], value)]
+            elif step[0] == 'order_by':
+                orders.append(step[1:])
+
+        # Sort by the order_by fields, last one first; the document ID is '__name__'
+        def key(row, field):
+            return row[0] if field == '__name__' else row[1][field]
+        for field, direction in reversed(orders):
+            rows.sort(key=lambda row: key(row, field), reverse=direction == 'DESCENDING')
+
+        for step in self.steps:
+            if step[0] == 'start_after':
+                cursor = [step[1][field] for field, _ in orders]
+                after = [i for i, row in enumerate(rows) if _past(row, cursor, orders, key)]
+                rows = rows[after[0]:] if after else []
+            elif step[0] == 'select':
+                rows = [(doc_id, {f: data[f] for f in step[1] if f in data}) for doc_id, data in rows]
+            elif step[0] == 'limit':
+                rows = rows[:step[1]]
+        return [FakeSnapshot(doc_id, data) for doc_id, data in rows]
+
+
+def _past(row, cursor, orders, key):
+    """True if row sorts strictly after the cursor values"""
+    for (field, direction), value in zip(orders, cursor):
+        if key(row, field) != value:
+            return (key(row, field) < value) == (direction == 'DESCENDING')
+    return False
+
+
+class FakeFirestoreClient:
+    def __init__(self, documents):
+        self.documents = documents
+        self.queries = []
+        self.collections = []
+
+    def collection(self, name):
+        self.collections.append(name)
+        return FakeQuery(self)
+
+
+def _documents():
+    """30 events; pairs share a timestamp so ties fall across page boundaries"""
+    models = ['logistic_regression', 'gradient_boosting', 'mlp_classifier']
+    return {
+        f"event-{i:03d}": {
+            'timestamp': START + timedelta(seconds=i // 2),
+            'stress_level': float(1 + i % 2),
+            'confidence': 0.9,
+            'model_name': models[i % 3],
+            'sensor_data': {'HR': 80.0 + i}
+        }
+        for i in range(30)
+    }
+
+
+def _query(client, **kwargs):
+    firebase_config.firestore_db = client
+    try:
+        return firebase_config.query_stress_events(**kwargs)
+    finally:
+        firebase_config.firestore_db = None
+
+
+def test_query_steps():
+    """Filters, ordering with the ID tie-break, the projection and the decoded cursor reach Firestore"""
+    client = FakeFirestoreClient(_documents())
+    cursor = encode_cursor(START + timedelta(seconds=9), 'event-018')
+    _query(client, page_size=5, cursor=cursor, fields=['stress_level'], start_time='2024-01-15T10:00:02',
+           end_time=START + timedelta(seconds=12), stress_levels=[2], model_name='mlp_classifier')
+    assert client.collections == [firebase_config.STRESS_EVENTS_COLLECTION]
+    (steps,) = client.queries
+    assert steps == [
+        ('where', 'model_name', '==', 'mlp_classifier'),
+        ('where', 'stress_level', 'in', [2.0]),
+        ('where', 'timestamp', '>=', START + timedelta(seconds=2)),
+        ('where', 'timestamp', '<', START + timedelta(seconds=12)),
+        ('order_by', 'timestamp', 'DESCENDING'),
+        ('order_by', '__name__', 'DESCENDING'),
+        ('select', ['stress_level', 'timestamp']),
+        ('start_after', {'timestamp': START + timedelta(seconds=9), '__name__': 'event-018'}),
+        ('limit', 5)
+    ]
+
+
+def test_pages_follow_the_cursor():
+    """Each page starts strictly after the last event of the previous one, even on equal timestamps"""
+    client = FakeFirestoreClient(_documents())
+    seen, cursor, pages = [], None, 0
+    while True:
+        page, cursor = _query(client, page_size=7, cursor=cursor, fields=['model_name'])
+        pages += 1
+        assert all(set(event) == {'id', 'model_name', 'timestamp'} for event in page)
+        seen.extend(page)
+        if cursor is None:
+            break
+        # The cursor encodes the last event of the page
+        assert decode_cursor(cursor) == (page[-1]['timestamp'], page[-1]['id'])
+    assert pages == 5
+    assert [event['id'] for event in seen] == [f"event-{i:03d}" for i in reversed(range(30))]
+
+    # A page that ends between event-023 and event-022, which share a timestamp, continues at event-022
+    first, cursor = _query(client, page_size=7)
+    second, _ = _query(client, page_size=7, cursor=cursor)
+    assert first[-1]['id'] == 'event-023' and second[0]['id'] == 'event-022'
+    assert second[0]['timestamp'] == first[-1]['timestamp']
+
+
+def test_last_page():
+    """A short page has no next cursor; a full last page is followed by an empty one"""
+    client = FakeFirestoreClient(_documents())
+    page, cursor = _query(client, page_size=30)
+    assert len(page) == 30 and cursor is not None
+    assert _query(client, page_size=30, cursor=cursor) == ([], None)
+    assert _query(client, page_size=10, model_name='nobody') == ([], None)
+    assert _query(None, page_size=10) == ([], None)  # Firestore not initialized
+
+
+if __name__ == "__main__":
+    print("Testing Firestore event queries")
+    print("="*60)
+    for test in [test_query_steps, test_pages_follow_the_cursor, test_last_page]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,63 @@
+"""
+Test fast start: entry points do not import heavy packages they do not use,
+and the import profile parses `-X importtime` output
+"""
+import os
+import subprocess
+import sys
+
+from import_profile import parse_importtime, profile
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+
+def _loaded_after(statement, modules):
+    """Which of `modules` are in sys.modules after running statement in a fresh interpreter"""
+    script = f"import sys; {statement}; print('LOADED:' + ','.join(m for m in {modules!r} if m in sys.modules))"
+    output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True,
+                            cwd=HERE).stdout
+    return [m for m in output.rsplit('LOADED:', 1)[1].strip().split(',') if m]
+
+
+def test_parse_importtime():
+    """Self and cumulative microseconds and nesting depth are read from each line"""
+    stderr = ("import time: self [us] | cumulative | imported package\n"
+              "import time:       120 |        120 |   _io\n"
+              "import time:        40 |      5000 | pandas\n"
+              "import time:      4960 |       4960 |   pandas._libs\n"
+              "unrelated line\n")
+    assert parse_importtime(stderr) == [('_io', 120, 120, 1), ('pandas', 40, 5000, 0), ('pandas._libs', 4960, 4960, 1)]
+
+
+def test_cli_modules_import_lazily():
+    """predict, firebase_config and sensor_simulator import without pandas, joblib or firebase_admin"""
+    heavy = ['pandas', 'joblib', 'sklearn', 'firebase_admin']
+    assert _loaded_after("import predict", heavy) == []
+    assert _loaded_after("import firebase_config", heavy) == []
+    assert _loaded_after("import sensor_simulator", heavy) == []
+
+
+def test_dashboard_defers_models():
+    """Importing the dashboard loads neither the models nor the training CSV"""
+    loaded = _loaded_after("import dashboard; assert dashboard._models is None and dashboard._training_data is None",
+                           ['joblib', 'sklearn', 'firebase_admin'])
+    assert loaded == []
+
+
+def test_profile_reports_program_imports():
+    """A profiled script lists its own imports, not the interpreter's start-up modules"""
+    result = profile('predict.py --help', runs=1, cwd=HERE)
+    names = [name for name, _, _, _ in result['direct']]
+    assert 'numpy' in names and 'site' not in names
+    assert result['start_ms'] > 0 and result['import_ms'] > 0
+
+
+if __name__ == "__main__":
+    print("Testing fast start and the import profile")
+    print("="*60)
+    for test in [test_parse_importtime, test_cli_modules_import_lazily, test_dashboard_defers_models,
+                 test_profile_reports_program_imports]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,114 @@
+"""
+Test per-device streaming inference sessions: smoothing math, eviction and the app.py endpoints
+No deployment needed (uses Flask's test client with the logistic regression model)
+"""
+import os
+import time
+
+import numpy as np
+
+os.environ.setdefault('MODEL_NAME', 'logistic_regression.joblib')
+os.environ.setdefault('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+import app as api  # noqa: E402
+from inference_sessions import InferenceSession, SessionStore  # noqa: E402
+
+READING = {"X": -21.0, "Y": -53.0, "Z": 27.0, "EDA": 0.213944, "HR": 75.07, "TEMP": 30.37,
+           "datetime": "2020-05-08 22:11:34"}
+
+
+def test_ema_smoothing():
+    """EMA starts at the first reading and moves alpha of the way to each new one"""
+    session = InferenceSession('a', smoothing='ema', alpha=0.5)
+    label, probs = session.update([0.8, 0.1, 0.1])
+    assert label == 0 and np.allclose(probs, [0.8, 0.1, 0.1])
+    session.update([0.0, 1.0, 0.0])
+    label, probs = session.update([0.0, 1.0, 0.0])
+    assert label == 1 and np.allclose(probs, [0.2, 0.775, 0.025])
+
+
+def test_vote_smoothing():
+    """Majority of the last `window` labels; ties go to the newest label"""
+    session = InferenceSession('a', smoothing='vote', window=3)
+    assert session.update([0.1, 0.9, 0.0])[0] == 1
+    assert session.update([0.9, 0.1, 0.0])[0] == 0  # 1-1 tie: newest wins
+    assert session.update([0.9, 0.1, 0.0])[0] == 0
+    label, votes = session.update([0.0, 0.0, 1.0])  # window is now [0, 0, 2]
+    assert label == 0 and np.allclose(votes, [2 / 3, 0, 1 / 3])
+    session.update([0.0, 0.0, 1.0])
+    assert session.update([0.0, 0.0, 1.0])[0] == 2
+
+
+def test_capacity_and_idle_eviction():
+    """The least recently used session goes at the cap; idle sessions expire"""
+    store = SessionStore(max_sessions=2, idle_ttl=0.2)
+    store.open('a')
+    store.open('b')
+    store.get('a')  # 'b' is now least recently used
+    store.open('c')
+    assert store.get('b') is None and store.get('a') is not None
+    assert store.stats()['evicted_capacity'] == 1
+
+    time.sleep(0.25)
+    store.get('c')  # expires both idle sessions
+    assert store.get('a') is None and len(store) == 0
+    assert store.stats()['evicted_idle'] == 2
+
+
+def test_session_endpoints():
+    """Open a session, stream readings, read it back and close it"""
+    client = api.app.test_client()
+    assert client.post('/sessions/x/readings', json=READING).status_code == 404
+    assert client.post('/sessions', json={'device_id': 'x', 'smoothing': 'bogus'}).status_code == 400
+    for options, message in [({'alpha': 'fast'}, "alpha must be a number, got 'fast'"),
+                             ({'alpha': [0.5]}, "alpha must be a number, got [0.5]"),
+                             ({'window': 'five'}, "window must be an integer, got 'five'"),
+                             ({'window': 2.5}, "window must be an integer, got 2.5"),
+                             ({'alpha': 2}, "alpha must be in (0, 1]"),
+                             ({'smoothing': 'vote', 'window': 0}, "window must be at least 1")]:
+        response = client.post('/sessions', json={'device_id': 'x', **options})
+        assert response.status_code == 400 and response.get_json() == {'error': message}
+    response = client.post('/sessions', json={'device_id': 'x', 'smoothing': 'vote', 'alpha': '0.5', 'window': '3'})
+    assert response.status_code == 201 and response.get_json()['window'] == 3
+
+    response = client.post('/sessions', json={'device_id': 'x', 'smoothing': 'ema', 'alpha': 0.5})
+    assert response.status_code == 201
+
+    first = client.post('/sessions/x/readings', json=READING).get_json()['predictions'][0]
+    assert first['smoothed_probabilities'] == first['probabilities']
+    expected = client.post('/predict', json=READING).get_json()
+    assert first['predicted_label'] == expected['predicted_label']
+    assert np.isclose(first['confidence'], expected['confidence'])
+
+    payload = client.post('/sessions/x/readings', json={'data': [READING] * 3}).get_json()
+    assert payload['count'] == 3 and payload['readings'] == 4
+    assert all(p['smoothed_label'] == first['predicted_label'] for p in payload['predictions'])
+
+    assert client.post('/sessions/x/readings', json={'X': 1.0}).status_code == 400
+    assert client.post('/sessions/x/readings', json={**READING, 'HR': float('nan')}).status_code == 400
+    assert client.get('/sessions/x').get_json()['readings'] == 4
+
+    # Invalid readings in a batch get an error in their place and skip the session;
+    # datetimes may mix formats or be left out
+    batch = [{**READING, 'datetime': '2020-05-08 22:11:34.250000'}, {**READING, 'HR': 'fast'},
+             {k: v for k, v in READING.items() if k != 'datetime'}, {**READING, 'TEMP': 400.0},
+             {**READING, 'datetime': 'garbage'}]
+    response = client.post('/sessions/x/readings', json={'data': batch})
+    assert response.status_code == 200
+    payload = response.get_json()
+    assert payload['count'] == 5 and payload['invalid'] == 3 and payload['readings'] == 6
+    codes = [p.get('code') for p in payload['predictions']]
+    assert codes == [None, 'not_numeric', None, 'out_of_range', 'bad_datetime']
+    assert payload['predictions'][1]['input'] == batch[1]
+    assert client.delete('/sessions/x').status_code == 200
+    assert client.get('/sessions/x').status_code == 404
+
+
+if __name__ == "__main__":
+    print("Testing streaming inference sessions")
+    print("="*60)
+    for test in [test_ema_smoothing, test_vote_smoothing, test_capacity_and_idle_eviction,
+                 test_session_endpoints]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,143 @@
+"""
+Test the background inference worker with fake load/predict/persist callables:
+snapshot publication, the ingest -> predict -> publish -> persist order and
+the error path
+"""
+import time
+
+import pandas as pd
+
+from inference_worker import InferenceWorker
+
+
+class FakePipeline:
+    """Records the order of calls and what the snapshot held when persist ran"""
+
+    def __init__(self, frames, persist_error=None):
+        self.frames = list(frames)
+        self.persist_error = persist_error
+        self.calls = []
+        self.worker = InferenceWorker(load_readings=self.load, predict=self.predict, persist=self.persist,
+                                      ingest=self.ingest, interval=0.01)
+
+    def load(self):
+        self.calls.append('load')
+        return self.frames.pop(0) if len(self.frames) > 1 else self.frames[0]
+
+    def ingest(self, data):
+        self.calls.append('ingest')
+
+    def predict(self, data):
+        self.calls.append('predict')
+        return {'model': {'label': 1.0, 'confidence': 0.9, 'n_rows': len(data)}}
+
+    def persist(self, data, predictions):
+        self.calls.append(('persist', self.worker.snapshot()['version']))
+        if self.persist_error is not None:
+            raise self.persist_error
+
+
+def _readings(n):
+    timestamps = pd.date_range('2020-05-08 22:00:00', periods=n, freq='s')
+    return pd.DataFrame({'timestamp': timestamps, 'HR': [75.0] * n})
+
+
+def test_publishes_snapshot():
+    """A step publishes the readings and predictions with an increasing version"""
+    pipeline = FakePipeline([_readings(3), _readings(4)])
+    worker = pipeline.worker
+    assert worker.snapshot()['version'] == 0 and worker.snapshot()['data'] is None
+    assert worker.step()
+    snapshot = worker.snapshot()
+    assert snapshot['version'] == 1 and len(snapshot['data']) == 3
+    assert snapshot['predictions']['model']['n_rows'] == 3
+    assert set(snapshot['timings']) == {'load_ms', 'inference_ms'} and snapshot['updated_at'] is not None
+    assert worker.step() and worker.snapshot()['version'] == 2
+    assert snapshot['data'] is not worker.snapshot()['data'] and len(snapshot['data']) == 3  # not mutated
+
+
+def test_call_order():
+    """ingest runs before predict, and the snapshot is published before persist"""
+    pipeline = FakePipeline([_readings(3)])
+    pipeline.worker.step()
+    assert pipeline.calls == ['load', 'ingest', 'predict', ('persist', 1)]
+
+
+def test_unchanged_readings():
+    """No inference, persist or new snapshot while the newest reading is the same"""
+    pipeline = FakePipeline([_readings(3)])
+    worker = pipeline.worker
+    assert worker.step()
+    pipeline.calls.clear()
+    assert not worker.step()
+    assert pipeline.calls == ['load'] and worker.snapshot()['version'] == 1
+
+
+def test_persist_error():
+    """A failing event store is reported and does not lose the published snapshot"""
+    pipeline = FakePipeline([_readings(3), _readings(4)], persist_error=ConnectionError("store unavailable"))
+    worker = pipeline.worker
+    assert worker.step() and worker.snapshot()['version'] == 1
+    assert worker.step() and worker.snapshot()['version'] == 2
+    assert pipeline.calls.count('predict') == 2 and ('persist', 2) in pipeline.calls
+
+
+def test_predict_error():
+    """A failing model is reported by the thread, which keeps polling"""
+    pipeline = FakePipeline([_readings(3), _readings(4)])
+    predict = pipeline.predict
+    failures = [ValueError("model failed")]
+
+    def flaky_predict(data):
+        if failures:
+            raise failures.pop()
+        return predict(data)
+
+    pipeline.worker.predict = flaky_predict
+    worker = pipeline.worker.start()
+    try:
+        deadline = time.time() + 5
+        while worker.snapshot()['version'] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert worker.running and worker.snapshot()['predictions']['model']['n_rows'] == 4
+    finally:
+        worker.stop()
+    assert ('persist', 1) in pipeline.calls
+
+
+def test_empty_readings():
+    """No readings publish one empty snapshot; predict and persist are not called"""
+    pipeline = FakePipeline([pd.DataFrame(), pd.DataFrame(), _readings(2), pd.DataFrame()])
+    worker = pipeline.worker
+    assert worker.step() and worker.snapshot()['predictions'] == {}
+    assert not worker.step() and worker.snapshot()['version'] == 1
+    assert worker.step() and worker.snapshot()['version'] == 2
+    # Readings that disappear (e.g. a truncated file) clear the snapshot
+    assert worker.step() and worker.snapshot()['data'].empty and worker.snapshot()['version'] == 3
+    assert 'predict' in pipeline.calls and pipeline.calls.count('predict') == 1
+
+
+def test_thread():
+    """start() polls in the background until stop()"""
+    pipeline = FakePipeline([_readings(3)])
+    worker = pipeline.worker.start()
+    try:
+        deadline = time.time() + 5
+        while worker.snapshot()['version'] == 0 and time.time() < deadline:
+            time.sleep(0.01)
+        assert worker.running and worker.snapshot()['version'] == 1
+        assert worker.start() is worker
+    finally:
+        worker.stop()
+    assert not worker.running
+
+
+if __name__ == "__main__":
+    print("Testing inference worker")
+    print("="*60)
+    for test in [test_publishes_snapshot, test_call_order, test_unchanged_readings, test_persist_error,
+                 test_predict_error, test_empty_readings, test_thread]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
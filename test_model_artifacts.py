@@ -0,0 +1,121 @@
+"""
+Test the ahead-of-time model artifact format: round trip, integrity checks and loader selection
+"""
+import json
+import mmap
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+
+from compiled_models import CompiledPipeline, _sample_frame
+from model_artifacts import ArtifactError, artifact_path, export_artifact, is_current, load_artifact
+from predict import load_model
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MODELS = ['gradient_boosting.joblib', 'logistic_regression.joblib', 'mlp_classifier.joblib']
+
+
+def _is_mapped(array):
+    """True if a NumPy array is a view of a memory-mapped file"""
+    while isinstance(array, np.ndarray):
+        if isinstance(array, np.memmap):
+            return True
+        array = array.base
+    return isinstance(array, mmap.mmap)
+
+
+def _export(tmp, file_name):
+    """Copy a bundled model into tmp and export its artifact next to it"""
+    source = os.path.join(tmp, file_name)
+    shutil.copy(os.path.join(MODEL_DIR, file_name), source)
+    export_artifact(load_model(file_name, model_dir=tmp), artifact_path(source), source_path=source)
+    return source, artifact_path(source)
+
+
+def test_round_trip_all_models():
+    """Every bundled model loads memory-mapped and predicts exactly like its compiled model"""
+    df = _sample_frame(1500, seed=8)
+    with tempfile.TemporaryDirectory() as tmp:
+        for file_name in MODELS:
+            source, path = _export(tmp, file_name)
+            artifact = load_artifact(path)
+            compiled = load_model(file_name, model_dir=tmp, compiled=True)
+            assert is_current(path, source)
+            assert np.array_equal(artifact.predict_proba(df), compiled.predict_proba(df))
+            assert list(artifact.classes_) == [0.0, 1.0, 2.0]
+            header = json.load(open(os.path.join(path, 'header.json')))
+            assert header['format_version'] == 1 and header['columns'] == artifact.columns
+            values = [v for value in vars(artifact.kernel).values()
+                      for v in (value if isinstance(value, list) else [value])]
+            assert any(_is_mapped(value) for value in values)
+
+
+def test_integrity_checks():
+    """Corrupt arrays and newer format versions are rejected"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _, path = _export(tmp, 'logistic_regression.joblib')
+        with open(os.path.join(path, 'weights.npy'), 'r+b') as f:
+            f.seek(-1, os.SEEK_END)
+            f.write(b'\x00')
+        try:
+            load_artifact(path)
+            assert False, "expected a checksum error"
+        except ArtifactError as e:
+            assert 'Checksum' in str(e)
+
+        _, path = _export(tmp, 'mlp_classifier.joblib')
+        header_file = os.path.join(path, 'header.json')
+        header = json.load(open(header_file))
+        header['format_version'] = 99
+        json.dump(header, open(header_file, 'w'))
+        try:
+            load_artifact(path)
+            assert False, "expected a version error"
+        except ArtifactError as e:
+            assert 'format version' in str(e)
+
+
+def test_load_model_prefers_current_artifacts():
+    """load_model memory-maps a current artifact, ignores a stale one, and skips it for compiled=False"""
+    with tempfile.TemporaryDirectory() as tmp:
+        source, path = _export(tmp, 'gradient_boosting.joblib')
+        assert load_model('gradient_boosting.joblib', model_dir=tmp).source is None
+        assert not isinstance(load_model('gradient_boosting.joblib', model_dir=tmp, compiled=False),
+                              CompiledPipeline)
+
+        header_file = os.path.join(path, 'header.json')
+        header = json.load(open(header_file))
+        header['source']['sha256'] = '0' * 64
+        json.dump(header, open(header_file, 'w'))
+        assert load_model('gradient_boosting.joblib', model_dir=tmp).source is not None
+
+        # Deployments may ship the artifact alone
+        os.remove(source)
+        assert isinstance(load_model('gradient_boosting.joblib', model_dir=tmp), CompiledPipeline)
+
+
+def test_loader_does_not_import_sklearn():
+    """Loading and scoring an artifact never imports sklearn"""
+    with tempfile.TemporaryDirectory() as tmp:
+        _, path = _export(tmp, 'mlp_classifier.joblib')
+        script = (
+            "import sys, numpy as np; from model_artifacts import load_artifact; "
+            f"m = load_artifact({path!r}); m.predict_proba(np.zeros((2, 11))); "
+            "assert 'sklearn' not in sys.modules and 'joblib' not in sys.modules"
+        )
+        subprocess.run([sys.executable, '-c', script], check=True, cwd=os.path.dirname(os.path.abspath(__file__)))
+
+
+if __name__ == "__main__":
+    print("Testing model artifacts")
+    print("="*60)
+    for test in [test_round_trip_all_models, test_integrity_checks, test_load_model_prefers_current_artifacts,
+                 test_loader_does_not_import_sklearn]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
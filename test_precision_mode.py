@@ -0,0 +1,91 @@
+"""
+Test the float32 inference mode: featurization dtypes, compiled models and the drift report
+"""
+import os
+import tempfile
+
+import numpy as np
+
+from compiled_models import _sample_frame
+from precision_report import compare
+from predict import cast_features, inference_dtype, load_model, predict_from_csv, readings_to_frame
+
+MODEL_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+MODELS = ['gradient_boosting.joblib', 'logistic_regression.joblib', 'mlp_classifier.joblib']
+READING = {"X": -21.0, "Y": -53.0, "Z": 27.0, "EDA": 0.213944, "HR": 75.07, "TEMP": 30.37,
+           "datetime": "2020-05-08 22:11:34"}
+
+
+def _write_csv(path, n=500):
+    df = _sample_frame(n, seed=11)
+    df['datetime'] = ['2020-05-08 22:11:34'] * n
+    df['label'] = np.arange(n) % 3
+    df.drop(columns=[c for c in df.columns if c.startswith('datetime_')]).to_csv(path)
+
+
+def test_inference_dtype():
+    """Explicit dtype wins over INFERENCE_DTYPE; anything but float32/float64 is rejected"""
+    assert inference_dtype() == np.float64
+    os.environ['INFERENCE_DTYPE'] = 'float32'
+    try:
+        assert inference_dtype() == np.float32 and inference_dtype('float64') == np.float64
+    finally:
+        del os.environ['INFERENCE_DTYPE']
+    try:
+        inference_dtype('float16')
+        assert False, "float16 should be rejected"
+    except ValueError:
+        pass
+
+
+def test_float32_features():
+    """Sensor columns become float32 and datetime parts small integers, with the same values"""
+    full = readings_to_frame([READING] * 3)
+    reduced = readings_to_frame([READING] * 3, dtype='float32')
+    assert reduced['HR'].dtype == np.float32 and reduced['datetime_year'].dtype == np.int16
+    assert reduced['datetime_hour'].dtype == np.int8
+    assert reduced.memory_usage(index=False).sum() < full.memory_usage(index=False).sum() / 2
+    assert np.allclose(reduced.to_numpy(dtype=np.float64), full.to_numpy(), rtol=1e-6)
+    assert cast_features(full) is full
+
+
+def test_float32_models_agree():
+    """Compiled models return float32 probabilities close to the float64 path with the same labels"""
+    df = _sample_frame(3000, seed=12)
+    for name in MODELS:
+        full = load_model(name, model_dir=MODEL_DIR)
+        reduced = load_model(name, model_dir=MODEL_DIR, dtype='float32')
+        probas = reduced.predict_proba(cast_features(df, 'float32'))
+        assert probas.dtype == np.float32, name
+        expected = full.predict_proba(df)
+        assert np.abs(probas - expected).max() < 1e-2, name
+        assert (reduced.predict(df) == full.predict(df)).mean() > 0.995, name
+        # The float64 model is not changed by deriving a float32 one
+        assert full.predict_proba(df).dtype == np.float64
+
+
+def test_csv_and_drift_report():
+    """predict_from_csv parses float32 columns; the report compares both paths"""
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'data.csv')
+        _write_csv(path)
+        model = load_model('logistic_regression.joblib', model_dir=MODEL_DIR, dtype='float32')
+        original_df, preds, probas = predict_from_csv(model, path, dtype='float32')
+        assert original_df['EDA'].dtype == np.float32 and probas.dtype == np.float32
+        assert len(preds) == 500
+
+        report = compare('logistic_regression.joblib', MODEL_DIR, path)
+        assert report['rows'] == 500 and report['agreement'] > 0.99
+        assert report['float32']['bytes'] < report['float64']['bytes']
+        assert 0 <= report['float32']['accuracy'] <= 1
+
+
+if __name__ == "__main__":
+    print("Testing float32 inference mode")
+    print("="*60)
+    for test in [test_inference_dtype, test_float32_features, test_float32_models_agree,
+                 test_csv_and_drift_report]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
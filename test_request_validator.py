@@ -0,0 +1,153 @@
+"""
+Test the request validator: error codes per reading, the value matrix, and the
+/predict and /predict/batch endpoints that use it (app.py and the Hugging Face server)
+No deployment needed (uses Flask's test client with the committed models)
+"""
+import os
+
+import numpy as np
+
+os.environ.setdefault('MODEL_NAME', 'logistic_regression.joblib')
+os.environ.setdefault('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+import app as api  # noqa: E402
+from predict import predict_readings  # noqa: E402
+from request_validator import (BAD_DATETIME, MISSING, NOT_AN_OBJECT, NOT_FINITE, NOT_NUMERIC, OK,  # noqa: E402
+                               OUT_OF_RANGE, RequestValidator, parse_ranges)
+
+READING = {"X": -21.0, "Y": -53.0, "Z": 27.0, "EDA": 0.213944, "HR": 75.07, "TEMP": 30.37,
+           "datetime": "2020-05-08 22:11:34"}
+
+
+def test_valid_readings_fill_the_matrix():
+    """Values land in field order; numeric strings and ints are accepted"""
+    validator = RequestValidator()
+    result = validator.validate([READING, {**READING, 'HR': '80.5', 'X': 3, 'datetime': None}])
+    assert result.all_valid and result.errors.tolist() == [OK, OK]
+    assert result.values.tolist() == [[-21.0, -53.0, 27.0, 0.213944, 75.07, 30.37],
+                                      [3.0, -53.0, 27.0, 0.213944, 80.5, 30.37]]
+    assert result.datetimes == ["2020-05-08 22:11:34", None]
+    assert result.error_message(0) is None and result.seconds >= 0
+    assert len(validator.validate([])) == 0
+
+
+def test_error_codes():
+    """Each kind of bad reading gets its code and the field at fault; the others stay valid"""
+    items = [
+        READING,
+        {k: v for k, v in READING.items() if k not in ('EDA', 'TEMP')},
+        {**READING, 'HR': 'fast'},
+        {**READING, 'HR': 'nan'},
+        {**READING, 'TEMP': float('inf')},
+        {**READING, 'HR': 900.0},
+        {**READING, 'X': None},
+        {**READING, 'Y': [1, 2]},
+        [1, 2, 3],
+        READING
+    ]
+    result = RequestValidator().validate(items)
+    assert result.errors.tolist() == [OK, MISSING, NOT_NUMERIC, NOT_FINITE, NOT_FINITE, OUT_OF_RANGE,
+                                      MISSING, NOT_NUMERIC, NOT_AN_OBJECT, OK]
+    assert result.valid.tolist() == [True] + [False] * 8 + [True]
+    assert result.error_message(1) == "Missing fields: ['EDA', 'TEMP']"
+    assert result.error_message(2) == "HR is not a number"
+    assert result.error_message(4) == "TEMP must be a finite number"
+    assert result.error_message(5) == "HR is outside the valid range [20, 250]"
+    assert result.error_message(6) == "Missing fields: ['X']"
+    assert result.error_message(7) == "Y is not a number"
+    assert result.values[9].tolist() == result.values[0].tolist()
+    assert result.describe_errors() == {'ok': 2, 'not_an_object': 1, 'missing': 2, 'not_numeric': 2,
+                                        'not_finite': 2, 'out_of_range': 1}
+
+
+def test_datetimes():
+    """Each datetime parses in its own format; a bad one (or a number) fails only its row"""
+    items = [{**READING, 'datetime': '2020-05-08 22:11:34.250000'}, READING,
+             {k: v for k, v in READING.items() if k != 'datetime'}, {**READING, 'datetime': 'garbage'},
+             {**READING, 'datetime': 12345}, {**READING, 'datetime': '2020-05-08T22:11:34+02:00'}]
+    result = RequestValidator().validate(items)
+    assert result.errors.tolist() == [OK, OK, OK, BAD_DATETIME, BAD_DATETIME, OK]
+    assert result.error_message(3) == "Invalid datetime: 'garbage'"
+    assert result.error_message(4) == "Invalid datetime: 12345"
+    hours = result.timestamps[result.valid].astype('datetime64[h]').astype(int) % 24
+    assert hours.tolist()[:2] == [22, 22] and hours.tolist()[3] == 22
+    assert np.isnat(result.timestamps[3]) and not np.isnat(result.timestamps[2])
+
+
+def test_ranges():
+    """VALIDATION_RANGES-style overrides; an empty bound is open"""
+    assert parse_ranges("HR=30:200, EDA=:5") == {'HR': (30.0, 200.0), 'EDA': (-np.inf, 5.0)}
+    validator = RequestValidator(ranges=parse_ranges("HR=30:200,X=:"))
+    result = validator.validate([{**READING, 'HR': 25.0}, {**READING, 'X': 1e6}])
+    assert result.errors.tolist() == [OUT_OF_RANGE, OK]
+
+
+def test_predict_endpoint():
+    """Valid readings predict as before; invalid ones are rejected with 400 and a code"""
+    client = api.app.test_client()
+    payload = client.post('/predict', json=READING).get_json()
+    labels, probas = predict_readings(api.model, [READING])
+    assert payload['predicted_label'] == float(labels[0])
+    assert np.isclose(payload['confidence'], probas[0].max())
+    assert payload['input_data'] == READING
+
+    response = client.post('/predict', json={**READING, 'HR': 'fast'})
+    assert response.status_code == 400 and response.get_json()['code'] == 'not_numeric'
+    response = client.post('/predict', json={'X': 1.0})
+    assert response.status_code == 400 and response.get_json()['code'] == 'missing'
+    response = client.post('/predict', json={**READING, 'datetime': 12345})
+    assert response.status_code == 400 and response.get_json()['code'] == 'bad_datetime'
+    assert client.post('/predict', data='[1, 2]', content_type='application/json').status_code == 400
+
+
+def test_batch_endpoint():
+    """Invalid readings keep their position with an error; valid ones match single predictions"""
+    client = api.app.test_client()
+    items = [READING, {**READING, 'HR': None}, {**READING, 'datetime': '2021-01-03 07:00:00'}, {'X': 1}]
+    payload = client.post('/predict/batch', json={'data': items}).get_json()
+    assert payload['count'] == 4 and payload['invalid'] == 2
+    assert set(payload['timing_ms']) == {'validate', 'predict', 'total'}
+    predictions = payload['predictions']
+    assert predictions[1] == {'error': "Missing fields: ['HR']", 'code': 'missing', 'input': items[1]}
+    assert predictions[3]['code'] == 'missing' and predictions[3]['input'] == {'X': 1}
+    labels, probas = predict_readings(api.model, [items[0], items[2]])
+    for prediction, label, proba, item in zip([predictions[0], predictions[2]], labels, probas,
+                                              [items[0], items[2]]):
+        assert prediction['predicted_label'] == float(label) and prediction['input_data'] == item
+        assert np.allclose(list(prediction['probabilities'].values()), proba)
+
+    # Mixed datetime formats and readings without one predict together; a bad datetime fails its row
+    mixed = [{**READING, 'datetime': '2020-05-08 22:11:34.250000'}, READING,
+             {k: v for k, v in READING.items() if k != 'datetime'}, {**READING, 'datetime': 'garbage'}]
+    response = client.post('/predict/batch', json={'data': mixed})
+    assert response.status_code == 200
+    predictions = response.get_json()['predictions']
+    assert predictions[0]['predicted_label'] == predictions[1]['predicted_label']
+    assert 'predicted_label' in predictions[2] and predictions[3]['code'] == 'bad_datetime'
+
+    empty = client.post('/predict/batch', json={'data': []}).get_json()
+    assert empty['count'] == 0 and empty['predictions'] == []
+    assert client.post('/predict/batch', json={'data': 'x'}).status_code == 400
+
+
+def test_huggingface_server_shares_the_request_path():
+    """The Hugging Face server loads through predict.load_model and answers /predict like app.py"""
+    import huggingface_deploy as hf
+
+    assert hf.model is not None and type(hf.model) is type(api.model)
+    hf_client, client = hf.app.test_client(), api.app.test_client()
+    for body in [READING, {**READING, 'HR': 'fast'}, {'X': 1.0}, {**READING, 'datetime': 'garbage'},
+                 {**READING, 'HR': 900.0}]:
+        expected, response = client.post('/predict', json=body), hf_client.post('/predict', json=body)
+        assert response.status_code == expected.status_code and response.get_json() == expected.get_json()
+    assert hf_client.post('/predict', data='[1, 2]', content_type='application/json').status_code == 400
+
+
+if __name__ == "__main__":
+    print("Testing request validator")
+    print("="*60)
+    for test in [test_valid_readings_fill_the_matrix, test_error_codes, test_datetimes, test_ranges,
+                 test_predict_endpoint, test_batch_endpoint, test_huggingface_server_shares_the_request_path]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,210 @@
+"""
+Test sensor_simulator sampling on a small generated dataset
+"""
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+import pandas as pd
+
+import sensor_simulator
+from replay_engine import batch_to_records, run_replay, HttpSink
+
+
+def _write_dataset(path, n=300):
+    """Synthetic training CSV with labels 0/1/2"""
+    rng = np.random.default_rng(0)
+    pd.DataFrame({
+        'X': np.arange(n, dtype=float),
+        'Y': rng.normal(size=n),
+        'Z': rng.normal(size=n),
+        'EDA': rng.random(n),
+        'HR': 60 + 40 * rng.random(n),
+        'TEMP': 30 + 3 * rng.random(n),
+        'id': '5C',
+        'datetime': pd.date_range('2020-05-08 22:11:34', periods=n, freq='s'),
+        'label': np.arange(n) % 3
+    }).to_csv(path, index=False)
+
+
+def _load(n=300):
+    """Point the simulator at a fresh synthetic dataset"""
+    tmp = tempfile.mkdtemp()
+    path = os.path.join(tmp, 'balanced_data.csv')
+    _write_dataset(path, n)
+
+    sensor_simulator.TRAINING_DATA_FILE = path
+    sensor_simulator._training_data = None
+    sensor_simulator._current_indices = {None: 0, 0: 0, 1: 0, 2: 0}
+    sensor_simulator.load_training_data()
+    shutil.rmtree(tmp)
+
+
+def test_label_filter():
+    """Batches for a stress level only contain rows with that label"""
+    _load()
+    batch = sensor_simulator.generate_sensor_batch(1000, stress_level=2)
+    assert batch['values'].shape == (1000, 6)
+    assert np.all(batch['labels'] == 2)
+    # X is the row number, and label = row % 3
+    assert np.all(batch['values'][:, 0] % 3 == 2)
+
+
+def test_seed_is_reproducible():
+    """The same seed gives the same readings"""
+    _load()
+    sensor_simulator.set_seed(42)
+    first = sensor_simulator.generate_sensor_batch(50)['values']
+    sensor_simulator.set_seed(42)
+    second = sensor_simulator.generate_sensor_batch(50)['values']
+    assert np.array_equal(first, second)
+
+
+def test_sequential_wraps_in_order():
+    """Sequential sampling continues across calls and wraps around"""
+    _load(n=30)
+    rows = [sensor_simulator.generate_sensor_data(stress_level=1, shuffle=False)['X'] for _ in range(3)]
+    batch = sensor_simulator.generate_sensor_batch(9, stress_level=1, shuffle=False)
+    assert rows == [1.0, 4.0, 7.0]
+    assert batch['values'][:, 0].tolist() == [10.0, 13.0, 16.0, 19.0, 22.0, 25.0, 28.0, 1.0, 4.0]
+
+
+def test_timestamps_continue_between_single_and_batch():
+    """Readings are one second apart whether generated singly or in batches"""
+    _load()
+    first = sensor_simulator.generate_sensor_data()
+    records = batch_to_records(sensor_simulator.generate_sensor_batch(2))
+    assert first['timestamp'] == '2020-05-08 22:11:34.000000'
+    assert [r['timestamp'] for r in records] == ['2020-05-08 22:11:35.000000', '2020-05-08 22:11:36.000000']
+    assert set(records[0]) == {'X', 'Y', 'Z', 'EDA', 'HR', 'TEMP', 'timestamp'}
+
+
+class CollectSink:
+    def __init__(self):
+        self.batches = []
+
+    def write(self, batch):
+        self.batches.append(batch)
+
+    def close(self):
+        pass
+
+
+def test_rate_mode_holds_target_rate():
+    """Rate mode emits rate * duration readings with timestamps 1 / rate apart"""
+    _load()
+    sink = CollectSink()
+    summary = run_replay(sensor_simulator.SamplerSource(step_seconds=1 / 2000), sink, rate=2000, duration=0.5, report_interval=None)
+    assert abs(summary['readings'] - 1000) <= 50
+    timestamps = np.concatenate([batch['timestamps'] for batch in sink.batches])
+    assert np.all(np.diff(timestamps) == np.timedelta64(500, 'us'))
+    assert summary['jitter_max_ms'] >= 0
+
+
+def test_timeline_follows_recorded_spacing():
+    """Speed mode keeps the dataset's own spacing, bridges gaps and loops continuously"""
+    _load(n=30)
+    source = sensor_simulator.TimelineSource()
+    # Rows are 1s apart: 30 rows per 30s pass
+    assert source.due(0) == 1
+    assert source.due(9.5) == 10
+    assert source.due(30) == 31
+    batch = source.take(35)
+    steps = np.diff(batch['timestamps']) / np.timedelta64(1, 's')
+    assert np.all(steps == 1.0)
+    assert batch['values'][30, 0] == 0.0
+
+    summary = run_replay(source, CollectSink(), speed=100, duration=0.3, report_interval=None)
+    assert 25 <= summary['readings'] <= 35
+
+
+def test_fleet_devices_report_once_per_period():
+    """Every device reports once per period at its own phase, in time order"""
+    _load()
+    sensor_simulator.set_seed(7)
+    source = sensor_simulator.FleetSource(100, device_rate=2.0, cycle_stress=True, clock_skew=0.0)
+    assert source.due(0.5) == 100 + int(np.sum(source.phases <= 0))
+    batch = source.take(300)
+
+    assert len(set(batch['device_ids'][:100])) == 100
+    assert np.all(np.diff(batch['timestamps']) >= np.timedelta64(0, 'us'))
+    # A device's readings are one period apart
+    device = batch['device_ids'][0]
+    own = batch['timestamps'][batch['device_ids'] == device]
+    assert np.all(np.diff(own) == np.timedelta64(500000, 'us'))
+    assert set(np.unique(batch['labels'])) <= {0.0, 1.0, 2.0}
+
+
+class _PredictHandler(BaseHTTPRequestHandler):
+    """Stub API: predicts label 2 for every reading"""
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+        readings = body['data'] if self.path == '/predict/batch' else [body]
+        self.server.requests.append(len(readings))
+        predictions = [{'predicted_label': 2.0, 'confidence': 0.9} for _ in readings]
+        payload = {'predictions': predictions} if self.path == '/predict/batch' else predictions[0]
+        data = json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_http_sink_batches_and_scores():
+    """Readings are batched by count, posted concurrently and scored against their labels"""
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _PredictHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        sink = HttpSink(f"http://127.0.0.1:{server.server_port}", max_batch=100, max_wait=60, concurrency=3)
+        labels = np.array([2.0, 2.0, 0.0, 1.0] * 60)
+        sink.write({
+            'values': np.zeros((240, 6)),
+            'labels': labels,
+            'timestamps': np.datetime64('2020-05-08T22:11:34', 'us') + np.arange(240).astype('timedelta64[s]')
+        })
+        sink.close()
+        summary = sink.summary()
+        assert sorted(server.requests) == [40, 100, 100]
+        assert summary['predicted'] == 240 and summary['failed_requests'] == 0
+        assert summary['accuracy'] == 0.5
+        assert summary['latency_p50_ms'] > 0
+    finally:
+        server.shutdown()
+
+
+def test_sink_without_replay_mode():
+    """--sink without a replay mode sends readings to that sink, one per --interval, not to the JSON file"""
+    script = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'sensor_simulator.py')
+    with tempfile.TemporaryDirectory() as tmp:
+        _write_dataset(os.path.join(tmp, 'balanced_data.csv'))
+        subprocess.run([sys.executable, script, '--sink', 'log', '--log-file', 'readings.jsonl',
+                        '--interval', '0.01', '--count', '5', '--seed', '1'],
+                       cwd=tmp, check=True, capture_output=True, timeout=60)
+        with open(os.path.join(tmp, 'readings.jsonl')) as f:
+            assert len(f.readlines()) == 5
+        assert not os.path.exists(os.path.join(tmp, sensor_simulator.DATA_FILE))
+
+
+if __name__ == "__main__":
+    print("Testing sensor simulator sampling")
+    print("="*60)
+    for test in [test_label_filter, test_seed_is_reproducible, test_sequential_wraps_in_order,
+                 test_timestamps_continue_between_single_and_batch, test_rate_mode_holds_target_rate,
+                 test_timeline_follows_recorded_spacing, test_fleet_devices_report_once_per_period,
+                 test_http_sink_batches_and_scores, test_sink_without_replay_mode]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
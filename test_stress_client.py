@@ -0,0 +1,169 @@
+"""
+Test the prediction API client against a local app.py and a flaky stub server
+No deployment needed (serves app.py in-process with the logistic regression model)
+"""
+import asyncio
+import json
+import os
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+from werkzeug.serving import make_server
+
+os.environ.setdefault('MODEL_NAME', 'logistic_regression.joblib')
+os.environ.setdefault('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+import app as api  # noqa: E402
+from stress_client import StressClient, AsyncStressClient, StressAPIError  # noqa: E402
+
+READING = {"X": -21.0, "Y": -53.0, "Z": 27.0, "EDA": 0.213944, "HR": 75.07, "TEMP": 30.37,
+           "datetime": "2020-05-08 22:11:34"}
+
+
+def _serve_app():
+    server = make_server('127.0.0.1', 0, api.app, threaded=True)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+class _FlakyHandler(BaseHTTPRequestHandler):
+    """Fails the first `failures` requests with `status`, then echoes a prediction"""
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self.server.attempts += 1
+        if self.server.attempts <= self.server.failures:
+            self.send_response(self.server.status)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        data = json.dumps({'predicted_label': 1.0}).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+def _serve_flaky(failures, status):
+    server = ThreadingHTTPServer(('127.0.0.1', 0), _FlakyHandler)
+    server.attempts, server.failures, server.status = 0, failures, status
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}"
+
+
+def test_predict_and_chunked_batch():
+    """Single and batch predictions; batches are split into batch_size requests"""
+    server, url = _serve_app()
+    try:
+        with StressClient(url, batch_size=3) as client:
+            result = client.predict(READING)
+            assert result['predicted_label'] in (0.0, 1.0, 2.0)
+            results = client.predict_batch([READING] * 7)
+            assert len(results) == 7
+            assert all(r['predicted_label'] == result['predicted_label'] for r in results)
+            stats = client.stats()
+            assert stats['calls'] == 4 and stats['errors'] == 0
+            assert stats['latency_p50_ms'] > 0
+    finally:
+        server.shutdown()
+
+
+def test_gzip_both_ways():
+    """gzip request bodies are accepted and large responses come back gzip-encoded"""
+    server, url = _serve_app()
+    try:
+        with StressClient(url, compress=True, batch_size=50) as client:
+            assert len(client.predict_batch([READING] * 50)) == 50
+        response = requests.post(url + '/predict/batch', json={'data': [READING] * 50},
+                                 headers={'Accept-Encoding': 'gzip'})
+        assert response.headers.get('Content-Encoding') == 'gzip'
+        assert response.json()['count'] == 50
+    finally:
+        server.shutdown()
+
+
+def test_retries_server_errors_but_not_client_errors():
+    """503s are retried with backoff; 400s fail immediately"""
+    server, url = _serve_flaky(failures=2, status=503)
+    try:
+        with StressClient(url, max_retries=3, backoff_base=0.01) as client:
+            assert client.predict(READING)['predicted_label'] == 1.0
+            assert client.stats()['retries'] == 2
+    finally:
+        server.shutdown()
+
+    server, url = _serve_flaky(failures=1, status=400)
+    try:
+        with StressClient(url, max_retries=3, backoff_base=0.01) as client:
+            try:
+                client.predict(READING)
+                assert False, "expected StressAPIError"
+            except StressAPIError as e:
+                assert e.status == 400
+            assert server.attempts == 1
+    finally:
+        server.shutdown()
+
+
+def test_submit_batches_automatically():
+    """submit() groups readings into /predict/batch requests and resolves each future"""
+    server, url = _serve_app()
+    try:
+        client = StressClient(url, batch_size=10, flush_interval=0.05)
+        futures = [client.submit(READING) for _ in range(25)]
+        client.close()
+        assert all('predicted_label' in future.result(timeout=5) for future in futures)
+        assert client.stats()['calls'] == 3
+    finally:
+        server.shutdown()
+
+
+def test_partial_batch_flushes_after_interval():
+    """A reading submitted after an earlier batch went out is sent within about flush_interval"""
+    server, url = _serve_app()
+    try:
+        client = StressClient(url, batch_size=10, flush_interval=0.05)
+        assert 'predicted_label' in client.submit(READING).result(timeout=2)
+        time.sleep(0.2)
+        t0 = time.perf_counter()
+        assert 'predicted_label' in client.submit(READING).result(timeout=2)
+        assert time.perf_counter() - t0 < 1.0
+        assert client.stats()['calls'] == 2
+        client.close()
+    finally:
+        server.shutdown()
+
+
+def test_async_client():
+    """The asyncio client runs calls concurrently without blocking the loop"""
+    server, url = _serve_app()
+
+    async def run():
+        async with AsyncStressClient(url, pool_size=4, batch_size=5, flush_interval=0.05) as client:
+            singles = await asyncio.gather(*[client.predict(READING) for _ in range(4)])
+            batched = await asyncio.gather(*[client.submit(READING) for _ in range(5)])
+            return singles, batched
+
+    try:
+        singles, batched = asyncio.run(run())
+        assert len(singles) == 4 and len(batched) == 5
+        assert all('predicted_label' in result for result in singles + batched)
+    finally:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    print("Testing prediction API client")
+    print("="*60)
+    for test in [test_predict_and_chunked_batch, test_gzip_both_ways,
+                 test_retries_server_errors_but_not_client_errors, test_submit_batches_automatically,
+                 test_partial_batch_flushes_after_interval, test_async_client]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,95 @@
+"""
+Test stress episode detection on synthetic prediction sequences
+"""
+from stress_episodes import (EpisodeDetector, replay_report,
+                             EPISODE_START, EPISODE_SUMMARY, EPISODE_END)
+
+
+def _run(detector, levels, confidence=0.9, device_id='default', start=0):
+    events = []
+    for t, level in enumerate(levels, start=start):
+        events.extend(detector.update(float(t), level, confidence, device_id=device_id, model_name='mlp'))
+    return events
+
+
+def test_sustained_stress_is_one_episode():
+    """A 10-minute stress period yields one start and one end event"""
+    detector = EpisodeDetector(min_duration=10, exit_after=30)
+    events = _run(detector, [0] * 60 + [2] * 600 + [0] * 60)
+
+    assert [e['event_type'] for e in events] == [EPISODE_START, EPISODE_END]
+    end = events[-1]
+    assert end['episode_id'] == events[0]['episode_id']
+    assert end['duration_seconds'] == 599
+    assert end['peak_level'] == 2.0
+    assert abs(end['mean_confidence'] - 0.9) < 1e-9
+    assert end['readings'] == 600
+
+
+def test_short_runs_are_discarded():
+    """Stress shorter than min_duration never emits events"""
+    detector = EpisodeDetector(min_duration=10, exit_after=30)
+    events = _run(detector, ([1] * 5 + [0] * 5) * 20)
+    assert events == []
+
+
+def test_brief_dips_do_not_split_episode():
+    """Calm gaps shorter than exit_after keep the episode open"""
+    detector = EpisodeDetector(min_duration=5, exit_after=30)
+    events = _run(detector, [1] * 60 + [0] * 10 + [2] * 60 + [0] * 40)
+
+    assert [e['event_type'] for e in events] == [EPISODE_START, EPISODE_END]
+    assert events[-1]['peak_level'] == 2.0
+
+
+def test_confidence_hysteresis():
+    """Low-confidence stress cannot start an episode but can extend one"""
+    detector = EpisodeDetector(min_duration=0, exit_after=5, enter_confidence=0.7)
+    assert _run(detector, [1] * 20, confidence=0.5) == []
+
+    events = _run(detector, [1], confidence=0.9, start=100)
+    events += _run(detector, [1] * 20 + [0] * 10, confidence=0.5, start=101)
+    assert [e['event_type'] for e in events] == [EPISODE_START, EPISODE_END]
+    assert events[-1]['readings'] == 21
+
+
+def test_periodic_summaries():
+    """summary_interval adds summaries while the episode lasts"""
+    detector = EpisodeDetector(min_duration=0, exit_after=5, summary_interval=60)
+    events = _run(detector, [1] * 300 + [0] * 10)
+    types = [e['event_type'] for e in events]
+    assert types[0] == EPISODE_START and types[-1] == EPISODE_END
+    assert types.count(EPISODE_SUMMARY) == 4
+
+
+def test_devices_are_independent():
+    """Each device keeps its own episode state"""
+    detector = EpisodeDetector(min_duration=0, exit_after=5)
+    events = _run(detector, [1] * 10, device_id='a')
+    events += _run(detector, [0] * 10, device_id='b')
+    assert [e['device_id'] for e in events] == ['a']
+    assert detector.open_episodes() == 1
+    assert [e['event_type'] for e in detector.flush()] == [EPISODE_END]
+
+
+def test_replay_report_counts_writes():
+    """The report compares per-reading writes with episode writes"""
+    levels = [0] * 100 + [2] * 1000 + [0] * 100
+    report = replay_report(range(len(levels)), levels, [0.9] * len(levels),
+                           detector=EpisodeDetector(min_duration=10, exit_after=30))
+    assert report['per_reading_writes'] == 1000
+    assert report['episode_writes'] == 2
+    assert report['reduction'] == 500
+
+
+if __name__ == "__main__":
+    print("Testing stress episode detection")
+    print("="*60)
+    for test in [test_sustained_stress_is_one_episode, test_short_runs_are_discarded,
+                 test_brief_dips_do_not_split_episode, test_confidence_hysteresis,
+                 test_periodic_summaries, test_devices_are_independent,
+                 test_replay_report_counts_writes]:
+        test()
+        print(f"PASS {test.__name__}")
+    print("="*60)
+    print("All tests passed!")
@@ -0,0 +1,91 @@
+"""
+Test server warm-up and the /livez and /readyz probes
+No deployment needed (uses Flask's test client with the committed models)
+"""
+import importlib
+import os
+import threading
+
+os.environ.setdefault('MODEL_NAME', 'logistic_regression.joblib')
+os.environ.setdefault('MODEL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models'))
+import app as api  # noqa: E402
+from warmup import Warmup, synthetic_readings  # noqa: E402
+
+
+def test_synthetic_readings():
+    """Readings are reproducible, complete and within sensor ranges"""
+    readings = synthetic_readings(50, seed=3)
+    assert readings == synthetic_readings(50, seed=3)
+    assert all(set(r) == {'X', 'Y', 'Z', 'EDA', 'HR', 'TEMP', 'datetime'} for r in readings)
+    assert all(60 <= r['HR'] <= 110 and -64 <= r['X'] < 64 for r in readings)
+
+
+def test_runs_steps_and_records_timings():
+    """Each step runs `rounds` times; first and warm timings are recorded"""
+    calls = []
+    warmup = Warmup(rounds=4)
+    assert warmup.run([('a', lambda: calls.append('a')), ('b', lambda: calls.append('b'))])
+    assert calls == ['a'] * 4 + ['b'] * 4
+    assert warmup.ready and set(warmup.describe()['timings_ms']) == {'a', 'b'}
+    assert warmup.timings['a']['first_ms'] >= 0 and warmup.timings['a']['warm_ms'] >= 0
+
+
+def test_failure_and_disabled():
+    """A failing step leaves the server not ready; a disabled warm-up is ready at once"""
+    def broken():
+        raise RuntimeError("boom")
+
+    warmup = Warmup()
+    assert not warmup.run([('ok', lambda: None), ('broken', broken)])
+    assert warmup.state == 'failed' and 'broken: boom' in warmup.error
+
+    disabled = Warmup(enabled=False)
+    assert disabled.run([('broken', broken)]) and disabled.ready
+
+
+def test_background_warmup():
+    """start() returns before the steps finish; wait() blocks until ready"""
+    release = threading.Event()
+    warmup = Warmup(rounds=1)
+    warmup.start([('slow', release.wait)], blocking=False)
+    assert not warmup.ready and warmup.state in ('pending', 'running')
+    release.set()
+    assert warmup.wait(5)
+
+
+def test_probes(monkeypatch):
+    """/livez always answers; /readyz is 503 until the startup warm-up completes"""
+    # Warm up at import regardless of the caller's WARMUP settings
+    monkeypatch.setenv('WARMUP', '1')
+    monkeypatch.setenv('WARMUP_BLOCKING', '1')
+    importlib.reload(api)
+    client = api.app.test_client()
+    assert client.get('/livez').status_code == 200
+    assert api.warmup.wait(60)
+    ready = client.get('/readyz')
+    assert ready.status_code == 200
+    assert {'predict', 'predict_batch'} <= set(ready.get_json()['warmup']['timings_ms'])
+
+    state = api.warmup.state
+    api.warmup.state = 'running'
+    try:
+        assert client.get('/readyz').status_code == 503
+        assert client.get('/health').get_json()['ready'] is False
+    finally:
+        api.warmup.state = state
+
+
+if __name__ == "__main__":
+    print("Testing server warm-up")
+    print("="*60)
+    import pytest
+
+    for test in [test_synthetic_readings, test_runs_steps_and_records_timings, test_failure_and_disabled,
+                 test_background_warmup]:
+        test()
+        print(f"PASS {test.__name__}")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        test_probes(monkeypatch)
+    print("PASS test_probes")
+    print("="*60)
+    print("All tests passed!")
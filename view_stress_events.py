@@ -1,53 +1,95 @@
 """
-View stress events stored in Firebase
+View stress events stored in Firebase (or the local SQLite store with EVENT_STORE=sqlite)
 """
 import os
-from firebase_config import initialize_firebase, get_stress_events
+import argparse
+from firebase_config import initialize_firebase, configure_event_store, iter_stress_events
 from datetime import datetime
 
+# Fields printed below; sensor_data is only fetched with --sensors
+LIST_FIELDS = ['timestamp_readable', 'stress_level', 'confidence', 'model_name', 'event_type', 'duration_seconds']
+
 def main():
-    # Initialize Firebase
-    cred_path = os.getenv('FIREBASE_CREDENTIAL', 'firebase_credentials.json')
-    
-    if not os.path.exists(cred_path):
-        print(f"Error: Firebase credentials file not found: {cred_path}")
-        print("Please set up Firebase credentials first (see firebase_setup.md)")
-        return
-    
-    print("Initializing Firebase...")
-    initialize_firebase(credential_path=cred_path)
-    
+    ap = argparse.ArgumentParser(description="View stress events stored in Firebase (newest first)")
+    ap.add_argument("--limit", type=int, default=50,
+                    help="Maximum number of events to show (default: 50)")
+    ap.add_argument("--all", action="store_true",
+                    help="Show every matching event (ignores --limit)")
+    ap.add_argument("--page-size", type=int, default=100,
+                    help="Events fetched per query (default: 100)")
+    ap.add_argument("--since", type=str, default=None,
+                    help="Only events at or after this ISO time (e.g. 2024-01-15T00:00:00+00:00)")
+    ap.add_argument("--until", type=str, default=None,
+                    help="Only events before this ISO time")
+    ap.add_argument("--level", type=float, action="append", default=None,
+                    help="Only events with this stress level (repeatable)")
+    ap.add_argument("--model", type=str, default=None,
+                    help="Only events from this model")
+    ap.add_argument("--sensors", action="store_true",
+                    help="Also fetch and print the sensor readings of each event")
+    args = ap.parse_args()
+
+    if os.getenv('EVENT_STORE', 'firestore').lower() == 'sqlite':
+        # Local store, no Firebase needed
+        configure_event_store('sqlite')
+    else:
+        # Initialize Firebase
+        cred_path = os.getenv('FIREBASE_CREDENTIAL', 'firebase_credentials.json')
+
+        if not os.path.exists(cred_path):
+            print(f"Error: Firebase credentials file not found: {cred_path}")
+            print("Please set up Firebase credentials first (see firebase_setup.md)")
+            return
+
+        print("Initializing Firebase...")
+        initialize_firebase(credential_path=cred_path)
+
     print("\nFetching stress events...")
-    events = get_stress_events(limit=50)
-    
-    if not events:
-        print("No stress events found.")
-        return
-    
+    events = iter_stress_events(
+        page_size=args.page_size,
+        max_events=None if args.all else args.limit,
+        fields=LIST_FIELDS + ['sensor_data'] if args.sensors else LIST_FIELDS,
+        start_time=args.since,
+        end_time=args.until,
+        stress_levels=args.level,
+        model_name=args.model
+    )
+
     print(f"\n{'='*80}")
-    print(f"Found {len(events)} stress events")
-    print(f"{'='*80}\n")
-    
+
+    count = 0
     for i, event in enumerate(events, 1):
+        count = i
         timestamp = event.get('timestamp_readable', event.get('timestamp', 'N/A'))
         stress_level = event.get('stress_level', 'N/A')
         confidence = event.get('confidence', 'N/A')
         model = event.get('model_name', 'N/A')
-        
+
         level_names = {0.0: 'Low', 1.0: 'Medium', 2.0: 'High'}
         level_name = level_names.get(stress_level, 'Unknown')
-        
+
         print(f"{i}. {timestamp}")
         print(f"   Stress Level: {level_name} ({stress_level})")
         print(f"   Confidence: {confidence:.1%}" if isinstance(confidence, (int, float)) else f"   Confidence: {confidence}")
         print(f"   Model: {model}")
-        
+
+        if 'event_type' in event:
+            duration = event.get('duration_seconds')
+            print(f"   Episode: {event['event_type']}" + (f" ({duration:.0f}s)" if duration is not None else ""))
+
         if 'sensor_data' in event:
             sensor = event['sensor_data']
             print(f"   Sensors: HR={sensor.get('HR', 'N/A')}, TEMP={sensor.get('TEMP', 'N/A')}, EDA={sensor.get('EDA', 'N/A')}")
-        
+
         print()
 
+    if count == 0:
+        print("No stress events found.")
+        return
+
+    print(f"{'='*80}")
+    print(f"Found {count} stress events")
+    print(f"{'='*80}")
+
 if __name__ == "__main__":
     main()
-
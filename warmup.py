@@ -0,0 +1,146 @@
+"""
+Server Warm-up
+Runs representative synthetic requests when a prediction server starts, so the
+first real requests do not pay one-off initialization costs (pandas/sklearn
+code paths, BLAS thread pools, allocator growth), and tracks readiness for
+the /livez and /readyz endpoints.
+
+Configuration (environment variables):
+    WARMUP=0              skip warm-up (ready as soon as the model is loaded)
+    WARMUP_ROUNDS=3       times each warm-up step runs
+    WARMUP_BATCH_SIZE=64  readings in the batch steps
+    WARMUP_BLOCKING=1     warm up before serving instead of in a background thread
+"""
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+WARMUP_STATES = ('pending', 'running', 'ready', 'failed')
+
+
+def synthetic_readings(n, seed=0):
+    """
+    Plausible sensor readings (JSON-ready dicts with X, Y, Z, EDA, HR, TEMP, datetime)
+
+    Values span the ranges of the training data, so the warm-up walks the same
+    code paths (and tree branches) as real traffic.
+    """
+    rng = np.random.default_rng(seed)
+    start = datetime(2020, 5, 8, 22, 0, 0)
+    return [{
+        'X': float(rng.integers(-64, 64)),
+        'Y': float(rng.integers(-64, 64)),
+        'Z': float(rng.integers(-64, 64)),
+        'EDA': round(float(rng.uniform(0.0, 5.0)), 6),
+        'HR': round(float(rng.uniform(60.0, 110.0)), 2),
+        'TEMP': round(float(rng.uniform(28.0, 36.0)), 2),
+        'datetime': (start + timedelta(minutes=int(rng.integers(0, 60 * 24 * 60)))).strftime("%Y-%m-%d %H:%M:%S")
+    } for _ in range(n)]
+
+
+class Warmup:
+    """
+    Warm-up runner and readiness state
+
+    Parameters:
+    - enabled: Run the warm-up steps (otherwise ready immediately)
+    - rounds: Times each step runs; the first run is the cold one
+    - batch_size: Readings per batch step (see synthetic_readings)
+
+    Steps are (name, callable) pairs; a callable raising an exception fails the
+    warm-up and the server stays not ready.
+    """
+
+    def __init__(self, enabled=True, rounds=3, batch_size=64):
+        if rounds < 1 or batch_size < 1:
+            raise ValueError("rounds and batch_size must be at least 1")
+        self.enabled = enabled
+        self.rounds = int(rounds)
+        self.batch_size = int(batch_size)
+        self.state = 'pending'
+        self.error = None
+        self.started = self.finished = None
+        self.timings = {}
+        self._thread = None
+
+    @classmethod
+    def from_env(cls):
+        """Build a warm-up from WARMUP_* environment variables"""
+        return cls(
+            enabled=os.getenv('WARMUP', '1') != '0',
+            rounds=int(os.getenv('WARMUP_ROUNDS', '3')),
+            batch_size=int(os.getenv('WARMUP_BATCH_SIZE', '64'))
+        )
+
+    @property
+    def ready(self):
+        return self.state == 'ready'
+
+    def run(self, steps):
+        """
+        Run every step `rounds` times, recording first (cold) and warm timings
+
+        Returns True if all steps succeeded
+        """
+        self.started = time.time()
+        self.state = 'running'
+        if not self.enabled:
+            self.state = 'ready'
+            self.finished = time.time()
+            return True
+        try:
+            for name, step in steps:
+                seconds = []
+                for _ in range(self.rounds):
+                    t0 = time.perf_counter()
+                    step()
+                    seconds.append(time.perf_counter() - t0)
+                self.timings[name] = {
+                    'first_ms': seconds[0] * 1000,
+                    'warm_ms': float(np.median(seconds[1:] or seconds)) * 1000
+                }
+        except Exception as e:
+            self.error = f"{name}: {e}"
+            self.state = 'failed'
+            print(f"Warm-up failed at {self.error}")
+            return False
+        finally:
+            self.finished = time.time()
+        self.state = 'ready'
+        summary = ', '.join(f"{name} {t['first_ms']:.1f} -> {t['warm_ms']:.1f} ms" for name, t in self.timings.items())
+        print(f"Warm-up complete in {self.finished - self.started:.2f}s ({summary})")
+        return True
+
+    def start(self, steps, blocking=None):
+        """
+        Run the warm-up in a background thread (so /livez answers meanwhile),
+        or before returning when blocking (default: WARMUP_BLOCKING=1)
+        """
+        if blocking is None:
+            blocking = os.getenv('WARMUP_BLOCKING', '0') == '1'
+        if blocking:
+            self.run(steps)
+            return
+        self._thread = threading.Thread(target=self.run, args=(list(steps),), name='warmup', daemon=True)
+        self._thread.start()
+
+    def wait(self, timeout=None):
+        """Wait for a background warm-up; returns True if ready"""
+        if self._thread is not None:
+            self._thread.join(timeout)
+        return self.ready
+
+    def describe(self):
+        seconds = None
+        if self.started is not None:
+            seconds = (self.finished or time.time()) - self.started
+        return {
+            'state': self.state,
+            'enabled': self.enabled,
+            'seconds': seconds,
+            'timings_ms': self.timings,
+            'error': self.error
+        }